@@ -1,39 +1,900 @@
-from flask import Flask, render_template, request, jsonify
-import requests
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context, g
+import click
+import config
+import outbound
 import hashlib
 import time
 from werkzeug.utils import secure_filename
+from werkzeug.security import safe_join
 import random
 import os
 from datetime import datetime
 import json
-import os as _os
+import re
+import secrets
+import sys
+import sqlite3
+import threading
+import difflib
+import heapq
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import logging
+import applog
+import metrics
 
-# Load environment variables FIRST before using them
-try:
-    from dotenv import load_dotenv
-    # Load .env file from project root
-    load_dotenv()
-    print("[DEBUG] Loaded environment variables from .env file")
-except Exception as e:
-    print(f"[DEBUG] Could not load .env file: {e}")
+# Logging goes through a queue to a writer thread; loggers are per category so
+# each can be levelled and sampled on its own (see applog)
+applog.setup()
+log = logging.getLogger('app')
+image_log = logging.getLogger('app.images')
+openai_log = logging.getLogger('app.openai')
+match_log = logging.getLogger('app.match')
+suggest_log = logging.getLogger('app.suggest')
+response_log = logging.getLogger(applog.RESPONSES_LOGGER)
+
+# Metrics for /metrics (per worker, see metrics.py). The same timings can be sent
+# per response in a Server-Timing header.
+SERVER_TIMING = (os.environ.get('SERVER_TIMING') or '').strip().lower() in ('1', 'true', 'yes', 'on')
+REQUEST_SECONDS = metrics.Histogram(
+    'app_request_duration_seconds', 'End-to-end request time by route.', ('route', 'method', 'status'))
+OPENAI_SECONDS = metrics.Histogram(
+    'app_openai_request_duration_seconds', 'OpenAI chat completion calls by model and prompt kind.', ('model', 'kind'))
+PEXELS_SEARCH_SECONDS = metrics.Histogram(
+    'app_pexels_search_duration_seconds', 'Pexels search requests by search step.', ('step',))
+IMAGE_DOWNLOAD_SECONDS = metrics.Histogram(
+    'app_image_download_duration_seconds', 'Remote image downloads by caller.', ('source',))
+LOCAL_MATCH_SECONDS = metrics.Histogram(
+    'app_local_match_duration_seconds', 'Local recipe matching (index or catalog search).')
+CARDS_PER_RESPONSE = metrics.Histogram(
+    'app_cards_per_response', 'Recipe cards returned per suggestion response.', ('route',),
+    buckets=(0, 1, 2, 3, 4, 5, 6))
+FALLBACKS = metrics.Counter('app_fallbacks_total', 'Fallback paths taken.', ('path',))
+CACHE_REQUESTS = metrics.Counter('app_cache_requests_total', 'Cache lookups by cache and result.', ('cache', 'result'))
+AI_RECIPES_SIZE = metrics.Gauge('app_ai_recipes', 'AI-generated recipes held in memory.')
+AI_RECIPES_SIZE.set_function(lambda: len(AI_RECIPES))
+AI_RECIPES_BYTES = metrics.Gauge('app_ai_recipes_bytes', 'Estimated memory held by AI-generated recipes.')
+AI_RECIPES_BYTES.set_function(lambda: AI_RECIPES.stats()['bytes'])
+AI_RECIPE_EVICTIONS = metrics.Counter(
+    'app_ai_recipe_evictions_total', 'AI-generated recipes dropped from memory by reason.', ('reason',))
+
+# Pexels API configuration (the key comes from config, .env files included); the
+# search URL can point at a local stand-in such as bench/stubs.py
+PEXELS_API_URL = os.environ.get('PEXELS_API_URL') or 'https://api.pexels.com/v1/search'
+
+
+# Helper: the configured Pexels key, or None when it is missing or still the placeholder
+def pexels_api_key():
+    key = config.settings().pexels_api_key
+    return key if key and key != 'YOUR_PEXELS_API_KEY_HERE' else None  # Get from https://www.pexels.com/api/
 
-# Pexels API configuration - loaded AFTER .env file
-PEXELS_API_KEY = os.environ.get('PEXELS_API_KEY') or 'YOUR_PEXELS_API_KEY_HERE'  # Get from https://www.pexels.com/api/
-PEXELS_API_URL = 'https://api.pexels.com/v1/search'
 
 # Debug API key loading
-if PEXELS_API_KEY and PEXELS_API_KEY != 'YOUR_PEXELS_API_KEY_HERE':
-    print(f"[DEBUG] Pexels API key loaded: {PEXELS_API_KEY[:20]}...{PEXELS_API_KEY[-8:]}")
+if pexels_api_key():
+    _key = pexels_api_key()
+    image_log.info("Pexels API key loaded: %s...%s", _key[:20], _key[-8:])
 else:
-    print("[DEBUG] Pexels API key not configured - using local fallbacks only")
+    image_log.info("Pexels API key not configured - using local fallbacks only")
 
 app = Flask(__name__)
-# Development: disable static file caching so browsers request fresh files while
-# we're iterating. This prevents 304 responses from stale caches during testing.
-app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0
-# Enable debug and template auto-reload when running locally
-app.config['TEMPLATES_AUTO_RELOAD'] = True
+# Static files are streamed with wsgi.file_wrapper, which gunicorn turns into
+# sendfile(); behind Apache mod_xsendfile or lighttpd, USE_X_SENDFILE hands the
+# file to the front-end server instead (X-Sendfile header, empty body)
+app.config['USE_X_SENDFILE'] = (os.environ.get('USE_X_SENDFILE') or '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+@app.before_request
+def start_request_timing():
+    metrics.start_timing()
+
+
+@app.after_request
+def record_request_timing(response):
+    """
+    Observe the request's duration and card count; add Server-Timing when enabled.
+    A streamed body (e.g. /suggest/stream) is still being produced here, so its
+    duration is observed once the server closes it, and it carries no header: the
+    breakdown would be empty this early (the stream reports it in its last event).
+    """
+    timing = metrics.current_timing()
+    if timing is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        labels = {'route': route, 'method': request.method, 'status': response.status_code}
+        card_count = g.pop('card_count', None)
+        if card_count is not None:
+            CARDS_PER_RESPONSE.observe(card_count, route=route)
+        # files keep their direct passthrough (sendfile); wrapping them would defeat it
+        if response.is_streamed and not response.direct_passthrough:
+            response.call_on_close(lambda: REQUEST_SECONDS.observe(time.perf_counter() - timing.started, **labels))
+            return response
+        REQUEST_SECONDS.observe(time.perf_counter() - timing.started, **labels)
+        if SERVER_TIMING:
+            response.headers['Server-Timing'] = timing.header()
+    return response
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus scrape endpoint (this worker's metrics)."""
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
+# Profile settings: development serves static files uncached and reloads
+# templates; production caches both. Re-applied whenever config reloads.
+@config.on_reload
+def apply_settings(settings):
+    app.config['SEND_FILE_MAX_AGE_DEFAULT'] = settings.send_file_max_age
+    app.config['TEMPLATES_AUTO_RELOAD'] = settings.templates_auto_reload
+    app.jinja_env.auto_reload = settings.templates_auto_reload
+
+
+# Reload configuration on SIGHUP or when a .env file changes
+config.start_watcher()
+
+# Maximum number of card images resolved in parallel for a single response
+IMAGE_FETCH_CONCURRENCY = int(os.environ.get('IMAGE_FETCH_CONCURRENCY') or 4)
+
+# Pexels search strategy: 'ranked' makes one or two wide searches and picks the
+# best photo locally; 'cascade' walks the original query-by-query cascade.
+PEXELS_SEARCH_MODE = (os.environ.get('PEXELS_SEARCH_MODE') or 'ranked').strip().lower()
+PEXELS_RANKED_PER_PAGE = int(os.environ.get('PEXELS_RANKED_PER_PAGE') or 15)
+
+# Deferred images: send cards right away with a local image and resolve the real
+# one in the background (clients poll /api/recipe/<id>/image for it)
+DEFER_CARD_IMAGES = (os.environ.get('DEFER_CARD_IMAGES') or '').strip().lower() in ('1', 'true', 'yes', 'on')
+# Longest time (seconds) the image endpoint holds a long-poll request open
+DEFERRED_IMAGE_MAX_WAIT = float(os.environ.get('DEFERRED_IMAGE_MAX_WAIT') or 10)
+
+
+# Helper: resolve card images in parallel so a response waits on the slowest
+# lookup instead of the sum of all of them.
+def resolve_images_concurrently(jobs, max_workers=None):
+    """
+    Run several image lookups at once with a per-response concurrency cap.
+
+    Args:
+        jobs (list): zero-argument callables, one per card, each returning an image path or URL
+        max_workers (int): concurrency cap for this response (defaults to IMAGE_FETCH_CONCURRENCY)
+
+    Returns:
+        list: results in the same order as ``jobs``; a lookup that raises yields None
+    """
+    def run(job):
+        try:
+            return job()
+        except Exception as e:
+            image_log.error("Image lookup failed: %s", e)
+            return None
+
+    if len(jobs) <= 1:
+        return [run(job) for job in jobs]
+    workers = max(1, min(max_workers or IMAGE_FETCH_CONCURRENCY, len(jobs)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='card-image') as pool:
+        # each lookup keeps reporting into this request's Server-Timing
+        futures = [pool.submit(metrics.propagate(run), job) for job in jobs]
+        return [future.result() for future in futures]
+
+
+class DeferredImageResolver:
+    """
+    Background image lookups for cards that were sent with a local placeholder.
+
+    Jobs run on a small thread pool. The latest result per recipe id (the
+    most recent ``max_entries`` ids) is kept for the polling endpoint, and
+    handed to ``on_ready`` (e.g. to record it in AI_RECIPES) once ready.
+    """
+
+    def __init__(self, max_workers=4, max_entries=1024):
+        self.max_entries = max_entries
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='deferred-image')
+        self._entries = OrderedDict()  # recipe id -> {'status': 'pending'|'ready', 'image': str}
+        self._cond = threading.Condition()
+
+    def defer(self, card, job, on_ready=None):
+        """
+        Mark ``card`` as pending and resolve its image with ``job`` in the background;
+        ``on_ready(image)`` is called with the result (or the placeholder it keeps).
+        """
+        rid = card.get('id')
+        entry = {'status': 'pending', 'image': card.get('image')}
+        with self._cond:
+            self._entries[rid] = entry
+            self._entries.move_to_end(rid)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        card['image_pending'] = True
+        self._pool.submit(self._run, entry, job, on_ready)
+
+    def _run(self, entry, job, on_ready):
+        image = None
+        try:
+            image = job()
+        except Exception as e:
+            image_log.error("Deferred image lookup failed: %s", e)
+        if not image or not (image.startswith('/') or image.lower().startswith('http')):
+            image = entry['image']  # keep the placeholder
+        if on_ready is not None:
+            try:
+                on_ready(image)
+            except Exception as e:
+                image_log.error("Storing deferred image failed: %s", e)
+        with self._cond:
+            entry['image'] = image
+            entry['status'] = 'ready'
+            self._cond.notify_all()
+
+    def get(self, rid, wait=0):
+        """
+        Current image state for a recipe id, or None if it was never deferred.
+
+        Args:
+            rid: recipe id
+            wait (float): seconds to wait for a pending lookup to finish (long-poll)
+
+        Returns:
+            dict: {'status': 'pending'|'ready', 'image': path or URL}
+        """
+        deadline = time.time() + wait
+        with self._cond:
+            while True:
+                entry = self._entries.get(rid)
+                if entry is None:
+                    return None
+                remaining = deadline - time.time()
+                if entry['status'] == 'ready' or remaining <= 0:
+                    return dict(entry)
+                self._cond.wait(remaining)
+
+    def fill_ready(self, cards):
+        """Swap finished images into cached cards that were sent while still pending."""
+        for card in cards:
+            if card.get('image_pending'):
+                entry = self.get(card.get('id'))
+                if entry and entry['status'] == 'ready':
+                    card['image'] = card['image_url'] = entry['image']
+                    card.pop('image_pending', None)
+        return cards
+
+
+DEFERRED_IMAGES = DeferredImageResolver(max_workers=IMAGE_FETCH_CONCURRENCY)
+
+
+# Helper: resolve a stored AI recipe's image in the background. The recipe is
+# marked pending in AI_RECIPES, so a poll answered by another worker sees it too.
+def defer_ai_image(card, job):
+    rid = card['id']
+    AI_RECIPES.update(rid, image_pending=True)
+    DEFERRED_IMAGES.defer(card, job, on_ready=lambda image: AI_RECIPES.update(
+        rid, image=image, image_url=image, image_pending=False))
+
+
+# Helper: card images for a response - resolved now, or (DEFER_CARD_IMAGES) local
+# placeholders now with the real lookups handed back for DEFERRED_IMAGES
+def resolve_or_defer_images(jobs, names):
+    """
+    Args:
+        jobs (list): zero-argument callables, one per card, each returning an image path or URL
+        names (list): recipe names, used to pick a local placeholder per card
+
+    Returns:
+        tuple: (images, deferred jobs); the deferred job is None for images resolved now
+    """
+    if not DEFER_CARD_IMAGES:
+        return resolve_images_concurrently(jobs), [None] * len(jobs)
+    return [get_local_food_image_fallback(name or '') for name in names], list(jobs)
+
+
+# Persistent image-lookup cache settings (shared by every thread and gunicorn worker)
+IMAGE_CACHE_PATH = os.environ.get('IMAGE_CACHE_PATH') or os.path.join(app.root_path, 'data', 'image_cache.sqlite3')
+IMAGE_CACHE_MAX_ENTRIES = int(os.environ.get('IMAGE_CACHE_MAX_ENTRIES') or 5000)
+IMAGE_CACHE_TTL = int(os.environ.get('IMAGE_CACHE_TTL') or 7 * 24 * 3600)
+IMAGE_CACHE_NEGATIVE_TTL = int(os.environ.get('IMAGE_CACHE_NEGATIVE_TTL') or 3600)
+
+
+def normalize_lookup_key(*parts):
+    """Build a cache key from query parts: lowercase, punctuation stripped, whitespace collapsed."""
+    cleaned = [' '.join(re.sub(r"[^a-z0-9\s]", ' ', (p or '').lower()).split()) for p in parts]
+    return '|'.join(cleaned)
+
+
+class ImageLookupCache:
+    """
+    Disk-backed cache mapping a normalized image query to the image it resolved to.
+
+    Entries live in a small SQLite database so all threads and gunicorn workers
+    share them. A ``None`` value is a negative entry ("no result") and expires
+    after the shorter negative TTL. The least recently used entries are evicted
+    once the table grows past ``max_entries``. Any database error is treated as
+    a cache miss so image lookups never fail because of the cache.
+    """
+
+    # Only refresh last_access when it is older than this, to keep hits read-mostly
+    TOUCH_INTERVAL = 60
+    # Check the table size for eviction every N writes
+    EVICT_EVERY = 32
+
+    def __init__(self, path, max_entries=5000, ttl=7 * 24 * 3600, negative_ttl=3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._writes = 0
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS image_lookups ('
+                ' key TEXT PRIMARY KEY, value TEXT, expires_at REAL NOT NULL, last_access REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS image_lookups_last_access ON image_lookups(last_access)')
+            self._local.conn = conn
+        return conn
+
+    def _count(self, attr):
+        with self._stats_lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+        CACHE_REQUESTS.inc(cache='image_lookup', result=attr)
+
+    def get(self, key):
+        """
+        Look up a cached query.
+
+        Returns:
+            tuple: (found, value) where value is None for a cached "no result" entry
+        """
+        try:
+            now = time.time()
+            conn = self._connect()
+            row = conn.execute(
+                'SELECT value, expires_at, last_access FROM image_lookups WHERE key = ?', (key,)
+            ).fetchone()
+            if not row or row[1] < now:
+                self._count('misses')
+                return False, None
+            if now - row[2] > self.TOUCH_INTERVAL:
+                conn.execute('UPDATE image_lookups SET last_access = ? WHERE key = ?', (now, key))
+            self._count('hits' if row[0] is not None else 'negative_hits')
+            return True, row[0]
+        except Exception as e:
+            image_log.error("Image cache read failed: %s", e)
+            self._count('misses')
+            return False, None
+
+    def set(self, key, value):
+        """Store a resolved image (or None for "no result") under ``key``."""
+        try:
+            now = time.time()
+            ttl = self.ttl if value is not None else self.negative_ttl
+            conn = self._connect()
+            conn.execute(
+                'INSERT OR REPLACE INTO image_lookups (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)',
+                (key, value, now + ttl, now)
+            )
+            with self._stats_lock:
+                self._writes += 1
+                due = self._writes % self.EVICT_EVERY == 0
+            if due:
+                self.evict()
+        except Exception as e:
+            image_log.error("Image cache write failed: %s", e)
+
+    def evict(self):
+        """Drop expired entries, then the least recently used ones beyond ``max_entries``."""
+        conn = self._connect()
+        removed = conn.execute('DELETE FROM image_lookups WHERE expires_at < ?', (time.time(),)).rowcount
+        excess = conn.execute('SELECT COUNT(*) FROM image_lookups').fetchone()[0] - self.max_entries
+        if excess > 0:
+            removed += conn.execute(
+                'DELETE FROM image_lookups WHERE key IN '
+                '(SELECT key FROM image_lookups ORDER BY last_access LIMIT ?)', (excess,)
+            ).rowcount
+        with self._stats_lock:
+            self.evictions += max(removed, 0)
+
+    def stats(self):
+        """Return this process's hit/miss counters."""
+        with self._stats_lock:
+            return {
+                'hits': self.hits,
+                'negative_hits': self.negative_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+IMAGE_LOOKUP_CACHE = ImageLookupCache(
+    IMAGE_CACHE_PATH,
+    max_entries=IMAGE_CACHE_MAX_ENTRIES,
+    ttl=IMAGE_CACHE_TTL,
+    negative_ttl=IMAGE_CACHE_NEGATIVE_TTL
+)
+
+
+# Pexels request budget (the free tier allows 200 requests an hour): sustained
+# rate, short burst, and the share of the Pexels quota below which only primary
+# searches are made
+PEXELS_QUOTA_PER_HOUR = float(os.environ.get('PEXELS_QUOTA_PER_HOUR') or 200)
+PEXELS_QUOTA_BURST = float(os.environ.get('PEXELS_QUOTA_BURST') or 20)
+PEXELS_QUOTA_LOW_WATERMARK = float(os.environ.get('PEXELS_QUOTA_LOW_WATERMARK') or 0.2)
+
+# Pexels search priorities: the card's own dish first, then ingredient-based
+# searches, then generic food photos
+PEXELS_PRIORITY_PRIMARY = 0
+PEXELS_PRIORITY_SECONDARY = 1
+PEXELS_PRIORITY_GENERIC = 2
+
+
+class PexelsQuota:
+    """
+    Pexels request budget shared by every thread and gunicorn worker.
+
+    Two limits are combined, both kept in one SQLite row so all workers draw
+    on the same budget:
+
+    * a token bucket refilled at ``per_hour`` requests an hour and holding at
+      most ``burst``, pacing our own calls;
+    * the quota Pexels reports in its X-Ratelimit-Limit/-Remaining/-Reset
+      headers (a 429 means none is left until the reset).
+
+    Every call names a priority. Lower priorities must leave a reserve in the
+    bucket and are skipped once the remaining Pexels quota falls below a
+    multiple of ``low_watermark``, so when the budget runs low it goes to
+    primary card images and the generic searches stop first. Database errors
+    let the call through, like the image cache.
+    """
+
+    # Share of the bucket each priority level below primary has to leave untouched
+    PRIORITY_RESERVE = 0.25
+
+    def __init__(self, path, per_hour=200, burst=20, low_watermark=0.2):
+        self.path = path
+        self.per_hour = per_hour
+        self.burst = max(1.0, burst)
+        self.low_watermark = low_watermark
+        self.allowed = 0
+        self.skipped = 0
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS pexels_quota ('
+                ' id INTEGER PRIMARY KEY CHECK (id = 0), tokens REAL NOT NULL, updated_at REAL NOT NULL,'
+                ' remaining INTEGER, quota_limit INTEGER, reset_at REAL)'
+            )
+            conn.execute(
+                'INSERT OR IGNORE INTO pexels_quota (id, tokens, updated_at) VALUES (0, ?, ?)',
+                (self.burst, time.time())
+            )
+            self._local.conn = conn
+        return conn
+
+    def _quota_allows(self, remaining, limit, priority):
+        if remaining is None:
+            return True  # nothing reported yet (or the quota window has reset)
+        if remaining <= 0:
+            return False
+        if not limit:
+            return True
+        return remaining / limit > self.low_watermark * priority
+
+    def acquire(self, priority=PEXELS_PRIORITY_PRIMARY):
+        """
+        Take one request from the budget if ``priority`` may still spend it.
+
+        Returns:
+            bool: True when the request should be made
+        """
+        try:
+            now = time.time()
+            conn = self._connect()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                tokens, updated_at, remaining, limit, reset_at = conn.execute(
+                    'SELECT tokens, updated_at, remaining, quota_limit, reset_at FROM pexels_quota WHERE id = 0'
+                ).fetchone()
+                tokens = min(self.burst, tokens + max(0.0, now - updated_at) * self.per_hour / 3600)
+                if reset_at is not None and now >= reset_at:
+                    remaining = reset_at = None
+                allowed = (tokens >= 1 + priority * self.PRIORITY_RESERVE * self.burst
+                           and self._quota_allows(remaining, limit, priority))
+                if allowed:
+                    tokens -= 1
+                    if remaining is not None:
+                        remaining -= 1
+                conn.execute(
+                    'UPDATE pexels_quota SET tokens = ?, updated_at = ?, remaining = ?, reset_at = ? WHERE id = 0',
+                    (tokens, now, remaining, reset_at)
+                )
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        except Exception as e:
+            image_log.error("Pexels quota check failed: %s", e)
+            allowed = True
+        with self._stats_lock:
+            if allowed:
+                self.allowed += 1
+            else:
+                self.skipped += 1
+        return allowed
+
+    def update(self, response):
+        """Record the quota Pexels reported on ``response`` (its rate-limit headers, or a 429)."""
+        try:
+            headers = response.headers
+            reset = headers.get('X-Ratelimit-Reset')
+            reset_at = float(reset) if reset else None
+            limit = headers.get('X-Ratelimit-Limit')
+            if response.status_code == 429:
+                remaining = 0
+                if reset_at is None:
+                    reset_at = time.time() + float(headers.get('Retry-After') or 60)
+            elif headers.get('X-Ratelimit-Remaining') is not None:
+                remaining = int(headers['X-Ratelimit-Remaining'])
+            else:
+                return
+            self._connect().execute(
+                'UPDATE pexels_quota SET remaining = ?, quota_limit = COALESCE(?, quota_limit), reset_at = ? WHERE id = 0',
+                (remaining, int(limit) if limit else None, reset_at)
+            )
+        except Exception as e:
+            image_log.error("Pexels quota update failed: %s", e)
+
+    def stats(self):
+        """Return the shared quota state and this process's allowed/skipped counters."""
+        try:
+            row = self._connect().execute(
+                'SELECT tokens, remaining, quota_limit, reset_at FROM pexels_quota WHERE id = 0'
+            ).fetchone()
+        except Exception:
+            row = (None, None, None, None)
+        with self._stats_lock:
+            return {
+                'tokens': row[0],
+                'remaining': row[1],
+                'limit': row[2],
+                'reset_at': row[3],
+                'allowed': self.allowed,
+                'skipped': self.skipped,
+            }
+
+
+PEXELS_QUOTA = PexelsQuota(
+    IMAGE_CACHE_PATH,
+    per_hour=PEXELS_QUOTA_PER_HOUR,
+    burst=PEXELS_QUOTA_BURST,
+    low_watermark=PEXELS_QUOTA_LOW_WATERMARK
+)
+
+
+# Helper: one Pexels search request, made only if the quota allows it
+def pexels_search(params, priority=PEXELS_PRIORITY_PRIMARY, api_key=None, step='search'):
+    """
+    Search Pexels through PEXELS_QUOTA.
+
+    Args:
+        params (dict): query string parameters for the search endpoint
+        priority (int): one of the PEXELS_PRIORITY_* levels
+        api_key (str): Pexels key (defaults to the configured key)
+        step (str): which search this is, for the per-step latency metric
+
+    Returns:
+        Response: the Pexels response, or None when the search was skipped to save quota
+    """
+    if not PEXELS_QUOTA.acquire(priority):
+        image_log.debug("Pexels quota low, skipping priority %s search '%s'", priority, params.get('query'))
+        FALLBACKS.inc(path='pexels_quota_skip')
+        return None
+    with metrics.timed('pexels', PEXELS_SEARCH_SECONDS, step=step):
+        response = outbound.get(PEXELS_API_URL, headers={'Authorization': api_key or pexels_api_key()}, params=params)
+    PEXELS_QUOTA.update(response)
+    return response
+
+
+# Helper: normalize an image filename to the form used for name matching
+def image_base_name(filename):
+    """Lowercase base name without extension, spaces replaced by underscores."""
+    return os.path.splitext(filename)[0].lower().replace(' ', '_')
+
+
+def trigrams(text):
+    """Character trigrams of ``text``, padded so prefixes and suffixes count too."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """
+    Character-trigram inverted index for fuzzy name matching.
+
+    Each trigram maps to the ids of the names containing it. A query reads the
+    posting lists of its own trigrams, rarest first, and skips very common
+    trigrams (like the ``_pexels`` suffix) once it has candidates, so the work
+    is bounded by the posting lists of the query's rarer trigrams instead of
+    a pass over every name. The top-k candidates by trigram overlap are then
+    re-scored with ``difflib.SequenceMatcher`` so accepted matches keep the
+    same similarity meaning as a full difflib scan.
+    """
+
+    def __init__(self, names=()):
+        self._names = []        # id -> name
+        self._gram_counts = []  # id -> number of distinct trigrams
+        self._ids = {}          # name -> id
+        self._postings = {}     # trigram -> list of ids
+        for name in names:
+            self.add(name)
+
+    def __len__(self):
+        return len(self._names)
+
+    def add(self, name):
+        if name in self._ids:
+            return
+        grams = trigrams(name)
+        idx = len(self._names)
+        self._names.append(name)
+        self._gram_counts.append(len(grams))
+        self._ids[name] = idx
+        for gram in grams:
+            self._postings.setdefault(gram, []).append(idx)
+
+    def candidates(self, query, k=20):
+        """Return up to ``k`` names with the highest trigram (Jaccard) overlap with ``query``."""
+        grams = trigrams(query)
+        postings = sorted((self._postings[g] for g in grams if g in self._postings), key=len)
+        if not postings:
+            return []
+        # posting lists longer than this only add noise once rarer grams found candidates
+        common = max(64, len(self._names) // 8)
+        overlap = Counter()
+        for posting in postings:
+            if len(posting) > common and overlap:
+                break
+            overlap.update(posting)
+        query_count = len(grams)
+        scored = ((n / (query_count + self._gram_counts[idx] - n), idx) for idx, n in overlap.items())
+        return [self._names[idx] for _, idx in heapq.nlargest(k, scored)]
+
+    def best_match(self, query, threshold=0.5, k=20):
+        """
+        Return ``(ratio, name)`` for the most similar indexed name, re-scored with
+        difflib, or None when the best ratio is not above ``threshold``.
+        """
+        best = None
+        for name in self.candidates(query, k):
+            ratio = difflib.SequenceMatcher(None, query, name).ratio()
+            if best is None or (ratio, name) > best:
+                best = (ratio, name)
+        if best and best[0] > threshold:
+            return best
+        return None
+
+
+class ImageCatalog:
+    """
+    In-memory index of the files in static/images.
+
+    Built once at startup so image lookups are hash-map hits instead of
+    ``os.listdir``/``os.path.exists`` calls. Code that writes an image calls
+    :meth:`add`; files written by anything else are picked up by comparing the
+    directory mtime, checked at most every ``recheck_interval`` seconds.
+    """
+
+    def __init__(self, images_dir, recheck_interval=2.0):
+        self.images_dir = images_dir
+        self.recheck_interval = recheck_interval
+        self._lock = threading.Lock()
+        self._sizes = {}      # filename -> size in bytes
+        self._by_base = {}    # normalized base name -> filename
+        self._fuzzy = TrigramIndex()  # trigram index over normalized base names
+        self._dir_mtime = None
+        self._checked_at = 0.0
+        self._generation = 0  # bumped whenever the set of files may have changed
+        self.refresh(force=True)
+
+    def refresh(self, force=False):
+        """Rebuild the index if the images directory changed on disk."""
+        now = time.time()
+        if not force and now - self._checked_at < self.recheck_interval:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.stat(self.images_dir).st_mtime
+        except OSError:
+            mtime = None
+        if not force and mtime == self._dir_mtime:
+            return
+        sizes = {}
+        try:
+            with os.scandir(self.images_dir) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        sizes[entry.name] = entry.stat().st_size
+        except OSError:
+            pass
+        by_base, fuzzy = {}, TrigramIndex()
+        for name in sorted(sizes):
+            self._index_name(name, by_base, fuzzy)
+        with self._lock:
+            self._sizes, self._by_base, self._fuzzy = sizes, by_base, fuzzy
+            self._dir_mtime = mtime
+            self._generation += 1
+
+    @staticmethod
+    def _index_name(name, by_base, fuzzy):
+        base = image_base_name(name)
+        if base not in by_base:
+            by_base[base] = name
+            fuzzy.add(base)
+
+    def add(self, filename):
+        """
+        Record a file that was just written under the images directory.
+
+        The directory mtime the write produced is recorded too, so the next
+        refresh() does not rescan the directory for a change it already knows.
+        """
+        try:
+            size = os.path.getsize(os.path.join(self.images_dir, filename))
+            mtime = os.stat(self.images_dir).st_mtime
+        except OSError:
+            return
+        with self._lock:
+            is_new = filename not in self._sizes
+            self._sizes[filename] = size
+            self._dir_mtime = mtime
+            if is_new:
+                self._index_name(filename, self._by_base, self._fuzzy)
+                self._generation += 1
+
+    def generation(self):
+        """A counter that changes whenever files are added to or removed from the catalog."""
+        self.refresh()
+        return self._generation
+
+    def size(self, filename):
+        """Size of ``filename`` in bytes, or None if it is not in the catalog."""
+        self.refresh()
+        return self._sizes.get(filename)
+
+    def exists(self, filename):
+        return self.size(filename) is not None
+
+    def find_base(self, base_norm):
+        """Return the file whose normalized base name equals ``base_norm`` (or None)."""
+        self.refresh()
+        return self._by_base.get(base_norm)
+
+    def fuzzy_find(self, base_norm, threshold=0.5):
+        """Return the file whose base name is most similar to ``base_norm``, if the ratio is above ``threshold``."""
+        self.refresh()
+        match = self._fuzzy.best_match(base_norm, threshold)
+        return self._by_base[match[1]] if match else None
+
+    def names(self):
+        self.refresh()
+        return list(self._sizes)
+
+    def static_size(self, path):
+        """Size of a '/static/images/<file>' path, or None when it is not a known image."""
+        prefix = '/static/images/'
+        if not isinstance(path, str) or not path.startswith(prefix):
+            return None
+        return self.size(path[len(prefix):].split('?', 1)[0])
+
+
+IMAGE_CATALOG = ImageCatalog(os.path.join(app.root_path, 'static', 'images'))
+
+
+class StaticFingerprints:
+    """
+    Content-hash fingerprints for files under static/.
+
+    ``url('/static/images/x.jpg')`` returns ``/static/images/x.jpg?v=<hash>``,
+    where the hash is taken from the file's bytes. The URL changes whenever the
+    content does, so fingerprinted responses can be cached by browsers for a
+    year without revalidation. Digests are kept per file and recomputed only
+    when its mtime or size changes.
+    """
+
+    def __init__(self, static_dir, url_prefix='/static/'):
+        self.static_dir = static_dir
+        self.url_prefix = url_prefix
+        self._lock = threading.Lock()
+        self._digests = {}  # relative path -> ((mtime_ns, size), digest)
+        self._generation = 0  # bumped whenever a digest is (re)computed
+
+    def digest(self, rel):
+        """Content hash of the static file ``rel``, or None when it does not exist."""
+        full = safe_join(self.static_dir, rel)
+        if full is None:
+            return None
+        try:
+            st = os.stat(full)
+        except OSError:
+            return None
+        stamp = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            cached = self._digests.get(rel)
+        if cached and cached[0] == stamp:
+            return cached[1]
+        h = hashlib.sha1()
+        try:
+            with open(full, 'rb') as fh:
+                for block in iter(lambda: fh.read(65536), b''):
+                    h.update(block)
+        except OSError:
+            return None
+        digest = h.hexdigest()[:12]
+        with self._lock:
+            self._digests[rel] = (stamp, digest)
+            self._generation += 1
+        return digest
+
+    def generation(self):
+        """A counter that changes whenever a file's fingerprint is computed anew."""
+        return self._generation
+
+    def url(self, path):
+        """
+        The fingerprinted URL of a '/static/...' path.
+
+        Any query already on ``path`` is replaced, so this can be applied more
+        than once. Other paths (remote URLs, missing files) are returned unchanged.
+        """
+        if not isinstance(path, str) or not path.startswith(self.url_prefix):
+            return path
+        bare = path.split('?', 1)[0]
+        digest = self.digest(bare[len(self.url_prefix):])
+        return f'{bare}?v={digest}' if digest else path
+
+    def is_current(self, path, version):
+        """True when ``version`` is the fingerprint of the static file at ``path``."""
+        if not version or not path.startswith(self.url_prefix):
+            return False
+        return self.digest(path[len(self.url_prefix):]) == version
+
+
+STATIC_FINGERPRINTS = StaticFingerprints(os.path.join(app.root_path, 'static'))
+# Cache lifetime of fingerprinted static responses (their URL changes with their content)
+STATIC_IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+# Helper: the fingerprinted URL of a file under static/, for templates
+@app.template_global()
+def asset_url(filename):
+    return STATIC_FINGERPRINTS.url('/static/' + filename.lstrip('/'))
+
+
+@app.after_request
+def cache_fingerprinted_static(response):
+    """Let browsers keep static files requested by their current fingerprint for a year."""
+    if request.endpoint == 'static' and response.status_code in (200, 206, 304) \
+            and STATIC_FINGERPRINTS.is_current(request.path, request.args.get('v')):
+        response.cache_control.no_cache = None  # set by send_file when SEND_FILE_MAX_AGE_DEFAULT is 0
+        response.cache_control.public = True
+        response.cache_control.max_age = STATIC_IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+        response.expires = time.time() + STATIC_IMMUTABLE_MAX_AGE
+    return response
 
 
 # Helper: validate if a recipe matches the requested difficulty level
@@ -48,7 +909,28 @@ def validate_recipe_difficulty(recipe, requested_difficulty):
     """
     if not requested_difficulty:
         return True
-        
+
+    level = requested_difficulty.lower()
+    if level not in DIFFICULTY_COUNT_RANGES:
+        return True  # Default: allow if difficulty not recognized
+    bands = recipe.get('difficulty_bands')
+    if bands is None:
+        # not classified yet (e.g. built ad hoc): fall back to parsing it now
+        ingredient_count, step_count = recipe_complexity_counts(recipe)
+        return counts_match_difficulty(ingredient_count, step_count, level)
+    return level in bands
+
+
+# (min, max) ingredient and step counts per difficulty level; None means unbounded
+DIFFICULTY_COUNT_RANGES = {
+    'easy': ((3, 6), (3, 5)),
+    'moderate': ((6, 10), (6, 8)),
+    'complex': ((10, None), (8, None)),
+}
+
+
+def recipe_complexity_counts(recipe):
+    """Return (ingredient_count, step_count) for a recipe, as used by the difficulty check."""
     ingredients = recipe.get('ingredients', [])
     instructions = recipe.get('instructions', '')
     
@@ -64,17 +946,67 @@ def validate_recipe_difficulty(recipe, requested_difficulty):
         step_count = len(steps)
     else:
         step_count = 0
-    
-    requested_difficulty = requested_difficulty.lower()
-    
-    if requested_difficulty == 'easy':
-        return 3 <= ingredient_count <= 6 and 3 <= step_count <= 5
-    elif requested_difficulty == 'moderate':
-        return 6 <= ingredient_count <= 10 and 6 <= step_count <= 8
-    elif requested_difficulty == 'complex':
-        return ingredient_count >= 10 and step_count >= 8
-    
-    return True  # Default: allow if difficulty not recognized
+    return ingredient_count, step_count
+
+
+def counts_match_difficulty(ingredient_count, step_count, requested_difficulty):
+    """Check ingredient/step counts against DIFFICULTY_COUNT_RANGES for a difficulty level."""
+    ranges = DIFFICULTY_COUNT_RANGES.get(requested_difficulty.lower())
+    if not ranges:
+        return True  # Default: allow if difficulty not recognized
+    for value, (low, high) in zip((ingredient_count, step_count), ranges):
+        if value < low or (high is not None and value > high):
+            return False
+    return True
+
+
+# Helper: precompute complexity features for a batch of recipes
+def classify_recipes(recipes):
+    """
+    Store ``ingredient_count``, ``step_count`` and ``difficulty_bands`` on each recipe.
+
+    Instructions are parsed once per recipe; the difficulty bands are then
+    derived level by level over the whole batch of counts, so filtering by
+    difficulty later is a membership test on ``difficulty_bands`` (a recipe
+    can sit in two overlapping bands, e.g. 6 ingredients is easy and moderate).
+
+    Args:
+        recipes: iterable of recipe dicts, updated in place
+
+    Returns:
+        list: the same recipe dicts
+    """
+    recipes = [r for r in recipes if isinstance(r, dict)]
+    counts = [recipe_complexity_counts(r) for r in recipes]
+    ingredient_counts = [ic for ic, _ in counts]
+    step_counts = [sc for _, sc in counts]
+    bands = [[] for _ in recipes]
+    for level, ((ing_low, ing_high), (step_low, step_high)) in DIFFICULTY_COUNT_RANGES.items():
+        for i, (ic, sc) in enumerate(zip(ingredient_counts, step_counts)):
+            if (ing_low <= ic and (ing_high is None or ic <= ing_high)
+                    and step_low <= sc and (step_high is None or sc <= step_high)):
+                bands[i].append(level)
+    for recipe, ic, sc, recipe_bands in zip(recipes, ingredient_counts, step_counts, bands):
+        recipe['ingredient_count'] = ic
+        recipe['step_count'] = sc
+        recipe['difficulty_bands'] = recipe_bands
+    return recipes
+
+
+def recipe_complexity(recipe):
+    """(ingredient_count, step_count, difficulty_bands) for a recipe, classifying it on first use."""
+    if 'difficulty_bands' not in recipe:
+        classify_recipes([recipe])
+    return recipe['ingredient_count'], recipe['step_count'], recipe['difficulty_bands']
+
+
+# Fields classify_recipes adds for matching; they are not part of a recipe's API shape
+COMPLEXITY_FIELDS = ('ingredient_count', 'step_count', 'difficulty_bands')
+
+
+# Helper: a recipe without its internal complexity fields, for responses and storage
+def public_recipe(recipe):
+    return {k: v for k, v in recipe.items() if k not in COMPLEXITY_FIELDS}
 
 # Helper: extract main ingredients for better image searches
 def extract_main_ingredient(recipe_data):
@@ -140,8 +1072,15 @@ def fetch_ingredient_image(recipe_data, cuisine_hint=''):
     except Exception:
         return fetch_fallback_image(recipe_data.get('name', ''), cuisine_hint)
 
-# Helper: try searching Pexels for a relevant image and cache it locally.
+# Helper: try searching Pexels for a relevant image and cache it locally; returns
+# the image's fingerprinted URL
 def fetch_fallback_image(name_hint, cuisine_hint=''):
+    return STATIC_FINGERPRINTS.url(fetch_fallback_image_path(name_hint, cuisine_hint))
+
+
+# Helper: the '/static/images/<file>' path behind fetch_fallback_image() (the form
+# kept in IMAGE_LOOKUP_CACHE)
+def fetch_fallback_image_path(name_hint, cuisine_hint=''):
     try:
         query = (name_hint or cuisine_hint or '').strip()
         if not query:
@@ -176,32 +1115,22 @@ def fetch_fallback_image(name_hint, cuisine_hint=''):
             query = f"{query} dish bowl"
         images_dir = os.path.join(app.root_path, 'static', 'images')
         os.makedirs(images_dir, exist_ok=True)
-        # load PEXELS key from env or .env
-        PEXELS_KEY = _os.environ.get('PEXELS_API_KEY')
-        if not PEXELS_KEY:
-            possible = [os.path.join(app.root_path, '.env'), os.path.join(app.root_path, 'data', '.env')]
-            for p in possible:
-                if os.path.exists(p):
-                    with open(p, 'r', encoding='utf-8') as fh:
-                        for line in fh:
-                            if line.strip().startswith('PEXELS_API_KEY'):
-                                parts = line.split('=', 1)
-                                if len(parts) > 1:
-                                    PEXELS_KEY = parts[1].strip().strip('"').strip("'")
-                                    _os.environ['PEXELS_API_KEY'] = PEXELS_KEY
-                                    break
-                if PEXELS_KEY:
-                    break
+        PEXELS_KEY = pexels_api_key()
         if not PEXELS_KEY:
             return '/static/images/quinoa_salad.jpg'
-        headers = {'Authorization': PEXELS_KEY}
+        # reuse a previous lookup for the same query (a cached "no result" skips Pexels too)
+        cache_key = normalize_lookup_key('fallback', query, name_hint)
+        found, cached = IMAGE_LOOKUP_CACHE.get(cache_key)
+        if found and (cached is None or IMAGE_CATALOG.static_size(cached) is not None):
+            return cached or '/static/images/quinoa_salad.jpg'
         params = {'query': query, 'per_page': 1}
-        r = requests.get('https://api.pexels.com/v1/search', headers=headers, params=params, timeout=8)
-        if r.status_code != 200:
+        r = pexels_search(params, PEXELS_PRIORITY_SECONDARY, PEXELS_KEY, step='fallback image')
+        if r is None or r.status_code != 200:
             return '/static/images/quinoa_salad.jpg'
         j = r.json()
         photos = j.get('photos') or []
         if not photos:
+            IMAGE_LOOKUP_CACHE.set(cache_key, None)
             return '/static/images/quinoa_salad.jpg'
         photo = photos[0]
         src = photo.get('src', {}).get('medium') or photo.get('src', {}).get('original')
@@ -211,13 +1140,17 @@ def fetch_fallback_image(name_hint, cuisine_hint=''):
         safe = secure_filename((name_hint or query).lower().replace(' ', '_'))
         filename = safe + '_pexels.jpg'
         dest = os.path.join(images_dir, filename)
-        if os.path.exists(dest) and os.path.getsize(dest) > 200:
+        if (IMAGE_CATALOG.size(filename) or 0) > 200:
+            IMAGE_LOOKUP_CACHE.set(cache_key, '/static/images/' + filename)
             return '/static/images/' + filename
         try:
-            resp = requests.get(src, timeout=8)
+            with metrics.timed('image-download', IMAGE_DOWNLOAD_SECONDS, source='fallback image'):
+                resp = outbound.get(src)
             if resp.status_code == 200 and resp.headers.get('Content-Type','').startswith('image'):
                 with open(dest, 'wb') as fh:
                     fh.write(resp.content)
+                IMAGE_CATALOG.add(filename)
+                IMAGE_LOOKUP_CACHE.set(cache_key, '/static/images/' + filename)
                 return '/static/images/' + filename
         except Exception:
             return '/static/images/quinoa_salad.jpg'
@@ -225,43 +1158,418 @@ def fetch_fallback_image(name_hint, cuisine_hint=''):
         return '/static/images/quinoa_salad.jpg'
 
 
-# In-memory store for AI-generated recipes so details can be fetched by id
-AI_RECIPES = {}
+# AI recipe store: 'sqlite' (a database shared by every thread and gunicorn worker
+# on the machine) or 'memory' (this process only), and its file
+RECIPE_STORE = (os.environ.get('RECIPE_STORE') or 'sqlite').strip().lower()
+RECIPE_STORE_PATH = os.environ.get('RECIPE_STORE_PATH') or os.path.join(app.root_path, 'data', 'recipes.sqlite3')
+# AI recipe store limits: recipes kept, their estimated memory, and seconds a
+# recipe stays available after it was last stored
+AI_RECIPES_MAX_ENTRIES = int(os.environ.get('AI_RECIPES_MAX_ENTRIES') or 2000)
+AI_RECIPES_MAX_BYTES = int(os.environ.get('AI_RECIPES_MAX_BYTES') or 32 * 1024 * 1024)
+AI_RECIPES_TTL = int(os.environ.get('AI_RECIPES_TTL') or 24 * 3600)
 
-# Simple in-memory recipe "database" for prototype
-RECIPES = [
-    {
-        "id": 1,
-        "name": "Chana Masala",
-        "cuisine": "Indian",
-        "time": 30,
-        "diet": "vegetarian",
-        "difficulty": "moderate",
-        "taste": "spicy",
-        "image": "/static/images/chana_masala.jpg",
-        "short": "Hearty chickpea curry with warming spices.",
-        "ingredients": ["2 cups chickpeas (cooked)", "1 onion", "2 tomatoes", "ginger", "garlic", "cumin", "coriander", "garam masala"],
-        "meal_types": ["lunch", "dinner"],
-        "instructions": "Heat oil in pan. Sauté chopped onions until golden. Add ginger and garlic, cook 2 minutes. Add tomatoes and cook until soft. Add cumin, coriander and garam masala. Add chickpeas and simmer 15 minutes. Garnish with cilantro.",
-        "nutrition": {"calories": 350, "protein": 15, "fat": 8, "carbs": 55}
-    },
-    {
-        "id": 2,
-        "name": "Paneer Butter Masala",
-        "cuisine": "Indian",
-        "time": 25,
-        "diet": "vegetarian",
-        "difficulty": "easy",
-        "taste": "savory",
-        "image": "/static/images/paneer_butter_masala.jpg",
-        "short": "Creamy tomato gravy with soft paneer cubes.",
-        "ingredients": ["200g paneer", "tomato puree", "cream", "butter", "onion"],
-        "meal_types": ["lunch", "dinner"],
-        "instructions": "Heat butter in pan. Cook tomato puree until thick. Add cream and simmer. Add paneer cubes gently. Season with salt.",
-        "nutrition": {"calories": 450, "protein": 20, "fat": 30, "carbs": 18}
-    },
-    {
-        "id": 3,
+
+# Helper: approximate memory held by a recipe (sys.getsizeof over nested dicts, lists and strings)
+def estimate_size(obj):
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(estimate_size(v) for v in obj)
+    return size
+
+
+# AI recipe ids are random numbers in [2**52, 2**53): far above the built-in and
+# catalog ids, exact as JavaScript numbers, and unique across workers and
+# instances without coordination (the stores also refuse to reuse a stored id)
+AI_RECIPE_ID_MIN = 2 ** 52
+
+
+def new_recipe_id():
+    return AI_RECIPE_ID_MIN + secrets.randbits(52)
+
+
+class MemoryRecipeStore:
+    """
+    Bounded, thread-safe in-memory store of AI-generated recipes by id.
+
+    Entries expire ``ttl`` seconds after they were last stored or updated.
+    Past ``max_entries`` recipes or ``max_bytes`` of estimated memory, the
+    least recently used ones are evicted (the newest recipe always stays).
+    Expired entries are dropped when looked up and swept every
+    ``SWEEP_EVERY`` writes. Recipes are returned by reference; changes that
+    should count against the memory cap go through ``update``.
+    """
+
+    SWEEP_EVERY = 64
+
+    def __init__(self, max_entries=2000, max_bytes=32 * 1024 * 1024, ttl=24 * 3600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = {'lru': 0, 'bytes': 0, 'expired': 0}
+        self._bytes = 0
+        self._writes = 0
+        self._entries = OrderedDict()  # id -> [recipe, size, expires_at]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, rid):
+        return self.get(rid) is not None
+
+    def _drop(self, rid, reason):
+        _, size, _ = self._entries.pop(rid)
+        self._bytes -= size
+        self.evictions[reason] += 1
+        AI_RECIPE_EVICTIONS.inc(reason=reason)
+
+    def _live(self, rid, now):
+        entry = self._entries.get(rid)
+        if entry is not None and entry[2] <= now:
+            self._drop(rid, 'expired')
+            entry = None
+        return entry
+
+    def _store(self, rid, recipe, now):
+        entry = self._entries.pop(rid, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+        size = estimate_size(recipe)
+        self._entries[rid] = [recipe, size, now + self.ttl]
+        self._bytes += size
+        self._writes += 1
+        if self._writes % self.SWEEP_EVERY == 0:
+            for key in [k for k, e in self._entries.items() if e[2] <= now]:
+                self._drop(key, 'expired')
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._drop(oldest, 'lru' if len(self._entries) > self.max_entries else 'bytes')
+
+    def get(self, rid, default=None):
+        """The recipe stored under ``rid`` (marking it recently used), or ``default``."""
+        with self._lock:
+            entry = self._live(rid, time.time())
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(rid)
+            self.hits += 1
+            return entry[0]
+
+    def version(self, rid):
+        """
+        A stamp that changes whenever the recipe under ``rid`` is stored or
+        updated (its expiry, which every write renews), or None when it is not
+        stored. Cheaper than ``get`` for checking whether a recipe changed.
+        """
+        with self._lock:
+            entry = self._live(rid, time.time())
+            if entry is None:
+                return None
+            self._entries.move_to_end(rid)
+            return entry[2]
+
+    def add(self, recipe):
+        """Store ``recipe`` under a new id (also set as its ``id``) and return the id."""
+        with self._lock:
+            rid = new_recipe_id()
+            while rid in self._entries:
+                rid = new_recipe_id()
+            recipe['id'] = rid
+            self._store(rid, recipe, time.time())
+            return rid
+
+    def put(self, rid, recipe):
+        """Store ``recipe`` under ``rid``, evicting old recipes as needed."""
+        with self._lock:
+            self._store(rid, recipe, time.time())
+
+    def update(self, rid, **fields):
+        """
+        Set ``fields`` on the stored recipe and re-account its size.
+
+        Returns:
+            bool: False when ``rid`` is no longer stored
+        """
+        with self._lock:
+            now = time.time()
+            entry = self._live(rid, now)
+            if entry is None:
+                return False
+            entry[0].update(fields)
+            self._store(rid, entry[0], now)
+            return True
+
+    def stats(self):
+        """Return this process's entry count, estimated bytes, hit/miss and eviction counters."""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': dict(self.evictions),
+            }
+
+
+class SQLiteRecipeStore:
+    """
+    AI-generated recipes in a SQLite database shared by all threads and workers.
+
+    Same interface and limits as MemoryRecipeStore, so a recipe generated by
+    one gunicorn worker can be opened and expanded through any other. Recipes
+    are stored as JSON (their size is the JSON length) and ``get`` returns a
+    fresh copy, so changes must go through ``update``, which merges the fields
+    in one write transaction. The database runs in WAL mode: readers never
+    block the writer. Expired and excess entries are evicted every
+    ``EVICT_EVERY`` writes. A database error is logged and treated as a miss.
+    """
+
+    # Only refresh last_access when it is older than this, to keep reads read-only
+    TOUCH_INTERVAL = 60
+    EVICT_EVERY = 32
+
+    def __init__(self, path, max_entries=2000, max_bytes=32 * 1024 * 1024, ttl=24 * 3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = {'lru': 0, 'bytes': 0, 'expired': 0}
+        self._writes = 0
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS ai_recipes ('
+                ' id INTEGER PRIMARY KEY, data TEXT NOT NULL, size INTEGER NOT NULL,'
+                ' expires_at REAL NOT NULL, last_access REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS ai_recipes_last_access ON ai_recipes(last_access)')
+            self._local.conn = conn
+        return conn
+
+    def _count(self, attr):
+        with self._stats_lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+    def __len__(self):
+        try:
+            return self._connect().execute(
+                'SELECT COUNT(*) FROM ai_recipes WHERE expires_at > ?', (time.time(),)).fetchone()[0]
+        except Exception as e:
+            log.error("Recipe store count failed: %s", e)
+            return 0
+
+    def __contains__(self, rid):
+        return self.get(rid) is not None
+
+    def get(self, rid, default=None):
+        """A copy of the recipe stored under ``rid``, or ``default``."""
+        try:
+            now = time.time()
+            conn = self._connect()
+            row = conn.execute(
+                'SELECT data, expires_at, last_access FROM ai_recipes WHERE id = ?', (rid,)).fetchone()
+            if not row or row[1] <= now:
+                self._count('misses')
+                return default
+            if now - row[2] > self.TOUCH_INTERVAL:
+                conn.execute('UPDATE ai_recipes SET last_access = ? WHERE id = ?', (now, rid))
+            self._count('hits')
+            return json.loads(row[0])
+        except Exception as e:
+            log.error("Recipe store read failed: %s", e)
+            self._count('misses')
+            return default
+
+    def version(self, rid):
+        """A stamp that changes whenever ``rid`` is stored or updated (see MemoryRecipeStore.version), or None."""
+        try:
+            now = time.time()
+            conn = self._connect()
+            row = conn.execute('SELECT expires_at, last_access FROM ai_recipes WHERE id = ?', (rid,)).fetchone()
+            if not row or row[0] <= now:
+                return None
+            if now - row[1] > self.TOUCH_INTERVAL:
+                conn.execute('UPDATE ai_recipes SET last_access = ? WHERE id = ?', (now, rid))
+            return row[0]
+        except Exception as e:
+            log.error("Recipe store read failed: %s", e)
+            return None
+
+    def _write(self, conn, sql, rid, recipe):
+        data = json.dumps(recipe, default=str)
+        now = time.time()
+        conn.execute(sql, (rid, data, len(data), now + self.ttl, now))
+        with self._stats_lock:
+            self._writes += 1
+            due = self._writes % self.EVICT_EVERY == 0
+        if due:
+            self.evict()
+
+    def add(self, recipe):
+        """
+        Store ``recipe`` under a new id (also set as its ``id``) and return the id.
+
+        Returns:
+            int: the id, or None when the recipe could not be stored (e.g. the
+            database stayed locked); ``recipe`` then has no ``id``
+        """
+        try:
+            conn = self._connect()
+            for _ in range(5):
+                rid = recipe['id'] = new_recipe_id()
+                try:
+                    self._write(conn, 'INSERT INTO ai_recipes (id, data, size, expires_at, last_access)'
+                                      ' VALUES (?, ?, ?, ?, ?)', rid, recipe)
+                    return rid
+                except sqlite3.IntegrityError:
+                    continue  # id already taken
+            log.error("Recipe store write failed: no free id after 5 attempts")
+        except Exception as e:
+            log.error("Recipe store write failed: %s", e)
+        recipe.pop('id', None)
+        return None
+
+    def put(self, rid, recipe):
+        """Store ``recipe`` under ``rid``, replacing what was there."""
+        try:
+            self._write(self._connect(), 'INSERT OR REPLACE INTO ai_recipes (id, data, size, expires_at, last_access)'
+                                         ' VALUES (?, ?, ?, ?, ?)', rid, recipe)
+        except Exception as e:
+            log.error("Recipe store write failed: %s", e)
+
+    def update(self, rid, **fields):
+        """
+        Set ``fields`` on the stored recipe (read and written in one transaction).
+
+        Returns:
+            bool: False when ``rid`` is no longer stored
+        """
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute('SELECT data FROM ai_recipes WHERE id = ? AND expires_at > ?',
+                                   (rid, time.time())).fetchone()
+                if row:
+                    recipe = json.loads(row[0])
+                    recipe.update(fields)
+                    data = json.dumps(recipe, default=str)
+                    now = time.time()
+                    conn.execute('UPDATE ai_recipes SET data = ?, size = ?, expires_at = ?, last_access = ? WHERE id = ?',
+                                 (data, len(data), now + self.ttl, now, rid))
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            return bool(row)
+        except Exception as e:
+            log.error("Recipe store update failed: %s", e)
+            return False
+
+    def _evicted(self, reason, removed):
+        if removed > 0:
+            with self._stats_lock:
+                self.evictions[reason] += removed
+            AI_RECIPE_EVICTIONS.inc(removed, reason=reason)
+
+    def evict(self):
+        """Drop expired recipes, then the least recently used beyond ``max_entries`` or ``max_bytes``."""
+        try:
+            conn = self._connect()
+            self._evicted('expired', conn.execute('DELETE FROM ai_recipes WHERE expires_at <= ?', (time.time(),)).rowcount)
+            excess = conn.execute('SELECT COUNT(*) FROM ai_recipes').fetchone()[0] - self.max_entries
+            if excess > 0:
+                self._evicted('lru', conn.execute(
+                    'DELETE FROM ai_recipes WHERE id IN '
+                    '(SELECT id FROM ai_recipes ORDER BY last_access LIMIT ?)', (excess,)).rowcount)
+            # newest first: everything past the first max_bytes goes (keeping at least one recipe)
+            self._evicted('bytes', conn.execute(
+                'DELETE FROM ai_recipes WHERE id IN (SELECT id FROM ('
+                ' SELECT id, SUM(size) OVER (ORDER BY last_access DESC, id) AS total,'
+                ' ROW_NUMBER() OVER (ORDER BY last_access DESC, id) AS n FROM ai_recipes)'
+                ' WHERE total > ? AND n > 1)', (self.max_bytes,)).rowcount)
+        except Exception as e:
+            log.error("Recipe store eviction failed: %s", e)
+
+    def stats(self):
+        """Return the stored recipe count and JSON bytes, and this process's hit/miss and eviction counters."""
+        try:
+            entries, size = self._connect().execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM ai_recipes WHERE expires_at > ?', (time.time(),)
+            ).fetchone()
+        except Exception as e:
+            log.error("Recipe store stats failed: %s", e)
+            entries, size = 0, 0
+        with self._stats_lock:
+            return {
+                'entries': entries,
+                'bytes': size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': dict(self.evictions),
+            }
+
+
+# Helper: the configured AI recipe store (another backend only needs the same
+# get/version/add/put/update/stats methods)
+def make_recipe_store():
+    if RECIPE_STORE == 'memory':
+        return MemoryRecipeStore(AI_RECIPES_MAX_ENTRIES, AI_RECIPES_MAX_BYTES, AI_RECIPES_TTL)
+    return SQLiteRecipeStore(RECIPE_STORE_PATH, AI_RECIPES_MAX_ENTRIES, AI_RECIPES_MAX_BYTES, AI_RECIPES_TTL)
+
+
+# Store for AI-generated recipes so details can be fetched by id
+AI_RECIPES = make_recipe_store()
+
+# Simple in-memory recipe "database" for prototype
+RECIPES = [
+    {
+        "id": 1,
+        "name": "Chana Masala",
+        "cuisine": "Indian",
+        "time": 30,
+        "diet": "vegetarian",
+        "difficulty": "moderate",
+        "taste": "spicy",
+        "image": "/static/images/chana_masala.jpg",
+        "short": "Hearty chickpea curry with warming spices.",
+        "ingredients": ["2 cups chickpeas (cooked)", "1 onion", "2 tomatoes", "ginger", "garlic", "cumin", "coriander", "garam masala"],
+        "meal_types": ["lunch", "dinner"],
+        "instructions": "Heat oil in pan. Sauté chopped onions until golden. Add ginger and garlic, cook 2 minutes. Add tomatoes and cook until soft. Add cumin, coriander and garam masala. Add chickpeas and simmer 15 minutes. Garnish with cilantro.",
+        "nutrition": {"calories": 350, "protein": 15, "fat": 8, "carbs": 55}
+    },
+    {
+        "id": 2,
+        "name": "Paneer Butter Masala",
+        "cuisine": "Indian",
+        "time": 25,
+        "diet": "vegetarian",
+        "difficulty": "easy",
+        "taste": "savory",
+        "image": "/static/images/paneer_butter_masala.jpg",
+        "short": "Creamy tomato gravy with soft paneer cubes.",
+        "ingredients": ["200g paneer", "tomato puree", "cream", "butter", "onion"],
+        "meal_types": ["lunch", "dinner"],
+        "instructions": "Heat butter in pan. Cook tomato puree until thick. Add cream and simmer. Add paneer cubes gently. Season with salt.",
+        "nutrition": {"calories": 450, "protein": 20, "fat": 30, "carbs": 18}
+    },
+    {
+        "id": 3,
         "name": "Spaghetti Aglio e Olio",
         "cuisine": "Italian",
         "time": 20,
@@ -324,6 +1632,509 @@ RECIPES = [
 ]
 
 
+# Helper: singular/plural variants of an ingredient token (no external libs)
+def token_variants(tok):
+    variants = set()
+    variants.add(tok)
+    variants.add(tok + 's')
+    variants.add(tok + 'es')
+    # y -> ies and reverse
+    if tok.endswith('y'):
+        variants.add(tok[:-1] + 'ies')
+    if tok.endswith('ies'):
+        variants.add(tok[:-3] + 'y')
+    # if token looks plural, add singular guess
+    if tok.endswith('s') and len(tok) > 1:
+        variants.add(tok[:-1])
+        if tok.endswith('es'):
+            variants.add(tok[:-2])
+    return variants
+
+
+class RecipeIndex:
+    """
+    Inverted indexes over a recipe list for local ingredient matching.
+
+    Every word of every ingredient line maps to the ids of the recipes that use
+    it, and every word of a recipe's name/short text to the recipes that
+    mention it. A query token is folded into its singular/plural variants
+    (see :func:`token_variants`) and looked up in the posting lists, which
+    gives exactly the result of running ``token_in_text`` over every
+    ingredient, without scanning the catalog.
+
+    Facet values (cuisine, diet, taste, meal type, difficulty band) are kept
+    as int bitsets over catalog positions, so a filter combination is a few
+    ANDs (see :meth:`filter_mask`) and broadening just skips the masks.
+    """
+
+    def __init__(self, recipes=()):
+        self._generation = 0  # bumped whenever a recipe is added or replaced
+        self._by_id = {}
+        self._position = {}
+        self._ordered_ids = []
+        self._ingredient_postings = {}  # ingredient word -> set of recipe ids
+        self._text_postings = {}        # name/short word -> set of recipe ids
+        self._all_bits = 0
+        self._facet_bits = {facet: {} for facet in self.FACETS}  # facet -> value -> bitset
+        for recipe in recipes:
+            self.add(recipe)
+
+    # 'meal' holds a bit per meal type plus '*' for recipes without meal_types
+    # (they accept any meal); 'difficulty' holds one bit per matching band.
+    FACETS = ('cuisine', 'diet', 'taste', 'meal', 'difficulty')
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def add(self, recipe):
+        rid = recipe['id']
+        self._by_id[rid] = recipe
+        self._generation += 1
+        if rid in self._position:
+            self._clear_facets(self._position[rid])
+        else:
+            self._position[rid] = len(self._ordered_ids)
+            self._ordered_ids.append(rid)
+        self._index_facets(self._position[rid], recipe)
+        for ing in recipe.get('ingredients', []):
+            for word in re.findall(r"\w+", ing.lower()):
+                self._ingredient_postings.setdefault(word, set()).add(rid)
+        name_short = ' '.join([recipe.get('name', ''), recipe.get('short', '')]).lower()
+        for word in re.findall(r"\w+", name_short):
+            self._text_postings.setdefault(word, set()).add(rid)
+
+    def update(self, recipe):
+        """Replace one recipe (e.g. after attaching an expansion)."""
+        self.add(recipe)
+
+    def generation(self):
+        """A counter that changes whenever a recipe is added or replaced."""
+        return self._generation
+
+    def _clear_facets(self, pos):
+        bit = 1 << pos
+        for values in self._facet_bits.values():
+            for value, bits in values.items():
+                if bits & bit:
+                    values[value] = bits & ~bit
+
+    def _index_facets(self, pos, recipe):
+        bit = 1 << pos
+        self._all_bits |= bit
+        facet_values = {
+            'cuisine': [(recipe.get('cuisine') or '').lower()],
+            'diet': [(recipe.get('diet') or '').lower()],
+            'taste': [(recipe.get('taste') or '').lower()],
+            'meal': [m.lower() for m in recipe.get('meal_types', [])] if 'meal_types' in recipe else ['*'],
+        }
+        facet_values['difficulty'] = recipe_complexity(recipe)[2]
+        for facet, values in facet_values.items():
+            bits = self._facet_bits[facet]
+            for value in values:
+                bits[value] = bits.get(value, 0) | bit
+
+    def _facet_mask(self, facet, value):
+        bits = self._facet_bits[facet]
+        if facet == 'diet':
+            # substring semantics, as in recipe_passes_filters ('vegetarian' matches 'vegetarian, gluten-free')
+            mask = 0
+            for stored, stored_bits in bits.items():
+                if value in stored:
+                    mask |= stored_bits
+            return mask
+        if facet == 'meal':
+            return bits.get(value, 0) | bits.get('*', 0)
+        if facet == 'difficulty':
+            if value.lower() not in DIFFICULTY_COUNT_RANGES:
+                return self._all_bits  # unrecognized difficulty filters nothing
+            return bits.get(value.lower(), 0)
+        return bits.get(value, 0)
+
+    def filter_mask(self, filters=None, cuisine=''):
+        """Bitset of catalog positions passing ``filters`` (and of ``cuisine``, when given)."""
+        mask = self._all_bits
+        for facet in ('cuisine', 'diet', 'taste', 'meal', 'difficulty'):
+            value = (filters or {}).get(facet)
+            if value:
+                mask &= self._facet_mask(facet, value)
+                if not mask:
+                    break
+        if cuisine and mask:
+            mask &= self._facet_mask('cuisine', cuisine)
+        return mask
+
+    def _passes(self, mask, rid):
+        return (mask >> self._position[rid]) & 1
+
+    def get(self, rid):
+        return self._by_id.get(rid)
+
+    def _ids_in_order(self, ids):
+        return sorted(ids, key=self._position.__getitem__)
+
+    def in_order(self, ids):
+        """Recipes for ``ids`` in catalog order."""
+        return [self._by_id[rid] for rid in self._ids_in_order(ids)]
+
+    def ingredient_matches(self, tokens):
+        """Map recipe id -> tokens found in its ingredients (in query order, plural-insensitive)."""
+        matches = {}
+        for tok in tokens:
+            ids = set()
+            for variant in token_variants(tok):
+                ids |= self._ingredient_postings.get(variant, set())
+            for rid in ids:
+                matches.setdefault(rid, []).append(tok)
+        return matches
+
+    def text_matches(self, tokens):
+        """Map recipe id -> tokens found as whole words in its name or short description."""
+        matches = {}
+        for tok in tokens:
+            for rid in self._text_postings.get(tok, ()):
+                matches.setdefault(rid, []).append(tok)
+        return matches
+
+    # The methods below are the recipe-source interface shared with RecipeCatalog.
+
+    def search(self, tokens, filters=None, limit=3):
+        """
+        Recipes passing ``filters`` whose ingredients match at least one token,
+        as (recipe, matched tokens) pairs: most matched tokens first, ties in
+        catalog order.
+        """
+        hits = self.ingredient_matches(tokens)
+        mask = self.filter_mask(filters)
+        ranked = [(self._by_id[rid], hits[rid]) for rid in self._ids_in_order(hits) if self._passes(mask, rid)]
+        ranked.sort(key=lambda item: len(item[1]), reverse=True)
+        return ranked[:limit]
+
+    def text_search(self, tokens, filters=None, limit=3):
+        """Recipes passing ``filters`` whose name/short text contains a token, in catalog order."""
+        hits = self.text_matches(tokens)
+        mask = self.filter_mask(filters)
+        return [(self._by_id[rid], hits[rid]) for rid in self._ids_in_order(hits) if self._passes(mask, rid)][:limit]
+
+    def first_matching(self, filters=None, cuisine='', limit=3):
+        """The first ``limit`` recipes passing ``filters`` (and of ``cuisine``, when given)."""
+        mask = self.filter_mask(filters, cuisine)
+        found = []
+        while mask and len(found) < limit:
+            low = mask & -mask  # lowest set bit = earliest catalog position
+            found.append(self._by_id[self._ordered_ids[low.bit_length() - 1]])
+            mask ^= low
+        return found
+
+    def matched_tokens(self, ids, tokens):
+        """Map each recipe id in ``ids`` -> tokens found in its ingredients or name/short text."""
+        in_ingredients = self.ingredient_matches(tokens)
+        in_text = self.text_matches(tokens)
+        return {
+            rid: [tok for tok in tokens if tok in in_ingredients.get(rid, ()) or tok in in_text.get(rid, ())]
+            for rid in ids
+        }
+
+
+# Helper: the local filter chain as a dict, so it can run in Python or as SQL
+def local_recipe_filters(cuisine='', diet='', difficulty='', taste='', meal='', broaden=False):
+    """Normalize the requested filters; an empty dict means "no filtering" (broaden)."""
+    if broaden:
+        return {}
+    return {
+        # strict cuisine filter unless the user picked 'something else' / 'other'
+        'cuisine': cuisine if cuisine not in ('', 'something else', 'other') else '',
+        # diet filter (ignore if user said 'none' or left blank)
+        'diet': diet if diet != 'none' else '',
+        'difficulty': difficulty or '',
+        'taste': taste or '',
+        'meal': (meal or '').lower(),
+    }
+
+
+def recipe_passes_filters(recipe, filters):
+    """Apply the filters built by local_recipe_filters to one recipe."""
+    if not filters:
+        return True
+    if filters.get('cuisine') and (recipe.get('cuisine') or '').lower() != filters['cuisine']:
+        return False
+    if filters.get('diet') and filters['diet'] not in (recipe.get('diet') or '').lower():
+        return False
+    # difficulty filter (validate complexity requirements)
+    if filters.get('difficulty') and not validate_recipe_difficulty(recipe, filters['difficulty']):
+        return False
+    if filters.get('taste') and (recipe.get('taste') or '').lower() != filters['taste']:
+        return False
+    # meal type filter (recipes without meal_types accept any meal)
+    if filters.get('meal') and 'meal_types' in recipe:
+        if filters['meal'] not in [m.lower() for m in recipe.get('meal_types', [])]:
+            return False
+    return True
+
+
+class RecipeCatalog:
+    """
+    Recipe catalog stored in SQLite, for catalogs too large to keep in every worker.
+
+    Recipes live as JSON in the ``recipes`` table next to indexed facet columns
+    (cuisine, diet, difficulty, taste, ingredient/step counts) and a
+    ``recipe_meals`` table for meal types. An FTS5 table indexes name, short
+    text and ingredients. It offers the same search interface as RecipeIndex,
+    so the local branch of suggest_recipes works with either; only the
+    recipes that are returned get decoded.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._connect()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript('''
+                CREATE TABLE IF NOT EXISTS recipes (
+                    id INTEGER PRIMARY KEY,
+                    position INTEGER NOT NULL,
+                    name TEXT NOT NULL,
+                    cuisine TEXT NOT NULL DEFAULT '',
+                    diet TEXT NOT NULL DEFAULT '',
+                    difficulty TEXT NOT NULL DEFAULT '',
+                    taste TEXT NOT NULL DEFAULT '',
+                    ingredient_count INTEGER NOT NULL DEFAULT 0,
+                    step_count INTEGER NOT NULL DEFAULT 0,
+                    has_meal_types INTEGER NOT NULL DEFAULT 0,
+                    data TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS recipes_position ON recipes(position);
+                CREATE INDEX IF NOT EXISTS recipes_cuisine ON recipes(cuisine, position);
+                CREATE INDEX IF NOT EXISTS recipes_diet ON recipes(diet);
+                CREATE INDEX IF NOT EXISTS recipes_difficulty ON recipes(difficulty);
+                CREATE INDEX IF NOT EXISTS recipes_taste ON recipes(taste);
+                CREATE INDEX IF NOT EXISTS recipes_counts ON recipes(ingredient_count, step_count);
+                CREATE TABLE IF NOT EXISTS recipe_meals (
+                    recipe_id INTEGER NOT NULL,
+                    meal TEXT NOT NULL,
+                    PRIMARY KEY (recipe_id, meal)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS recipe_meals_meal ON recipe_meals(meal, recipe_id);
+                CREATE VIRTUAL TABLE IF NOT EXISTS recipes_fts USING fts5(
+                    name, short, ingredients,
+                    tokenize = "unicode61 remove_diacritics 0 tokenchars '_'"
+                );
+                CREATE TABLE IF NOT EXISTS catalog_meta (
+                    key TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                );
+            ''')
+            self._local.conn = conn
+        return conn
+
+    def __len__(self):
+        return self._connect().execute('SELECT COUNT(*) FROM recipes').fetchone()[0]
+
+    def generation(self):
+        """A counter bumped by every import or update, from any process using the catalog."""
+        row = self._connect().execute("SELECT value FROM catalog_meta WHERE key = 'generation'").fetchone()
+        return row[0] if row else 0
+
+    @staticmethod
+    def _bump_generation(conn):
+        conn.execute("INSERT INTO catalog_meta (key, value) VALUES ('generation', 1) "
+                     "ON CONFLICT(key) DO UPDATE SET value = value + 1")
+
+    def import_recipes(self, recipes, replace=False):
+        """
+        Bulk-load recipe dicts in one transaction. Recipes without an id get the
+        next free one. Returns the number of recipes written.
+        """
+        recipes = classify_recipes(recipes)
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if replace:
+                conn.execute('DELETE FROM recipes')
+                conn.execute('DELETE FROM recipe_meals')
+                conn.execute('DELETE FROM recipes_fts')
+            next_id, position = conn.execute(
+                'SELECT COALESCE(MAX(id), 0) + 1, COALESCE(MAX(position), -1) + 1 FROM recipes'
+            ).fetchone()
+            count = 0
+            for recipe in recipes:
+                if not recipe.get('id'):
+                    recipe = dict(recipe, id=next_id)
+                next_id = max(next_id, int(recipe['id']) + 1)
+                self._write(conn, recipe, position)
+                position += 1
+                count += 1
+            self._bump_generation(conn)
+            conn.execute('COMMIT')
+            return count
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def update(self, recipe):
+        """Rewrite one recipe in place (e.g. after attaching an expansion)."""
+        conn = self._connect()
+        row = conn.execute('SELECT position FROM recipes WHERE id = ?', (recipe['id'],)).fetchone()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            self._write(conn, recipe, row[0] if row else len(self))
+            self._bump_generation(conn)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    @staticmethod
+    def _write(conn, recipe, position):
+        rid = int(recipe['id'])
+        ingredient_count, step_count, _ = recipe_complexity(recipe)
+        conn.execute(
+            'INSERT OR REPLACE INTO recipes (id, position, name, cuisine, diet, difficulty, taste, '
+            'ingredient_count, step_count, has_meal_types, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (rid, position, recipe.get('name') or '', (recipe.get('cuisine') or '').lower(),
+             (recipe.get('diet') or '').lower(), (recipe.get('difficulty') or '').lower(),
+             (recipe.get('taste') or '').lower(), ingredient_count, step_count,
+             1 if 'meal_types' in recipe else 0, json.dumps(public_recipe(recipe), ensure_ascii=False))
+        )
+        conn.execute('DELETE FROM recipe_meals WHERE recipe_id = ?', (rid,))
+        conn.executemany(
+            'INSERT OR IGNORE INTO recipe_meals (recipe_id, meal) VALUES (?, ?)',
+            [(rid, m.lower()) for m in recipe.get('meal_types') or []]
+        )
+        conn.execute('DELETE FROM recipes_fts WHERE rowid = ?', (rid,))
+        conn.execute(
+            'INSERT INTO recipes_fts (rowid, name, short, ingredients) VALUES (?, ?, ?, ?)',
+            (rid, recipe.get('name') or '', recipe.get('short') or '', '\n'.join(recipe.get('ingredients') or []))
+        )
+
+    def get(self, rid):
+        row = self._connect().execute('SELECT data FROM recipes WHERE id = ?', (rid,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    @staticmethod
+    def _fts_terms(words):
+        return ' OR '.join('"' + w.replace('"', '""') + '"' for w in sorted(words))
+
+    def _ingredient_match(self, tok):
+        return 'ingredients : (' + self._fts_terms(token_variants(tok)) + ')'
+
+    def _text_match(self, tok):
+        return '{name short} : (' + self._fts_terms([tok]) + ')'
+
+    @staticmethod
+    def _filter_sql(filters):
+        """WHERE clauses and parameters equivalent to recipe_passes_filters."""
+        clauses, params = [], []
+        if not filters:
+            return clauses, params
+        if filters.get('cuisine'):
+            clauses.append('r.cuisine = ?')
+            params.append(filters['cuisine'])
+        if filters.get('diet'):
+            clauses.append('instr(r.diet, ?) > 0')
+            params.append(filters['diet'])
+        ranges = DIFFICULTY_COUNT_RANGES.get(filters.get('difficulty') or '')
+        if ranges:
+            for column, (low, high) in zip(('r.ingredient_count', 'r.step_count'), ranges):
+                clauses.append(f'{column} >= ?')
+                params.append(low)
+                if high is not None:
+                    clauses.append(f'{column} <= ?')
+                    params.append(high)
+        if filters.get('taste'):
+            clauses.append('r.taste = ?')
+            params.append(filters['taste'])
+        if filters.get('meal'):
+            clauses.append('(r.has_meal_types = 0 OR EXISTS '
+                           '(SELECT 1 FROM recipe_meals m WHERE m.meal = ? AND m.recipe_id = r.id))')
+            params.append(filters['meal'])
+        return clauses, params
+
+    def _ranked(self, tokens, match_for, filters, limit, order='r.position'):
+        if not tokens:
+            return []
+        per_token = ' + '.join(['(r.id IN (SELECT rowid FROM recipes_fts WHERE recipes_fts MATCH ?))'] * len(tokens))
+        clauses, params = self._filter_sql(filters)
+        clauses.append('r.id IN (SELECT rowid FROM recipes_fts WHERE recipes_fts MATCH ?)')
+        matches = [match_for(tok) for tok in tokens]
+        sql = (f'SELECT r.data, {per_token} AS hits FROM recipes r WHERE ' + ' AND '.join(clauses) +
+               f' ORDER BY {order} LIMIT ?')
+        rows = self._connect().execute(sql, matches + params + [' OR '.join(f'({m})' for m in matches), limit]).fetchall()
+        results = []
+        for data, _ in rows:
+            recipe = json.loads(data)
+            results.append((recipe, self.matched_tokens([recipe['id']], tokens, match_for)[recipe['id']]))
+        return results
+
+    def search(self, tokens, filters=None, limit=3):
+        return self._ranked(tokens, self._ingredient_match, filters, limit, order='hits DESC, r.position')
+
+    def text_search(self, tokens, filters=None, limit=3):
+        return self._ranked(tokens, self._text_match, filters, limit)
+
+    def first_matching(self, filters=None, cuisine='', limit=3):
+        clauses, params = self._filter_sql(filters)
+        if cuisine:
+            clauses.append('r.cuisine = ?')
+            params.append(cuisine)
+        where = (' WHERE ' + ' AND '.join(clauses)) if clauses else ''
+        rows = self._connect().execute(
+            f'SELECT r.data FROM recipes r{where} ORDER BY r.position LIMIT ?', params + [limit]
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def matched_tokens(self, ids, tokens, match_for=None):
+        """Map each recipe id in ``ids`` -> tokens found in its ingredients or name/short text."""
+        ids = list(ids)
+        result = {rid: [] for rid in ids}
+        if not ids or not tokens:
+            return result
+        conn = self._connect()
+        marks = ','.join('?' * len(ids))
+        for tok in tokens:
+            matchers = [match_for] if match_for else [self._ingredient_match, self._text_match]
+            query = ' OR '.join(f'({m(tok)})' for m in matchers)
+            rows = conn.execute(
+                f'SELECT rowid FROM recipes_fts WHERE recipes_fts MATCH ? AND rowid IN ({marks})', [query] + ids
+            ).fetchall()
+            for (rid,) in rows:
+                result[rid].append(tok)
+        return result
+
+
+# Optional SQLite recipe catalog (see `flask import-recipes`); when unset the
+# built-in RECIPES list is served from memory through RECIPE_INDEX.
+RECIPE_CATALOG_PATH = os.environ.get('RECIPE_CATALOG_PATH') or ''
+RECIPE_CATALOG = None
+if RECIPE_CATALOG_PATH:
+    try:
+        RECIPE_CATALOG = RecipeCatalog(RECIPE_CATALOG_PATH)
+        if len(RECIPE_CATALOG) == 0:
+            RECIPE_CATALOG.import_recipes(RECIPES)
+        log.info("Recipe catalog loaded from %s: %s recipes", RECIPE_CATALOG_PATH, len(RECIPE_CATALOG))
+    except Exception as e:
+        log.error("Could not open recipe catalog %s: %s", RECIPE_CATALOG_PATH, e)
+        RECIPE_CATALOG = None
+
+
+def recipe_source():
+    """The recipe source used for local matching: the SQLite catalog if configured, else RECIPE_INDEX."""
+    return RECIPE_CATALOG if RECIPE_CATALOG is not None else RECIPE_INDEX
+
+
+def get_local_recipe(rid):
+    """Look up a curated (non-AI) recipe by id."""
+    return recipe_source().get(rid)
+
+
+RECIPE_INDEX = RecipeIndex(classify_recipes(RECIPES))
+
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -332,7 +2143,7 @@ def index():
 @app.route('/api/cache-image', methods=['POST'])
 def cache_image():
     """Fetch an external image URL and save it under static/images with a hashed filename.
-    Returns a JSON object with {'local': '/static/images/<file>'} on success or {'error': '...'}.
+    Returns a JSON object with {'local': '/static/images/<file>?v=<hash>'} on success or {'error': '...'}.
     """
     data = request.get_json() or {}
     url = data.get('url')
@@ -351,41 +2162,54 @@ def cache_image():
         fname = secure_filename(f'cached_{h}{ext}')
         dest = os.path.join(os.path.dirname(__file__), 'static', 'images', fname)
         # if file already exists and non-empty, reuse it
-        if os.path.exists(dest) and os.path.getsize(dest) > 200:
-            return jsonify({'local': '/static/images/' + fname})
+        if (IMAGE_CATALOG.size(fname) or 0) > 200:
+            return jsonify({'local': STATIC_FINGERPRINTS.url('/static/images/' + fname)})
         # fetch the remote image with a short timeout
+        download_started = time.perf_counter()
         try:
-            r = requests.get(url, stream=True, timeout=8)
+            r = outbound.get(url, stream=True)
         except Exception:
             r = None
-        if not r or r.status_code != 200 or not r.headers.get('Content-Type','').startswith('image'):
+        # a streamed response holds its pooled connection until closed, on every path
+        try:
+            usable = r is not None and r.status_code == 200 and r.headers.get('Content-Type', '').startswith('image')
+            if usable:
+                with open(dest, 'wb') as f:
+                    for chunk in r.iter_content(8192):
+                        if chunk:
+                            f.write(chunk)
+        finally:
+            if r is not None:
+                r.close()
+        if not usable:
             # fallback: try to resolve via our normalization (which will try Pexels/Unsplash)
             try:
                 local = fetch_fallback_image(name_hint, cuisine_hint)
                 return jsonify({'local': local})
             except Exception as e:
                 return jsonify({'error': 'fetch_failed', 'detail': str(e)}), 502
-        with open(dest, 'wb') as f:
-            for chunk in r.iter_content(8192):
-                if chunk:
-                    f.write(chunk)
+        metrics.record('image-download', time.perf_counter() - download_started, IMAGE_DOWNLOAD_SECONDS, source='cache-image')
+        IMAGE_CATALOG.add(fname)
         # small wait to ensure filesystem sync on some platforms
         time.sleep(0.05)
-        return jsonify({'local': '/static/images/' + fname})
+        return jsonify({'local': STATIC_FINGERPRINTS.url('/static/images/' + fname)})
     except Exception as e:
         return jsonify({'error': 'exception', 'detail': str(e)}), 500
 
 
 # Fallback recipe generation when main OpenAI query fails or returns no results
-def try_fallback_recipe_generation(ingredients, cuisine=None, difficulty=None, tokens=None):
+def generate_fallback_items(ingredients, cuisine=None, difficulty=None):
     """
     Fallback OpenAI recipe generation with a simpler, more flexible prompt
     that focuses on generating recipes using the given ingredients.
+
+    Returns:
+        list: up to three recipe items (empty when nothing usable came back)
     """
     try:
-        OPENAI_KEY = _os.environ.get('OPENAI_API_KEY')
+        OPENAI_KEY = load_openai_key()
         if not OPENAI_KEY:
-            return jsonify({'cards': []})
+            return []
         
         # Create a simpler, more focused prompt with enhanced difficulty guidelines
         cuisine_hint = f" in {cuisine} style" if cuisine else ""
@@ -418,32 +2242,30 @@ Return ONLY a JSON array with this exact format:
   }}
 ]"""
 
-        print(f"[DEBUG] Fallback generation prompt: {prompt_text[:200]}...")
+        openai_log.debug("Fallback generation prompt: %s...", prompt_text[:200])
         
-        from openai import OpenAI
-        client = OpenAI(api_key=OPENAI_KEY)
+        model_to_use = config.settings().openai_model
         
-        model_to_use = os.environ.get('OPENAI_MODEL') or 'gpt-3.5-turbo'
-        
-        resp = client.chat.completions.create(
-            model=model_to_use,
-            messages=[{'role': 'user', 'content': prompt_text}],
-            max_tokens=600,
-            temperature=0.7
-        )
+        with metrics.timed('openai', OPENAI_SECONDS, model=model_to_use, kind='fallback'):
+            resp = outbound.openai_chat(
+                OPENAI_KEY,
+                model=model_to_use,
+                messages=[{'role': 'user', 'content': prompt_text}],
+                max_tokens=600,
+                temperature=0.7
+            )
         
         text = resp.choices[0].message.content
-        print(f"[DEBUG] Fallback OpenAI response: {text[:200]}...")
+        openai_log.debug("Fallback OpenAI response: %s...", text[:200])
         
         # Extract JSON array from response
-        import re as _re
-        m = _re.search(r"(\[\s*\{.*?\}\s*\])", text, _re.S)
+        m = re.search(r"(\[\s*\{.*?\}\s*\])", text, re.S)
         if m:
             raw = m.group(1)
             items = json.loads(raw)
             if isinstance(items, list) and items:
-                cards = []
-                for i, item in enumerate(items[:3]):
+                items = items[:3]
+                for item in items:
                     # Ensure required fields
                     if not item.get('name'):
                         item['name'] = f"Recipe with {ingredients}"
@@ -453,33 +2275,63 @@ Return ONLY a JSON array with this exact format:
                         item['difficulty'] = difficulty or 'easy'
                     if not item.get('cuisine'):
                         item['cuisine'] = cuisine or 'International'
-                    
-                    # Generate a proper image using Pexels API
-                    image_path = fetch_pexels_image(item.get('name', ''), fallback_query=ingredients)
-                    
-                    # Store full recipe data
-                    ai_id = item.get('id') or (2000 + i)
-                    AI_RECIPES[ai_id] = item
-                    
-                    card = {
-                        'id': ai_id,
-                        'name': item['name'],
-                        'image': image_path,
-                        'image_url': image_path,  # Provide both fields for frontend compatibility
-                        'short': item['short'][:140],
-                        'difficulty': item.get('difficulty', difficulty or 'easy'),
-                        'matched_tokens': tokens or []
-                    }
-                    cards.append(card)
-                
-                print(f"[DEBUG] Fallback generation successful: {len(cards)} recipes")
-                return jsonify({'cards': cards})
+                # Complexity features are stored with the recipe when it enters AI_RECIPES
+                classify_recipes(items)
+                return items
         
-        print("[DEBUG] Fallback generation failed - no valid JSON found")
-        return jsonify({'cards': []})
+        openai_log.info("Fallback generation failed - no valid JSON found")
+        return []
         
     except Exception as e:
-        print(f"[DEBUG] Fallback generation error: {str(e)}")
+        openai_log.warning("Fallback generation error: %s", e)
+        return []
+
+
+def fallback_cards_response(items, ingredients, difficulty=None, tokens=None):
+    """Register fallback items in AI_RECIPES and return their cards as a JSON response."""
+    # Generate proper images using Pexels API, all cards at once (or later, when deferred)
+    image_paths, deferred = resolve_or_defer_images([
+        (lambda name=item.get('name', ''): fetch_pexels_image(name, fallback_query=ingredients))
+        for item in items
+    ], [item.get('name', '') for item in items])
+
+    cards = []
+    for i, item in enumerate(items):
+        image_path = image_paths[i] or get_local_food_image_fallback(item.get('name', ''))
+
+        # Store full recipe data (skipping items that could not be stored: their id would 404)
+        ai_id = AI_RECIPES.add(item)
+        if ai_id is None:
+            openai_log.warning("Dropping fallback card '%s': the recipe could not be stored", item.get('name'))
+            continue
+        
+        card = {
+            'id': ai_id,
+            'name': item['name'],
+            'image': image_path,
+            'image_url': image_path,  # Provide both fields for frontend compatibility
+            'short': item['short'][:140],
+            'difficulty': item.get('difficulty', difficulty or 'easy'),
+            'matched_tokens': tokens or []
+        }
+        if deferred[i]:
+            defer_ai_image(card, deferred[i])
+        cards.append(card)
+    
+    openai_log.info("Fallback generation successful: %s recipes", len(cards))
+    return jsonify({'cards': cards})
+
+
+def try_fallback_recipe_generation(ingredients, cuisine=None, difficulty=None, tokens=None):
+    """Run the fallback prompt and return its cards (empty when it produced nothing usable)."""
+    FALLBACKS.inc(path='openai_fallback_prompt')
+    items = generate_fallback_items(ingredients, cuisine, difficulty)
+    if not items:
+        return jsonify({'cards': []})
+    try:
+        return fallback_cards_response(items, ingredients, difficulty, tokens)
+    except Exception as e:
+        openai_log.warning("Fallback generation error: %s", e)
         return jsonify({'cards': []})
 
 def get_fallback_image_for_recipe(recipe, ingredients):
@@ -508,8 +2360,7 @@ def get_fallback_image_for_recipe(recipe, ingredients):
         for ingredient, image in image_mappings.items():
             if ingredient in ingredients_lower or ingredient in name_lower:
                 # Verify the image file exists
-                image_path = os.path.join(app.root_path, 'static', 'images', image)
-                if os.path.exists(image_path):
+                if IMAGE_CATALOG.exists(image):
                     return f'/static/images/{image}'
         
         # Default fallback
@@ -522,30 +2373,229 @@ def fetch_pexels_image(recipe_name, fallback_query=None):
     """
     Fetch a high-quality food image from Pexels API with enhanced fallback logic
     
+    Results are remembered in IMAGE_LOOKUP_CACHE keyed on the normalized recipe
+    name, including "no result" outcomes (with a shorter TTL), so repeated
+    dishes skip the Pexels round trips entirely.
+    
+    Args:
+        recipe_name (str): Name of the recipe to search for
+        fallback_query (str): Additional fallback search term (usually ingredients)
+    
+    Returns:
+        str: Image URL from Pexels or guaranteed local fallback path
+    """
+    # Skip API calls if no key configured
+    if not pexels_api_key():
+        image_log.debug("Pexels API key not configured, using local fallback")
+        return get_local_food_image_fallback(recipe_name)
+
+    cache_key = normalize_lookup_key('pexels', recipe_name)
+    found, cached = IMAGE_LOOKUP_CACHE.get(cache_key)
+    if found:
+        if cached:
+            image_log.debug("Image cache hit for '%s'", recipe_name)
+            return cached
+        image_log.debug("Image cache negative hit for '%s', using local image", recipe_name)
+        return get_local_food_image_fallback(recipe_name)
+
+    if outbound.circuit_open(PEXELS_API_URL):
+        image_log.info("Pexels circuit open, using local image for '%s'", recipe_name)
+        FALLBACKS.inc(path='image_local')
+        return get_local_food_image_fallback(recipe_name)
+
+    errors = []
+    search = search_pexels_cascade if PEXELS_SEARCH_MODE == 'cascade' else search_pexels_ranked
+    result = search(recipe_name, fallback_query, errors)
+    # Only remember "no result" when Pexels actually answered; transient
+    # failures should be retried on the next request.
+    if result or not errors:
+        IMAGE_LOOKUP_CACHE.set(cache_key, result)
+    if result:
+        return result
+
+    image_log.info("All Pexels searches failed for '%s', using local image", recipe_name)
+    FALLBACKS.inc(path='image_local')
+    
+    # Guaranteed local fallback - never return empty
+    return get_local_food_image_fallback(recipe_name)
+
+# Common ingredient extraction patterns for image searches
+PEXELS_INGREDIENT_KEYWORDS = [
+    'fish', 'chicken', 'beef', 'pork', 'lamb', 'mutton', 'shrimp', 'prawn',
+    'paneer', 'tofu', 'egg', 'potato', 'tomato', 'rice', 'pasta', 'noodles',
+    'lentil', 'bean', 'chickpea', 'vegetable', 'mushroom', 'cheese'
+]
+
+# Generic food category fallbacks, in order of preference
+PEXELS_GENERIC_SEARCHES = [
+    "homemade food", "cooking food", "delicious meal",
+    "food dish", "kitchen cooking", "restaurant food"
+]
+
+# Words that say nothing about the dish itself when ranking photos
+_RANKING_STOPWORDS = {'with', 'and', 'the', 'for', 'style', 'easy', 'quick', 'simple', 'homemade'}
+_GENERIC_FOOD_WORDS = {'food', 'dish', 'meal', 'cooking', 'plate', 'bowl', 'cuisine', 'dinner', 'lunch'}
+
+
+def find_pexels_main_ingredient(text):
+    """Return the first known ingredient keyword contained in ``text`` (or None)."""
+    for ingredient in PEXELS_INGREDIENT_KEYWORDS:
+        if ingredient in text:
+            return ingredient
+    return None
+
+
+def find_pexels_fallback_ingredient(fallback_query):
+    """Return the first ingredient keyword named in a comma separated ingredients string."""
+    if not fallback_query or not fallback_query.strip():
+        return None
+    for word in fallback_query.strip().lower().replace(',', ' ').split():
+        if len(word) > 3 and word in PEXELS_INGREDIENT_KEYWORDS:
+            return word
+    return None
+
+
+# Helper: the lowercased text of a Pexels photo (alt text and page URL slug) and its words
+def pexels_photo_text(photo):
+    slug = (photo.get('url') or '').rstrip('/').rsplit('/', 1)[-1]
+    text = ' '.join([photo.get('alt') or '', slug.replace('-', ' ')]).lower()
+    return text, set(re.findall(r"[a-z]+", text))
+
+
+def score_pexels_name(photo, recipe_name):
+    """
+    The recipe-name part of score_pexels_photo: 8 for the exact name plus up
+    to 4 for the share of name words the photo mentions (0 when it mentions none).
+    """
+    text, words = pexels_photo_text(photo)
+    score = 0.0
+    if recipe_name and recipe_name in text:
+        score += 8
+    name_tokens = [w for w in re.findall(r"[a-z]+", recipe_name) if len(w) > 2 and w not in _RANKING_STOPWORDS]
+    if name_tokens:
+        score += 4 * sum(1 for w in name_tokens if w in words or w + 's' in words) / len(name_tokens)
+    return score
+
+
+def score_pexels_photo(photo, recipe_name, main_ingredient=None, fallback_ingredient=None):
+    """
+    Score how well a Pexels photo describes a dish, using its alt text and the
+    descriptive slug in its page URL.
+
+    The weights follow the order of the old search cascade: the exact recipe
+    name beats individual name words, which beat the main ingredient, the
+    fallback ingredient and finally generic food words.
+    """
+    text, words = pexels_photo_text(photo)
+    score = score_pexels_name(photo, recipe_name)
+    if main_ingredient and main_ingredient in text:
+        score += 2
+    if fallback_ingredient and fallback_ingredient in text:
+        score += 1
+    if words & _GENERIC_FOOD_WORDS:
+        score += 0.5
+    return score
+
+
+def search_pexels_ranked(recipe_name, fallback_query=None, errors=None):
+    """
+    Search Pexels with one or two wide requests and rank the photos locally.
+
+    The first request searches the recipe name with a larger ``per_page``. Only
+    when none of those photos mention any word of the recipe name is a second
+    request made, for the main (or fallback) ingredient, or a generic food
+    query. Compared with the cascade this needs 1-2 calls per card instead of
+    up to 11.
+    
+    Args:
+        recipe_name (str): Name of the recipe to search for
+        fallback_query (str): Additional fallback search term (usually ingredients)
+        errors (list): if given, receives one entry per failed (non-200 or exception) request
+    
+    Returns:
+        str: Image URL from Pexels, or None when both searches came back empty
+    """
+    def search_photos(query, priority):
+        try:
+            params = {'query': query, 'per_page': PEXELS_RANKED_PER_PAGE, 'size': 'medium'}
+            response = pexels_search(params, priority, step='ranked')
+            if response is None:
+                if errors is not None:
+                    errors.append('quota')
+                return []
+            if response.status_code == 200:
+                return response.json().get('photos', []) or []
+            if errors is not None:
+                errors.append(response.status_code)
+        except Exception as e:
+            image_log.error("Pexels search failed '%s': %s", query, e)
+            if errors is not None:
+                errors.append(str(e))
+        return []
+
+    clean_recipe = recipe_name.strip().lower()
+    main_ingredient = find_pexels_main_ingredient(clean_recipe)
+    fallback_ingredient = find_pexels_fallback_ingredient(fallback_query)
+    second_query = f"{main_ingredient or fallback_ingredient} food" if (main_ingredient or fallback_ingredient) else PEXELS_GENERIC_SEARCHES[0]
+
+    image_log.debug("Starting ranked image search for recipe: '%s'", recipe_name)
+    candidates = []
+    name_match = 0.0  # best recipe-name score so far
+    queries = [(clean_recipe, PEXELS_PRIORITY_PRIMARY)] if clean_recipe else []
+    queries.append((second_query, PEXELS_PRIORITY_GENERIC if second_query in PEXELS_GENERIC_SEARCHES
+                    else PEXELS_PRIORITY_SECONDARY))
+    for query, priority in queries:
+        for photo in search_photos(query, priority):
+            if (photo.get('src') or {}).get('medium'):
+                # ties keep Pexels' own relevance order (earlier query, earlier photo)
+                rank = (score_pexels_photo(photo, clean_recipe, main_ingredient, fallback_ingredient), -len(candidates))
+                candidates.append((rank, photo))
+                name_match = max(name_match, score_pexels_name(photo, clean_recipe))
+        # a photo that mentions the dish (by name or a name word) is good enough;
+        # skip the second request. Ingredient-only matches do not count.
+        if name_match > 0:
+            break
+
+    if not candidates:
+        image_log.debug("No Pexels results for ranked search: '%s'", recipe_name)
+        return None
+    (score, _), photo = max(candidates, key=lambda c: c[0])
+    image_url = photo['src']['medium']
+    image_log.info("Ranked Pexels image (score %.1f) for '%s' -> %s...", score, recipe_name, image_url[:60])
+    return image_url
+
+
+def search_pexels_cascade(recipe_name, fallback_query=None, errors=None):
+    """
+    Search Pexels with a cascade of progressively more generic queries.
+    
     Strategy:
     1. Search for exact recipe name (e.g., "Fish Pulusu")
     2. If no results, extract main ingredient and search (e.g., "Fish dish" or "Fish cooking") 
     3. If still no results, use generic food categories
-    4. Always return an image - never leave blank
     
     Args:
         recipe_name (str): Name of the recipe to search for
         fallback_query (str): Additional fallback search term (usually ingredients)
+        errors (list): if given, receives one entry per failed (non-200 or exception) request
     
     Returns:
-        str: Image URL from Pexels or guaranteed local fallback path
+        str: Image URL from Pexels, or None when every search came back empty
     """
-    def try_pexels_search(query, context=""):
+    def try_pexels_search(query, context="", priority=PEXELS_PRIORITY_PRIMARY):
         """Helper function to search Pexels with a given query"""
         try:
-            headers = {'Authorization': PEXELS_API_KEY}
             params = {
                 'query': query,
                 'per_page': 1,
                 'size': 'medium'
             }
             
-            response = requests.get(PEXELS_API_URL, headers=headers, params=params, timeout=8)
+            response = pexels_search(params, priority, step=context.strip('()') or 'cascade')
+            if response is None:
+                if errors is not None:
+                    errors.append('quota')
+                return None
             
             if response.status_code == 200:
                 data = response.json()
@@ -556,22 +2606,21 @@ def fetch_pexels_image(recipe_name, fallback_query=None):
                     image_url = photo.get('src', {}).get('medium', '')
                     
                     if image_url:
-                        print(f"[SUCCESS] Found Pexels image {context}: '{query}' -> {image_url[:60]}...")
+                        image_log.info("Found Pexels image %s: '%s' -> %s...", context, query, image_url[:60])
                         return image_url
+            elif errors is not None:
+                errors.append(response.status_code)
                         
-            print(f"[DEBUG] No Pexels results {context}: '{query}'")
+            image_log.debug("No Pexels results %s: '%s'", context, query)
             return None
             
         except Exception as e:
-            print(f"[ERROR] Pexels search failed {context}: {str(e)}")
+            image_log.error("Pexels search failed %s: %s", context, e)
+            if errors is not None:
+                errors.append(str(e))
             return None
     
-    # Skip API calls if no key configured
-    if not PEXELS_API_KEY or PEXELS_API_KEY == 'YOUR_PEXELS_API_KEY_HERE':
-        print(f"[DEBUG] Pexels API key not configured, using local fallback")
-        return get_local_food_image_fallback(recipe_name)
-    
-    print(f"[DEBUG] Starting image search for recipe: '{recipe_name}'")
+    image_log.debug("Starting image search for recipe: '%s'", recipe_name)
     
     # Step 1: Try exact recipe name
     clean_recipe = recipe_name.strip().lower()
@@ -585,32 +2634,22 @@ def fetch_pexels_image(recipe_name, fallback_query=None):
         return result
     
     # Step 3: Extract main ingredient and search
-    # Common ingredient extraction patterns
-    ingredient_keywords = [
-        'fish', 'chicken', 'beef', 'pork', 'lamb', 'mutton', 'shrimp', 'prawn',
-        'paneer', 'tofu', 'egg', 'potato', 'tomato', 'rice', 'pasta', 'noodles',
-        'lentil', 'bean', 'chickpea', 'vegetable', 'mushroom', 'cheese'
-    ]
-    
-    main_ingredient = None
-    for ingredient in ingredient_keywords:
-        if ingredient in clean_recipe:
-            main_ingredient = ingredient
-            break
+    ingredient_keywords = PEXELS_INGREDIENT_KEYWORDS
+    main_ingredient = find_pexels_main_ingredient(clean_recipe)
     
     if main_ingredient:
         # Try ingredient with "cooking"
-        result = try_pexels_search(f"{main_ingredient} cooking", "(ingredient + cooking)")
+        result = try_pexels_search(f"{main_ingredient} cooking", "(ingredient + cooking)", PEXELS_PRIORITY_SECONDARY)
         if result:
             return result
             
         # Try ingredient with "dish"
-        result = try_pexels_search(f"{main_ingredient} dish", "(ingredient + dish)")
+        result = try_pexels_search(f"{main_ingredient} dish", "(ingredient + dish)", PEXELS_PRIORITY_SECONDARY)
         if result:
             return result
             
         # Try just the ingredient
-        result = try_pexels_search(f"{main_ingredient} food", "(ingredient + food)")
+        result = try_pexels_search(f"{main_ingredient} food", "(ingredient + food)", PEXELS_PRIORITY_SECONDARY)
         if result:
             return result
     
@@ -622,115 +2661,778 @@ def fetch_pexels_image(recipe_name, fallback_query=None):
         fallback_words = clean_fallback.replace(',', ' ').split()
         for word in fallback_words:
             if len(word) > 3 and word in ingredient_keywords:
-                result = try_pexels_search(f"{word} cooking", "(fallback ingredient)")
+                result = try_pexels_search(f"{word} cooking", "(fallback ingredient)", PEXELS_PRIORITY_SECONDARY)
                 if result:
                     return result
                 break
     
     # Step 5: Generic food category fallbacks
-    generic_searches = [
-        "homemade food", "cooking food", "delicious meal", 
-        "food dish", "kitchen cooking", "restaurant food"
-    ]
-    
-    for generic in generic_searches:
-        result = try_pexels_search(generic, "(generic food)")
+    for generic in PEXELS_GENERIC_SEARCHES:
+        result = try_pexels_search(generic, "(generic food)", PEXELS_PRIORITY_GENERIC)
         if result:
             return result
     
-    print(f"[FALLBACK] All Pexels searches failed for '{recipe_name}', using local image")
+    return None
+
+def get_local_food_image_fallback(recipe_name):
+    """
+    Get a local food image based on recipe name/ingredients
     
-    # Step 6: Guaranteed local fallback - never return empty
-    return get_local_food_image_fallback(recipe_name)
+    Args:
+        recipe_name (str): Name of the recipe
+    
+    Returns:
+        str: Fingerprinted local image URL
+    """
+    return STATIC_FINGERPRINTS.url(local_food_image_path(recipe_name))
+
+def local_food_image_path(recipe_name):
+    """
+    Pick the local food image for a recipe name (see get_local_food_image_fallback)
+    
+    Args:
+        recipe_name (str): Name of the recipe
+    
+    Returns:
+        str: '/static/images/<file>' path
+    """
+    try:
+        recipe_lower = recipe_name.lower()
+        
+        # Enhanced mapping for better local fallbacks
+        local_mappings = {
+            # Indian dishes
+            'curry': 'chicken_curry_pexels.jpg',
+            'masala': 'paneer_butter_masala_pexels.jpg',
+            'paneer': 'paneer_butter_masala_pexels.jpg',
+            'chana': 'chana_masala.jpg',
+            'chickpea': 'chana_masala.jpg',
+            'biryani': 'rice_vegetable_pulao_pexels.jpg',
+            'pulao': 'rice_vegetable_pulao_pexels.jpg',
+            'rasam': 'tomato_tomato_rasam_pexels.jpg',
+            
+            # International dishes
+            'pasta': 'pasta_penne_pexels.jpg',
+            'spaghetti': 'pasta_penne_pexels.jpg',
+            'noodles': 'pasta_penne_pexels.jpg',
+            
+            # Ingredients
+            'chicken': 'chicken_curry_pexels.jpg',
+            'beef': 'beef_beef_tacos_pexels.jpg',
+            'fish': 'quinoa_salad.jpg',  # Generic fallback for fish
+            'egg': 'quinoa_salad.jpg',
+            'rice': 'rice_vegetable_pulao_pexels.jpg',
+            'potato': 'potato_vegetable_curry_pexels.jpg',
+            'tomato': 'tomato_tomato_rasam_pexels.jpg',
+            'vegetable': 'vegetable_stir_fry_pexels.jpg',
+            'salad': 'quinoa_salad.jpg',
+            'soup': 'quinoa_salad.jpg',
+            'lentil': 'quinoa_salad.jpg'
+        }
+        
+        # Check for matches in recipe name
+        for keyword, image in local_mappings.items():
+            if keyword in recipe_lower:
+                if IMAGE_CATALOG.exists(image):
+                    image_log.debug("Using local fallback image for '%s': %s", recipe_name, image)
+                    return f'/static/images/{image}'
+        
+        # Final fallback - check if spaghetti image exists, otherwise create default
+        spaghetti_path = '/static/images/spaghetti.jpg'
+        
+        if IMAGE_CATALOG.exists('spaghetti.jpg'):
+            image_log.debug("Using default fallback: spaghetti.jpg")
+            return spaghetti_path
+        else:
+            # Create default cooking image path - this should always exist
+            return '/static/images/default_cooking.jpg'
+        
+    except Exception as e:
+        image_log.error("Local fallback error: %s", e)
+        return '/static/images/spaghetti.jpg'  # Ultimate fallback
+
+
+def replace_placeholder_image(img_url, recipe_name='', cuisine=''):
+    """Helper function to replace placeholder URLs with real Pexels images (local paths come back fingerprinted)"""
+    if not img_url or not isinstance(img_url, str):
+        return STATIC_FINGERPRINTS.url('/static/images/quinoa_salad.jpg')
+    
+    # Check if it's a placeholder URL
+    if ('example.com' in img_url.lower() or 
+        'placeholder' in img_url.lower() or 
+        img_url.startswith('https://example.com/') or
+        img_url.startswith('http://example.com/')):
+        # Replace with real Pexels image
+        try:
+            return fetch_fallback_image(recipe_name, cuisine)
+        except:
+            return STATIC_FINGERPRINTS.url('/static/images/quinoa_salad.jpg')
+    
+    return STATIC_FINGERPRINTS.url(img_url)
+
+
+# Helper: the OpenAI API key from config (config reloads pick up key changes)
+def load_openai_key():
+    """Return OPENAI_API_KEY from the environment or a .env file (project root or data/.env), or None."""
+    return config.settings().openai_api_key
+
+
+# Helper: match an ingredient token (or its singular/plural variants) as a whole word
+def token_in_text(tok, text):
+    # consider simple variants (singular/plural) without external libs
+    for v in token_variants(tok):
+        if re.search(r"\b" + re.escape(v) + r"\b", text):
+            return True
+    return False
+
+
+# Helper: a more robust matcher that removes punctuation and normalizes whitespace
+def normalized_contains(tok, text):
+    try:
+        _nt = re.sub(r"[^a-z0-9\s]", ' ', (text or '').lower())
+        return bool(re.search(r"\b" + re.escape(tok.lower()) + r"\b", _nt))
+    except Exception:
+        return False
+
+
+# Helper: the OpenAI prompt for a suggestion request
+def build_suggestion_messages(data, ingredients, cuisine, diet, difficulty, broaden):
+    """Build the system/user chat messages asking OpenAI for up to three recipes."""
+    # Compose prompt with unique seed for each difficulty to ensure variety. Without
+    # variety mode the seed is derived from the query, so identical queries send
+    # identical prompts.
+    if SUGGESTION_CACHE_VARIETY > 1:
+        random_seed = random.randint(1000, 9999)
+    else:
+        random_seed = 1000 + int(hashlib.md5(suggestion_cache_key(data).encode('utf-8')).hexdigest(), 16) % 9000
+    prompt = {
+        'ingredients': ingredients,
+        'cuisine': cuisine,
+        'diet': diet,
+        'difficulty': difficulty,
+        'meal': data.get('meal'),
+        'broaden': bool(broaden),
+        'seed': random_seed  # Add randomness to prevent identical responses
+    }
+    # Enhanced system prompt with detailed difficulty-specific guidelines
+    system = (
+        "You are a helpful cooking assistant. Respond ONLY with a JSON array (no explanatory text). "
+        "Return up to 3 recipe objects. Each object should include the fields:"
+        " id (number), name (string), cuisine (string), short (string), image (string; optional),"
+        " ingredients (array of strings with specific quantities), instructions (string with detailed step-by-step directions), nutrition (object with calories, protein, fat, carbs), difficulty (string)."
+        " CRITICAL INSTRUCTION FORMAT: Write instructions as detailed, beginner-friendly sentences. Each step should include:"
+        " - Specific cooking times and temperatures"
+        " - Clear explanations of what to look for (e.g., 'until golden brown', 'until fragrant')"
+        " - Helpful tips for beginners"
+        " - Proper cooking techniques explained simply"
+        " - ALWAYS use specific ingredient names instead of generic terms (never say 'add all spices' - list each spice separately)"
+        " - Mention exact quantities and specific ingredients (e.g., '1/2 tsp red chili powder', '1/4 tsp saffron threads')"
+        " - Use clear, simple sentences without unnecessary words like 'Step' at the end"
+        " Example format: '1. Heat 2 tablespoons oil in a large pan over medium heat for 1-2 minutes. 2. Add finely chopped onions and sauté for 5-6 minutes until golden brown and translucent. 3. Add minced garlic, grated ginger, and 1/2 tsp red chili powder; cook for 1 minute until fragrant.'"
+        " ENHANCED DIFFICULTY GUIDELINES - Follow these strictly based on requested difficulty:"
+        " EASY RECIPES (difficulty='easy'):"
+        " - Use exactly 3-6 simple, common ingredients"
+        " - 4-6 clear, simple steps with basic cooking methods (boiling, sautéing, baking)"
+        " - Cooking time: 15-30 minutes total"
+        " - Focus on one-pot meals, sandwiches, salads, simple pasta dishes"
+        " - Avoid complex techniques like braising, reducing sauces, or multiple cooking stages"
+        " - Example: Scrambled eggs, pasta with garlic oil, simple stir-fry"
+        " MODERATE RECIPES (difficulty='moderate'):"
+        " - Use 6-10 ingredients including some specialty items or spices"
+        " - 7-10 detailed steps with intermediate techniques (marinating, sauce-making, proper seasoning)"
+        " - Cooking time: 30-60 minutes total"
+        " - Include recipes requiring timing coordination between components"
+        " - May involve multiple cooking methods or preparing sauce while cooking main ingredient"
+        " - Example: Chicken curry with homemade sauce, stuffed bell peppers, risotto"
+        " COMPLEX RECIPES (difficulty='complex'):"
+        " - Use 10+ ingredients including specialty items, multiple spices, garnishes"
+        " - 10+ comprehensive steps with advanced techniques (braising, reduction, tempering, layering)"
+        " - Cooking time: 60+ minutes, may include prep time or marinating"
+        " - Multiple cooking stages, precise timing, temperature control, flavor balancing"
+        " - Advanced techniques like making stocks, complex sauces, or multi-component dishes"
+        " - Example: Coq au vin, homemade ravioli with sauce, multi-layer lasagna"
+        " Always set the difficulty field to exactly match the requested difficulty level."
+    )
+    user = f"Generate {difficulty.upper()} difficulty recipes for this criteria: {json.dumps(prompt)}. " \
+           f"IMPORTANT: Create recipes that are SPECIFICALLY {difficulty.upper()} complexity. " \
+           f"Do NOT reuse the same recipe names or cooking methods. " \
+           f"For {difficulty}: {'Use simple ingredients and basic techniques.' if difficulty == 'easy' else 'Use moderate ingredients and intermediate techniques.' if difficulty == 'moderate' else 'Use many ingredients and advanced techniques.'} " \
+           f"Return only JSON array."
+    return [{'role': 'system', 'content': system}, {'role': 'user', 'content': user}]
+
+
+# Helper: validate a returned OpenAI item against the requested filters - more lenient approach
+def item_matches_filters(it, cuisine='', diet='', difficulty='', meal=None, broaden=False):
+    try:
+        # More lenient filtering: prefer exact matches but don't reject everything
+        score = 0  # scoring system for better matching
+        reasons = []
+
+        if not bool(broaden):
+            # cuisine: prefer exact match but don't reject if no match
+            if cuisine and it.get('cuisine'):
+                if it.get('cuisine', '').strip().lower() == cuisine:
+                    score += 2  # exact cuisine match bonus
+                else:
+                    score -= 1  # slight penalty for cuisine mismatch
+                    reasons.append(f"cuisine mismatch ({it.get('cuisine')!r} != {cuisine!r})")
+
+            # difficulty: prefer matching but allow near matches
+            if difficulty:
+                # First check if difficulty field matches exactly
+                if it.get('difficulty') and it.get('difficulty', '').strip().lower() == difficulty:
+                    score += 2  # exact difficulty match bonus
+                else:
+                    # Check complexity requirements more leniently
+                    if validate_recipe_difficulty(it, difficulty):
+                        score += 1  # complexity requirements met
+                    else:
+                        score -= 1  # slight penalty for complexity mismatch
+                        reasons.append(f"doesn't meet {difficulty} complexity requirements")
+
+            # diet: only enforce when both sides specify diet
+            if diet and diet != 'none' and it.get('diet'):
+                if diet in (it.get('diet','') or '').lower():
+                    score += 1  # diet match bonus
+                else:
+                    score -= 1  # diet mismatch penalty
+                    reasons.append(f"diet mismatch ({it.get('diet')!r} does not include {diet!r})")
+
+            # meal: check meal_types array if present
+            if meal and it.get('meal_types'):
+                sel = meal.lower()
+                mts = [m.lower() for m in (it.get('meal_types') or [])]
+                if mts and sel in mts:
+                    score += 1  # meal type match bonus
+                else:
+                    score -= 1  # meal type mismatch penalty
+                    reasons.append(f"meal_types do not include {sel}")
+
+        # Accept items with score >= -2 (allow some mismatches but not total mismatches)
+        if score >= -2:
+            if reasons:
+                openai_log.debug("OpenAI item '%s' accepted with score %s: %s", it.get('name'), score, ', '.join(reasons))
+            else:
+                openai_log.debug("OpenAI item '%s' accepted with score %s: perfect match", it.get('name'), score)
+            return True
+        else:
+            openai_log.debug("OpenAI item '%s' rejected with score %s: %s", it.get('name'), score, ', '.join(reasons))
+            return False
+
+    except Exception as e:
+        openai_log.warning("Error in item_matches_filters: %s", e)
+        return True  # If error, accept the item rather than reject it
+
+
+# Helper: matched tokens for an accepted OpenAI item (also tidies its instructions)
+def prepare_ai_item(it, tokens, broaden=False):
+    # compute matched tokens for the item
+    mt = []
+    if tokens:
+        txt_fields = ' '.join([it.get('name',''), it.get('short','')] + (it.get('ingredients') or [])).lower()
+        openai_log.debug("OpenAI item '%s' txt_fields: %s", it.get('name'), txt_fields)
+        # also append debug to the response log
+        response_log.debug('ITEM_DEBUG -- %s -- %s', it.get('name', ''), txt_fields)
+        for tok in tokens:
+            res = token_in_text(tok, txt_fields)
+            if not res:
+                # fallback to a normalized check (remove punctuation/newlines)
+                res = normalized_contains(tok, txt_fields)
+            openai_log.debug("checking token '%s' in item '%s': %s", tok, it.get('name'), res)
+            if res:
+                mt.append(tok)
+
+    # More lenient ingredient matching: require at least one token match OR accept if no ingredient tokens provided
+    if tokens and not mt and not broaden:
+        openai_log.debug("OpenAI item '%s' has no matched ingredient tokens but accepting due to lenient filtering", it.get('name'))
+        # Continue processing instead of rejecting - maybe it's a related recipe
+
+    # Clean up instructions to remove unnecessary "Step" text
+    if 'instructions' in it and isinstance(it['instructions'], str):
+        cleaned_instructions = it['instructions']
+        # Remove trailing "Step." or "Step" from each line
+        cleaned_instructions = re.sub(r'\s*step\.?\s*$', '', cleaned_instructions, flags=re.IGNORECASE)
+        cleaned_instructions = re.sub(r'\.\s*step\.?\s*', '. ', cleaned_instructions, flags=re.IGNORECASE)
+        it['instructions'] = cleaned_instructions
+
+    openai_log.debug("OpenAI item accepted: name=%s, cuisine=%s, matched_tokens=%s", it.get('name'), it.get('cuisine'), mt)
+    return mt
+
+
+# Helper: image for an OpenAI item - its own absolute URL if it has one, else a Pexels photo
+def ai_item_image(it, ingredients=''):
+    raw_img = it.get('image') or ''
+    # If AI provided an absolute URL, keep it as-is
+    if isinstance(raw_img, str) and (raw_img.lower().startswith('http://') or raw_img.lower().startswith('https://')):
+        return raw_img
+    # Use Pexels API to get a high-quality food image
+    return fetch_pexels_image(it.get('name', ''), fallback_query=ingredients)
+
+
+# Helper: store an accepted OpenAI item in AI_RECIPES and build its card
+# (None when the store write failed)
+def store_ai_card(it, mt, normalized_img, difficulty=''):
+    # Final safety check - ensure we always have a valid image path
+    if not normalized_img or not (normalized_img.startswith('/') or normalized_img.lower().startswith('http')):
+        normalized_img = '/static/images/quinoa_salad.jpg'
+    normalized_img = STATIC_FINGERPRINTS.url(normalized_img)
+
+    # Update the AI item with the normalized image before storing
+    it['image'] = normalized_img
+    it['image_url'] = normalized_img
+
+    # Save the full AI item so we can return detail later when card is clicked;
+    # no card for a recipe that could not be stored (its id would 404)
+    ai_id = AI_RECIPES.add(it)
+    if ai_id is None:
+        openai_log.warning("Dropping card '%s': the recipe could not be stored", it.get('name'))
+        return None
+    card = {
+        'id': ai_id,
+        'name': it.get('name', 'Recipe'),
+        'image': normalized_img,
+        'image_url': normalized_img,  # Provide both fields for frontend compatibility
+        'short': (it.get('short') or '')[:140],
+        'difficulty': it.get('difficulty', difficulty or 'easy'),
+        'matched_tokens': mt
+    }
+    return card
+
+
+class JSONArrayStream:
+    """
+    Incremental parser for the first JSON array of objects in streamed model output.
+
+    Feed it text deltas as they arrive; each call returns the objects that
+    were completed by that chunk, so a caller can act on the first recipe
+    while the rest is still being generated. Text before the array (prose or
+    a code fence) is skipped, like the ``[ {`` regex used on full responses.
+    """
+
+    def __init__(self):
+        self.text = ''
+        self.done = False
+        self._pos = 0
+        self._state = 'seek'  # seek '[' -> open (expect '{') -> array <-> object
+        self._depth = 0
+        self._start = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk):
+        self.text += chunk or ''
+        items = []
+        text = self.text
+        while self._pos < len(text) and not self.done:
+            ch = text[self._pos]
+            if self._state == 'seek':
+                found = text.find('[', self._pos)
+                if found < 0:
+                    self._pos = len(text)
+                    break
+                self._pos = found + 1
+                self._state = 'open'
+                continue
+            if self._state == 'open':
+                if ch.isspace():
+                    self._pos += 1
+                elif ch == '{':
+                    self._state = 'array'
+                else:
+                    self._state = 'seek'  # a '[' that does not start an array of objects
+                continue
+            if self._state == 'array':
+                if ch == '{':
+                    self._state, self._start, self._depth = 'object', self._pos, 0
+                    continue
+                if ch == ']':
+                    self.done = True
+                self._pos += 1
+                continue
+            # inside an object: track strings and nesting until its closing brace
+            self._pos += 1
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in '{[':
+                self._depth += 1
+            elif ch in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    self._state = 'array'
+                    try:
+                        item = json.loads(text[self._start:self._pos])
+                    except ValueError as e:
+                        openai_log.debug("Skipping unparsable streamed item: %s", e)
+                        continue
+                    if isinstance(item, dict):
+                        items.append(item)
+        return items
+
+
+# Hedged fallback: start the fallback prompt this many seconds after the primary
+# OpenAI call if it has not produced usable recipes yet (0 = run both at once).
+# Unset keeps the sequential behaviour: fallback only after the primary fails.
+HEDGE_FALLBACK_DELAY = float(os.environ['HEDGE_FALLBACK_DELAY']) if os.environ.get('HEDGE_FALLBACK_DELAY') else None
+
+# Shared pool for hedged calls: a losing call is abandoned, not waited for, so
+# it cannot live in a per-request executor
+HEDGE_POOL = ThreadPoolExecutor(max_workers=16, thread_name_prefix='hedge')
+
+
+def hedged_call(primary, fallback, delay):
+    """
+    Run ``primary``, hedged by ``fallback``, and return the first usable result.
+
+    Both calls return ``(status, result)`` with status 'ok', 'unusable' (an
+    answer, but nothing usable in it) or 'failed' (the call itself failed; a
+    call that raises counts as failed). ``fallback`` starts once ``delay``
+    seconds have passed without a usable primary result, or straight away
+    when the primary finishes unusable. A primary that fails before the
+    fallback started ends the call: a failing service is not asked twice.
+    The losing call cannot be interrupted mid-request; it finishes on
+    HEDGE_POOL and its result is discarded.
+
+    Returns:
+        tuple: ('primary' | 'fallback', result), or (None, None) if neither was usable
+    """
+    names = {HEDGE_POOL.submit(metrics.propagate(primary)): 'primary'}
+    started_at = time.time()
+    fallback_started = False
+    pending = set(names)
+    while pending:
+        timeout = None if fallback_started else max(0.0, delay - (time.time() - started_at))
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                status, result = future.result()
+            except Exception as e:
+                openai_log.debug("Hedged %s call failed: %s", names[future], e)
+                status, result = 'failed', None
+            if status == 'ok' and result:
+                for loser in pending:
+                    loser.cancel()  # only helps if it has not started yet
+                openai_log.debug("Hedged call won by %s after %.2fs", names[future], time.time() - started_at)
+                return names[future], result
+            if status == 'failed' and names[future] == 'primary' and not fallback_started:
+                openai_log.debug("Hedged primary call failed; not starting the fallback")
+                return None, None
+        if not fallback_started and (not done or not pending):
+            # the delay has passed, or the primary finished without anything usable
+            fallback_started = True
+            future = HEDGE_POOL.submit(metrics.propagate(fallback))
+            names[future] = 'fallback'
+            pending.add(future)
+    return None, None
+
+
+# Helper: the primary OpenAI request for suggestions, up to filter validation
+def generate_primary_items(data, ingredients, cuisine, diet, difficulty, broaden, tokens, openai_key):
+    """
+    Ask OpenAI for recipes with the full prompt and validate them against the filters.
+
+    Returns:
+        tuple: (status, accepted). status is 'ok' when ``accepted`` holds up to three
+        (item, matched tokens) pairs, 'failed' when the API call itself failed, and
+        'unusable' when no JSON array came back, it did not parse, or no item
+        passed item_matches_filters.
+    """
+    messages = build_suggestion_messages(data, ingredients, cuisine, diet, difficulty, broaden)
+
+    # prefer a modern ChatCompletion model but allow environment to pick; fallback if unknown
+    # choose model: prefer OPENAI_MODEL env var, otherwise fall back to a safe default
+    model_to_use = config.settings().openai_model
+
+    # Use the modern v1 OpenAI SDK client only (strict OpenAI-only behavior)
+    try:
+        with metrics.timed('openai', OPENAI_SECONDS, model=model_to_use, kind='primary'):
+            resp = outbound.openai_chat(
+                openai_key,
+                model=model_to_use,
+                messages=messages,
+                max_tokens=800,
+                temperature=0.6
+            )
+        # robust extraction from v1-like response
+        try:
+            text = resp.choices[0].message.content
+        except Exception:
+            try:
+                text = resp.choices[0].message[0].content
+            except Exception:
+                text = str(resp)
+        openai_log.debug('OpenAI assistant text snippet: %s', (text or '')[:300])
+        # Also persist the full assistant text to the response log for inspection
+        response_log.info('%s\n---', (text or '').replace('\n', ' '))
+    except Exception as e_v1:
+        openai_log.warning('OpenAI v1 client call failed or skipped: %s', e_v1)
+        return 'failed', []
+
+    # extract the first JSON array found in the assistant response using regex
+    m = re.search(r"(\[\s*\{.*?\}\s*\])", text, re.S)
+    if not m:
+        openai_log.info('No JSON array found in OpenAI response; trying fallback generation')
+        return 'unusable', []
+    try:
+        items = json.loads(m.group(1))
+    except Exception as e:
+        openai_log.info('Failed to parse JSON from OpenAI response: %s', e)
+        return 'unusable', []
+    if not (isinstance(items, list) and items):
+        return 'unusable', []
+
+    # Count ingredients/steps once per item; difficulty checks below become lookups
+    classify_recipes(items)
+    # validate returned items against filters - more lenient approach
+    accepted_items = []  # (item, matched tokens) pairs awaiting images
+    for it in items[:6]:
+        if item_matches_filters(it, cuisine, diet, difficulty, data.get('meal'), broaden):
+            accepted_items.append((it, prepare_ai_item(it, tokens, broaden)))
+    if not accepted_items:
+        openai_log.info('OpenAI returned items but none passed validation; trying fallback generation')
+        return 'unusable', []
+    # Only the first three cards are returned, so only those need images
+    return 'ok', accepted_items[:3]
+
+
+# Suggestion result cache settings
+SUGGESTION_CACHE_SIZE = int(os.environ.get('SUGGESTION_CACHE_SIZE') or 512)
+SUGGESTION_CACHE_TTL = int(os.environ.get('SUGGESTION_CACHE_TTL') or 15 * 60)
+# Number of distinct result sets to keep and rotate through per query (1 = always the same answer)
+SUGGESTION_CACHE_VARIETY = max(1, int(os.environ.get('SUGGESTION_CACHE_VARIETY') or 1))
+
+
+# Helper: singular form of an ingredient token, for cache keys
+def singular_token(tok):
+    if tok.endswith('ies') and len(tok) > 3:
+        return tok[:-3] + 'y'
+    if tok.endswith('oes') and len(tok) > 3:
+        return tok[:-2]
+    if tok.endswith('s') and not tok.endswith('ss') and len(tok) > 1:
+        return tok[:-1]
+    return tok
+
+
+def suggestion_cache_key(data):
+    """
+    Canonical cache key for a suggestion request.
+
+    Ingredient tokens are singularized, deduplicated and sorted, so
+    "Tomatoes, onion" and "onions tomato" share an entry; the filters are
+    normalized the same way suggest_recipes reads them.
+    """
+    ingredients = data.get('ingredients') or ''
+    if isinstance(ingredients, list):
+        ingredients = ', '.join(str(i) for i in ingredients)
+    tokens = sorted({singular_token(t) for t in re.split(r"\W+", str(ingredients).lower()) if t})
+    return json.dumps([
+        tokens,
+        (data.get('cuisine') or '').strip().lower(),
+        (data.get('diet') or '').strip().lower(),
+        (data.get('difficulty') or '').strip().lower(),
+        (data.get('taste') or '').strip().lower(),
+        (data.get('meal') or '').strip().lower(),
+        bool(data.get('broaden', False)),
+    ])
+
+
+class SuggestionCache:
+    """
+    In-process TTL + LRU cache of serialized /api/recipes responses.
+
+    Each key holds up to ``variety`` result sets. While a key has fewer sets
+    than that, lookups miss so a fresh answer gets computed and added; once it
+    is full, hits rotate through the stored sets. Entries expire ``ttl``
+    seconds after their first result set was stored.
+    """
+
+    def __init__(self, max_entries=512, ttl=900, variety=1):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.variety = variety
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> {'expires_at', 'results', 'next'}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return a cached response body (str) for ``key``, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['expires_at'] <= time.time():
+                del self._entries[key]
+                entry = None
+            if entry is None or len(entry['results']) < self.variety:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            body = entry['results'][entry['next'] % len(entry['results'])]
+            entry['next'] += 1
+            return body
+
+    def set(self, key, body):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry['expires_at'] <= time.time():
+                entry = {'expires_at': time.time() + self.ttl, 'results': [], 'next': 0}
+                self._entries[key] = entry
+            if body not in entry['results']:
+                entry['results'].append(body)
+                del entry['results'][:-self.variety]
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
 
-def get_local_food_image_fallback(recipe_name):
+
+SUGGESTION_CACHE = SuggestionCache(SUGGESTION_CACHE_SIZE, SUGGESTION_CACHE_TTL, SUGGESTION_CACHE_VARIETY)
+
+
+# Helper: the ETag of a serialized JSON body (derived from its content)
+def json_etag(body):
+    return hashlib.sha1(body.encode('utf-8')).hexdigest()
+
+
+class JsonResponseCache:
     """
-    Get a local food image based on recipe name/ingredients
-    
-    Args:
-        recipe_name (str): Name of the recipe
-    
-    Returns:
-        str: Local image path
+    In-process LRU cache of serialized JSON responses and their ETags.
+
+    Each entry is stored with the version of the data it was built from (a
+    recipe store stamp, the image catalog generation) and only returned while
+    the caller still sees that version, so a change to the data is picked up
+    on the next read without explicit invalidation.
     """
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (version, body, etag)
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        """Return ``(body, etag)`` cached for ``key`` at ``version``, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            hit = entry is not None and entry[0] == version
+            if hit:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        CACHE_REQUESTS.inc(cache='json_responses', result='hit' if hit else 'miss')
+        return (entry[1], entry[2]) if hit else None
+
+    def set(self, key, version, body):
+        """Cache ``body`` for ``key`` at ``version`` and return ``(body, etag)``."""
+        etag = json_etag(body)
+        with self._lock:
+            self._entries[key] = (version, body, etag)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return body, etag
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+# Serialized recipe details, expansions and the image list, kept per data version
+JSON_RESPONSE_CACHE_SIZE = int(os.environ.get('JSON_RESPONSE_CACHE_SIZE') or 4096)
+JSON_RESPONSE_CACHE = JsonResponseCache(JSON_RESPONSE_CACHE_SIZE)
+
+
+# Helper: answer with a serialized JSON body and its ETag, or with an empty 304
+# when the client's If-None-Match already names that ETag. no-cache makes
+# browsers revalidate (and so send If-None-Match) instead of guessing freshness.
+def etag_json_response(body, etag):
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
+
+
+# Helper: cached cards for the current request, or None when one of their recipes
+# can no longer be opened. The cache key folds ingredient tokens ("onions tomato"
+# and "Tomatoes, onion" share an entry), so each card's matched_tokens is
+# recomputed from this request's own tokens, as prepare_ai_item matches them.
+def cached_cards_for_request(cards, data):
+    ingredients = data.get('ingredients') or ''
+    if isinstance(ingredients, list):
+        ingredients = ', '.join(str(i) for i in ingredients)
+    tokens = [t for t in re.split(r"\W+", str(ingredients).lower()) if t]
+    result = []
+    for card in cards:
+        rid = card.get('id')
+        recipe = AI_RECIPES.get(rid) or get_local_recipe(rid)
+        if not recipe or recipe.get('name') != card.get('name'):
+            return None
+        text = ' '.join([recipe.get('name') or '', recipe.get('short') or ''] + (recipe.get('ingredients') or [])).lower()
+        matched = [tok for tok in tokens if token_in_text(tok, text) or normalized_contains(tok, text)]
+        result.append(dict(card, matched_tokens=matched))
+    return result
+
+
+@app.route('/api/recipes', methods=['POST'])
+def suggest_recipes():
+    """Recipe suggestions, answered from SUGGESTION_CACHE when the same query was seen recently."""
+    data = request.json or {}
+    key = suggestion_cache_key(data)
+    body = SUGGESTION_CACHE.get(key)
+    if body is not None:
+        payload = json.loads(body)
+        cached = cached_cards_for_request(payload.get('cards') or [], data)
+        if cached is not None:
+            suggest_log.debug('suggestion cache hit: %s', key)
+            CACHE_REQUESTS.inc(cache='suggestions', result='hit')
+            g.card_count = len(cached)
+            if '"image_pending": true' in body:
+                cached = DEFERRED_IMAGES.fill_ready(cached)
+            response = app.response_class(json.dumps({**payload, 'cards': cached}), mimetype='application/json')
+            response.headers['X-Suggestion-Cache'] = 'hit'
+            return response
+        SUGGESTION_CACHE.invalidate(key)
+
+    CACHE_REQUESTS.inc(cache='suggestions', result='miss')
+    response = compute_recipe_suggestions()
+    # answers from local matching while OpenAI's circuit is open are not kept:
+    # they would outlive the outage
+    degraded = bool(load_openai_key()) and outbound.circuit_open(outbound.OPENAI_BREAKER)
     try:
-        recipe_lower = recipe_name.lower()
-        
-        # Enhanced mapping for better local fallbacks
-        local_mappings = {
-            # Indian dishes
-            'curry': 'chicken_curry_pexels.jpg',
-            'masala': 'paneer_butter_masala_pexels.jpg',
-            'paneer': 'paneer_butter_masala_pexels.jpg',
-            'chana': 'chana_masala.jpg',
-            'chickpea': 'chana_masala.jpg',
-            'biryani': 'rice_vegetable_pulao_pexels.jpg',
-            'pulao': 'rice_vegetable_pulao_pexels.jpg',
-            'rasam': 'tomato_tomato_rasam_pexels.jpg',
-            
-            # International dishes
-            'pasta': 'pasta_penne_pexels.jpg',
-            'spaghetti': 'pasta_penne_pexels.jpg',
-            'noodles': 'pasta_penne_pexels.jpg',
-            
-            # Ingredients
-            'chicken': 'chicken_curry_pexels.jpg',
-            'beef': 'beef_beef_tacos_pexels.jpg',
-            'fish': 'quinoa_salad.jpg',  # Generic fallback for fish
-            'egg': 'quinoa_salad.jpg',
-            'rice': 'rice_vegetable_pulao_pexels.jpg',
-            'potato': 'potato_vegetable_curry_pexels.jpg',
-            'tomato': 'tomato_tomato_rasam_pexels.jpg',
-            'vegetable': 'vegetable_stir_fry_pexels.jpg',
-            'salad': 'quinoa_salad.jpg',
-            'soup': 'quinoa_salad.jpg',
-            'lentil': 'quinoa_salad.jpg'
-        }
-        
-        # Check for matches in recipe name
-        for keyword, image in local_mappings.items():
-            if keyword in recipe_lower:
-                image_path = os.path.join(app.root_path, 'static', 'images', image)
-                if os.path.exists(image_path):
-                    print(f"[DEBUG] Using local fallback image for '{recipe_name}': {image}")
-                    return f'/static/images/{image}'
-        
-        # Final fallback - check if spaghetti image exists, otherwise create default
-        spaghetti_path = '/static/images/spaghetti.jpg'
-        full_path = os.path.join(app.root_path, 'static', 'images', 'spaghetti.jpg')
-        
-        if os.path.exists(full_path):
-            print(f"[DEBUG] Using default fallback: spaghetti.jpg")
-            return spaghetti_path
-        else:
-            # Create default cooking image path - this should always exist
-            return '/static/images/default_cooking.jpg'
-        
+        payload = response.get_json()
+        g.card_count = len((payload or {}).get('cards') or [])
+        if payload and payload.get('cards') and not degraded:
+            SUGGESTION_CACHE.set(key, json.dumps(payload))
     except Exception as e:
-        print(f"[ERROR] Local fallback error: {str(e)}")
-        return '/static/images/spaghetti.jpg'  # Ultimate fallback
+        suggest_log.error("Could not cache suggestions: %s", e)
+    response.headers['X-Suggestion-Cache'] = 'miss'
+    return response
 
 
-@app.route('/api/recipes', methods=['POST'])
-def replace_placeholder_image(img_url, recipe_name='', cuisine=''):
-    """Helper function to replace placeholder URLs with real Pexels images"""
-    if not img_url or not isinstance(img_url, str):
-        return '/static/images/quinoa_salad.jpg'
-    
-    # Check if it's a placeholder URL
-    if ('example.com' in img_url.lower() or 
-        'placeholder' in img_url.lower() or 
-        img_url.startswith('https://example.com/') or
-        img_url.startswith('http://example.com/')):
-        # Replace with real Pexels image
-        try:
-            return fetch_fallback_image(recipe_name, cuisine)
-        except:
-            return '/static/images/quinoa_salad.jpg'
-    
-    return img_url
+def compute_recipe_suggestions(local_only=False):
+    """
+    Recipe suggestions for the current request, from OpenAI or local matching.
 
-def suggest_recipes():
+    Args:
+        local_only (bool): skip OpenAI even when a key is configured
+
+    Returns:
+        Response: JSON ``{'cards': [...]}``
+    """
     data = request.json or {}
     ingredients = data.get('ingredients', '')
     broaden = data.get('broaden', False)
@@ -738,41 +3440,10 @@ def suggest_recipes():
     diet = (data.get('diet') or '').strip().lower()
     difficulty = (data.get('difficulty') or '').strip().lower()
     taste = (data.get('taste') or '').strip().lower()
-    print('\n[DEBUG] suggest_recipes called with:', data)
+    suggest_log.debug('suggest_recipes called with: %s', data)
     # Basic filtering by attributes (cuisine/diet/difficulty/taste)
     import re
 
-    # helper: token-in-text used for both OpenAI validation and local matching
-    def token_in_text(tok, text):
-        # consider simple variants (singular/plural) without external libs
-        variants = set()
-        variants.add(tok)
-        variants.add(tok + 's')
-        variants.add(tok + 'es')
-        # y -> ies and reverse
-        if tok.endswith('y'):
-            variants.add(tok[:-1] + 'ies')
-        if tok.endswith('ies'):
-            variants.add(tok[:-3] + 'y')
-        # if token looks plural, add singular guess
-        if tok.endswith('s') and len(tok) > 1:
-            variants.add(tok[:-1])
-            if tok.endswith('es'):
-                variants.add(tok[:-2])
-
-        for v in variants:
-            if re.search(r"\b" + re.escape(v) + r"\b", text):
-                return True
-        return False
-
-    # A more robust matcher that removes punctuation and normalizes whitespace
-    def normalized_contains(tok, text):
-        try:
-            _nt = re.sub(r"[^a-z0-9\s]", ' ', (text or '').lower())
-            return bool(re.search(r"\b" + re.escape(tok.lower()) + r"\b", _nt))
-        except Exception:
-            return False
-
     # Normalize image values returned by AI to point to our static images when possible.
     def normalize_image_value(img_val, cuisine=None, name_hint=None):
         try:
@@ -794,64 +3465,50 @@ def suggest_recipes():
             # If already a static path, use as-is (ensure it begins with /)
             if img_val.startswith('/'):
                 static_rel = img_val.lstrip('/')
-                static_file = os.path.join(app.root_path, static_rel)
-                if os.path.exists(static_file):
+                if IMAGE_CATALOG.static_size('/' + static_rel) is not None or (
+                        not static_rel.startswith('static/images/') and os.path.exists(os.path.join(app.root_path, static_rel))):
                     return '/' + static_rel.replace('\\', '/')
             # Otherwise treat it as a filename; sanitize and try to find a match in static/images
             images_dir = os.path.join(app.root_path, 'static', 'images')
             base = os.path.basename(img_val).lower()
             # normalize name (remove spaces)
             base_norm = os.path.splitext(base)[0].replace(' ', '_')
-            # scan images dir for best match
-            try:
-                files = os.listdir(images_dir)
-            except Exception:
-                files = []
             # quick keyword-based mapping to common images
             try:
                 k = base_norm
                 if 'salad' in k:
-                    if 'quinoa_salad.jpg' in files:
+                    if IMAGE_CATALOG.exists('quinoa_salad.jpg'):
                         return '/static/images/quinoa_salad.jpg'
                 if 'paneer' in k:
-                    if 'paneer_butter_masala.jpg' in files:
+                    if IMAGE_CATALOG.exists('paneer_butter_masala.jpg'):
                         return '/static/images/paneer_butter_masala.jpg'
                 if 'chana' in k or 'chickpea' in k or 'chickpeas' in k:
-                    if 'chana_masala.jpg' in files:
+                    if IMAGE_CATALOG.exists('chana_masala.jpg'):
                         return '/static/images/chana_masala.jpg'
                 if 'lentil' in k or 'soup' in k:
-                    if 'quinoa_salad.jpg' in files:
+                    if IMAGE_CATALOG.exists('quinoa_salad.jpg'):
                         return '/static/images/quinoa_salad.jpg'
                 if 'spaghetti' in k or 'pasta' in k:
-                    if 'spaghetti.jpg' in files:
+                    if IMAGE_CATALOG.exists('spaghetti.jpg'):
                         return '/static/images/spaghetti.jpg'
             except Exception:
                 pass
-            for f in files:
-                name_noext = os.path.splitext(f)[0].lower().replace(' ', '_')
-                if name_noext == base_norm:
-                    return '/static/images/' + f
-            # fuzzy match: pick the file with the highest similarity
+            exact = IMAGE_CATALOG.find_base(base_norm)
+            if exact:
+                return '/static/images/' + exact
+            # fuzzy match: pick the file with the highest similarity,
+            # accepting it only if similarity is reasonable
             try:
-                import difflib
-                scores = []
-                for f in files:
-                    name_noext = os.path.splitext(f)[0].lower().replace(' ', '_')
-                    ratio = difflib.SequenceMatcher(None, base_norm, name_noext).ratio()
-                    scores.append((ratio, f))
-                if scores:
-                    scores.sort(reverse=True)
-                    best_ratio, best_file = scores[0]
-                    # accept best match only if similarity reasonable
-                    if best_ratio > 0.5:
-                        return '/static/images/' + best_file
+                best_file = IMAGE_CATALOG.fuzzy_find(base_norm, threshold=0.5)
+                if best_file:
+                    return '/static/images/' + best_file
             except Exception:
                 pass
             # try common extensions if basename had no ext
             if '.' not in base:
                 for ext in ('.jpg', '.jpeg', '.png', '.webp'):
                     candidate = base + ext
-                    if candidate in files:
+                    if IMAGE_CATALOG.exists(candidate):
                         return '/static/images/' + candidate
             # if no match, try a cuisine-based fallback if provided
             try:
@@ -860,19 +3517,19 @@ def suggest_recipes():
                     if 'indian' in c:
                         # prefer paneer or chana images for Indian
                         for pref in ('paneer_butter_masala.jpg', 'chana_masala.jpg'):
-                            if pref in files:
+                            if IMAGE_CATALOG.exists(pref):
                                 return '/static/images/' + pref
                     if 'ital' in c or 'italian' in c:
-                        if 'spaghetti.jpg' in files:
+                        if IMAGE_CATALOG.exists('spaghetti.jpg'):
                             return '/static/images/spaghetti.jpg'
                     if 'mediterr' in c or 'med' in c:
-                        if 'quinoa_salad.jpg' in files:
+                        if IMAGE_CATALOG.exists('quinoa_salad.jpg'):
                             return '/static/images/quinoa_salad.jpg'
                     if 'mex' in c or 'mexican' in c:
-                        if 'quinoa_salad.jpg' in files:
+                        if IMAGE_CATALOG.exists('quinoa_salad.jpg'):
                             return '/static/images/quinoa_salad.jpg'
                     if 'chin' in c or 'chinese' in c:
-                        if 'spaghetti.jpg' in files:
+                        if IMAGE_CATALOG.exists('spaghetti.jpg'):
                             return '/static/images/spaghetti.jpg'
             except Exception:
                 pass
@@ -880,12 +3537,11 @@ def suggest_recipes():
             query = name_hint or base_norm
             if query:
                 try:
-                    import requests
                     from urllib.parse import quote_plus
                     q = quote_plus(query)
                     unsplash_url = f'https://source.unsplash.com/600x400/?{q}'
                     # attempt to download the image (will follow redirect to an image)
-                    resp = requests.get(unsplash_url, timeout=8)
+                    resp = outbound.get(unsplash_url)
                     if resp.status_code == 200 and resp.headers.get('Content-Type','').startswith('image'):
                         # save to static/images with a safe filename
                         safe_name = base_norm if base_norm else quote_plus(query).lower()
@@ -893,42 +3549,27 @@ def suggest_recipes():
                         # ensure uniqueness
                         dest = os.path.join(images_dir, filename)
                         # if file exists, reuse; otherwise write
-                        if not os.path.exists(dest):
+                        if not IMAGE_CATALOG.exists(filename):
                             try:
                                 with open(dest, 'wb') as fh:
                                     fh.write(resp.content)
+                                IMAGE_CATALOG.add(filename)
                             except Exception:
                                 pass
-                        if os.path.exists(dest):
-                            return '/static/images/' + os.path.basename(dest)
+                        if IMAGE_CATALOG.exists(filename):
+                            return '/static/images/' + filename
                 except Exception:
                     pass
 
             # If Unsplash didn't find anything, try Pexels (if API key present)
             try:
-                PEXELS_KEY = _os.environ.get('PEXELS_API_KEY')
-                if not PEXELS_KEY:
-                    possible = [os.path.join(app.root_path, '.env'), os.path.join(app.root_path, 'data', '.env')]
-                    for p in possible:
-                        if os.path.exists(p):
-                            with open(p, 'r', encoding='utf-8') as fh:
-                                for line in fh:
-                                    if line.strip().startswith('PEXELS_API_KEY'):
-                                        parts = line.split('=', 1)
-                                        if len(parts) > 1:
-                                            PEXELS_KEY = parts[1].strip().strip('"').strip("'")
-                                            _os.environ['PEXELS_API_KEY'] = PEXELS_KEY
-                                            break
-                        if PEXELS_KEY:
-                            break
+                PEXELS_KEY = pexels_api_key()
                 if PEXELS_KEY and query:
                     try:
-                        import requests
                         from urllib.parse import quote_plus
-                        headers = {'Authorization': PEXELS_KEY}
                         params = {'query': query, 'per_page': 1}
-                        r = requests.get('https://api.pexels.com/v1/search', headers=headers, params=params, timeout=8)
-                        if r.status_code == 200:
+                        r = pexels_search(params, PEXELS_PRIORITY_SECONDARY, PEXELS_KEY, step='placeholder')
+                        if r is not None and r.status_code == 200:
                             j = r.json()
                             photos = j.get('photos') or []
                             if photos:
@@ -937,16 +3578,18 @@ def suggest_recipes():
                                 if src:
                                     # download and cache
                                     try:
-                                        resp = requests.get(src, timeout=8)
+                                        with metrics.timed('image-download', IMAGE_DOWNLOAD_SECONDS, source='placeholder'):
+                                            resp = outbound.get(src)
                                         if resp.status_code == 200 and resp.headers.get('Content-Type','').startswith('image'):
                                             safe_name = base_norm if base_norm else quote_plus(query).lower()
                                             filename = safe_name + '_pexels.jpg'
                                             dest = os.path.join(images_dir, filename)
-                                            if not os.path.exists(dest):
+                                            if not IMAGE_CATALOG.exists(filename):
                                                 with open(dest, 'wb') as fh:
                                                     fh.write(resp.content)
-                                            if os.path.exists(dest):
-                                                return '/static/images/' + os.path.basename(dest)
+                                                IMAGE_CATALOG.add(filename)
+                                            if IMAGE_CATALOG.exists(filename):
+                                                return '/static/images/' + filename
                                     except Exception:
                                         pass
                     except Exception:
@@ -972,18 +3615,16 @@ def suggest_recipes():
             # fallback: keyword map using name_hint
             if name_hint:
                 nk = name_hint.lower()
-                images_dir = os.path.join(app.root_path, 'static', 'images')
-                files = os.listdir(images_dir) if os.path.exists(images_dir) else []
-                if 'paneer' in nk and 'paneer_butter_masala.jpg' in files:
+                if 'paneer' in nk and IMAGE_CATALOG.exists('paneer_butter_masala.jpg'):
                     return '/static/images/paneer_butter_masala.jpg'
                 if 'chana' in nk or 'chickpea' in nk or 'chickpeas' in nk:
-                    if 'chana_masala.jpg' in files:
+                    if IMAGE_CATALOG.exists('chana_masala.jpg'):
                         return '/static/images/chana_masala.jpg'
                 if 'lentil' in nk or 'soup' in nk:
-                    if 'quinoa_salad.jpg' in files:
+                    if IMAGE_CATALOG.exists('quinoa_salad.jpg'):
                         return '/static/images/quinoa_salad.jpg'
                 if 'spaghetti' in nk or 'pasta' in nk:
-                    if 'spaghetti.jpg' in files:
+                    if IMAGE_CATALOG.exists('spaghetti.jpg'):
                         return '/static/images/spaghetti.jpg'
             return '/static/images/quinoa_salad.jpg'
         except Exception:
@@ -993,496 +3634,198 @@ def suggest_recipes():
     tokens = []
     if ingredients:
         tokens = [t.strip() for t in re.split(r"\W+", ingredients.lower()) if t.strip()]
-    print('    [DEBUG] tokens:', tokens)
-
-    # Reload .env (if present) so updates to .env are picked up at request time.
-    try:
-        from dotenv import load_dotenv as _load_dotenv
-        _load_dotenv()
-        dotenv_data_path = os.path.join(os.path.dirname(__file__), 'data', '.env')
-        if os.path.exists(dotenv_data_path):
-            _load_dotenv(dotenv_data_path)
-    except Exception:
-        pass
+    suggest_log.debug('tokens: %s', tokens)
 
     # If OPENAI_API_KEY is present, try to ask OpenAI for recipe suggestions first.
-    OPENAI_KEY = _os.environ.get('OPENAI_API_KEY')
-    # If not in environment, try to read from common .env files (project root or data/.env)
-    if not OPENAI_KEY:
-        try:
-            possible = [os.path.join(app.root_path, '.env'), os.path.join(app.root_path, 'data', '.env')]
-            for p in possible:
-                if os.path.exists(p):
-                    with open(p, 'r', encoding='utf-8') as fh:
-                        for line in fh:
-                            if line.strip().startswith('OPENAI_API_KEY'):
-                                parts = line.split('=', 1)
-                                if len(parts) > 1:
-                                    OPENAI_KEY = parts[1].strip().strip('\"').strip("\'")
-                                    # also set in os.environ so later imports can see it
-                                    _os.environ['OPENAI_API_KEY'] = OPENAI_KEY
-                                    break
-                if OPENAI_KEY:
-                    break
-        except Exception:
-            pass
+    OPENAI_KEY = load_openai_key()
     # debug: print whether OPENAI key is present (masked) to aid diagnosis
     if OPENAI_KEY:
-        print('[DEBUG] OPENAI_API_KEY present, loaded and masked:', OPENAI_KEY[:6] + '...' + OPENAI_KEY[-4:])
+        openai_log.debug('OPENAI_API_KEY present, loaded and masked: %s...%s', OPENAI_KEY[:6], OPENAI_KEY[-4:])
     else:
-        print('[DEBUG] OPENAI_API_KEY not found in environment')
+        openai_log.debug('OPENAI_API_KEY not found in environment')
+    if OPENAI_KEY and (local_only or outbound.circuit_open(outbound.OPENAI_BREAKER)):
+        # OpenAI is failing: answer from local matching rather than wait on it
+        openai_log.info('OpenAI circuit open; using local recipe matching')
+        FALLBACKS.inc(path='openai_circuit_local')
+        OPENAI_KEY = None
     if OPENAI_KEY:
         try:
-            # Compose prompt with unique seed for each difficulty to ensure variety
-            import random
-            random_seed = random.randint(1000, 9999)
-            prompt = {
-                'ingredients': ingredients,
-                'cuisine': cuisine,
-                'diet': diet,
-                'difficulty': difficulty,
-                'meal': data.get('meal'),
-                'broaden': bool(broaden),
-                'seed': random_seed  # Add randomness to prevent identical responses
-            }
-            # Enhanced system prompt with detailed difficulty-specific guidelines
-            system = (
-                "You are a helpful cooking assistant. Respond ONLY with a JSON array (no explanatory text). "
-                "Return up to 3 recipe objects. Each object should include the fields:"
-                " id (number), name (string), cuisine (string), short (string), image (string; optional),"
-                " ingredients (array of strings with specific quantities), instructions (string with detailed step-by-step directions), nutrition (object with calories, protein, fat, carbs), difficulty (string)."
-                " CRITICAL INSTRUCTION FORMAT: Write instructions as detailed, beginner-friendly sentences. Each step should include:"
-                " - Specific cooking times and temperatures"
-                " - Clear explanations of what to look for (e.g., 'until golden brown', 'until fragrant')"
-                " - Helpful tips for beginners"
-                " - Proper cooking techniques explained simply"
-                " - ALWAYS use specific ingredient names instead of generic terms (never say 'add all spices' - list each spice separately)"
-                " - Mention exact quantities and specific ingredients (e.g., '1/2 tsp red chili powder', '1/4 tsp saffron threads')"
-                " - Use clear, simple sentences without unnecessary words like 'Step' at the end"
-                " Example format: '1. Heat 2 tablespoons oil in a large pan over medium heat for 1-2 minutes. 2. Add finely chopped onions and sauté for 5-6 minutes until golden brown and translucent. 3. Add minced garlic, grated ginger, and 1/2 tsp red chili powder; cook for 1 minute until fragrant.'"
-                " ENHANCED DIFFICULTY GUIDELINES - Follow these strictly based on requested difficulty:"
-                " EASY RECIPES (difficulty='easy'):"
-                " - Use exactly 3-6 simple, common ingredients"
-                " - 4-6 clear, simple steps with basic cooking methods (boiling, sautéing, baking)"
-                " - Cooking time: 15-30 minutes total"
-                " - Focus on one-pot meals, sandwiches, salads, simple pasta dishes"
-                " - Avoid complex techniques like braising, reducing sauces, or multiple cooking stages"
-                " - Example: Scrambled eggs, pasta with garlic oil, simple stir-fry"
-                " MODERATE RECIPES (difficulty='moderate'):"
-                " - Use 6-10 ingredients including some specialty items or spices"
-                " - 7-10 detailed steps with intermediate techniques (marinating, sauce-making, proper seasoning)"
-                " - Cooking time: 30-60 minutes total"
-                " - Include recipes requiring timing coordination between components"
-                " - May involve multiple cooking methods or preparing sauce while cooking main ingredient"
-                " - Example: Chicken curry with homemade sauce, stuffed bell peppers, risotto"
-                " COMPLEX RECIPES (difficulty='complex'):"
-                " - Use 10+ ingredients including specialty items, multiple spices, garnishes"
-                " - 10+ comprehensive steps with advanced techniques (braising, reduction, tempering, layering)"
-                " - Cooking time: 60+ minutes, may include prep time or marinating"
-                " - Multiple cooking stages, precise timing, temperature control, flavor balancing"
-                " - Advanced techniques like making stocks, complex sauces, or multi-component dishes"
-                " - Example: Coq au vin, homemade ravioli with sauce, multi-layer lasagna"
-                " Always set the difficulty field to exactly match the requested difficulty level."
-            )
-            user = f"Generate {difficulty.upper()} difficulty recipes for this criteria: {json.dumps(prompt)}. " \
-                   f"IMPORTANT: Create recipes that are SPECIFICALLY {difficulty.upper()} complexity. " \
-                   f"Do NOT reuse the same recipe names or cooking methods. " \
-                   f"For {difficulty}: {'Use simple ingredients and basic techniques.' if difficulty == 'easy' else 'Use moderate ingredients and intermediate techniques.' if difficulty == 'moderate' else 'Use many ingredients and advanced techniques.'} " \
-                   f"Return only JSON array."
+            primary = lambda: generate_primary_items(data, ingredients, cuisine, diet, difficulty, broaden, tokens, OPENAI_KEY)
+            if HEDGE_FALLBACK_DELAY is None:
+                status, accepted_items = primary()
+                if status == 'failed':
+                    if outbound.circuit_open(outbound.OPENAI_BREAKER):
+                        return compute_recipe_suggestions(local_only=True)
+                    # Strict OpenAI-only: return empty on failure
+                    return jsonify({'cards': []})
+                if status != 'ok':
+                    # FALLBACK: Try a simpler prompt focused just on ingredients
+                    return try_fallback_recipe_generation(ingredients, cuisine, difficulty, tokens)
+            else:
+                # Hedged: the fallback prompt also starts once HEDGE_FALLBACK_DELAY has passed
+                # (or as soon as the primary answer proves unusable, but not when the call
+                # failed outright); the first usable answer wins
+                winner, result = hedged_call(
+                    primary,
+                    lambda: (lambda items: ('ok', items) if items else ('unusable', None))(
+                        generate_fallback_items(ingredients, cuisine, difficulty)),
+                    HEDGE_FALLBACK_DELAY,
+                )
+                if winner == 'fallback':
+                    # counted like the sequential fallback, plus as a hedge win
+                    FALLBACKS.inc(path='openai_fallback_prompt')
+                    FALLBACKS.inc(path='hedge_fallback')
+                    return fallback_cards_response(result, ingredients, difficulty, tokens)
+                if winner is None:
+                    if outbound.circuit_open(outbound.OPENAI_BREAKER):
+                        return compute_recipe_suggestions(local_only=True)
+                    return jsonify({'cards': []})
+                accepted_items = result
 
-            # prefer a modern ChatCompletion model but allow environment to pick; fallback if unknown
-            # choose model: prefer OPENAI_MODEL env var, otherwise fall back to a safe default
-            model_to_use = os.environ.get('OPENAI_MODEL') or 'gpt-3.5-turbo'
+            # Always try to get a good image, use Pexels API first. Lookups for
+            # all accepted items run in parallel so the response waits only on
+            # the slowest one.
+            images, deferred = resolve_or_defer_images([
+                # a copy, since storing the card replaces the item's image with the placeholder
+                (lambda it=dict(it): ai_item_image(it, ingredients)) for it, _ in accepted_items
+            ], [it.get('name', '') for it, _ in accepted_items])
 
-            # Use the modern v1 OpenAI SDK client only (strict OpenAI-only behavior)
-            try:
-                from openai import OpenAI
-                client = OpenAI(api_key=OPENAI_KEY)
-                resp = client.chat.completions.create(
-                    model=model_to_use,
-                    messages=[{'role': 'system', 'content': system}, {'role': 'user', 'content': user}],
-                    max_tokens=800,
-                    temperature=0.6
-                )
-                # robust extraction from v1-like response
+            accepted = []
+            for (it, mt), normalized_img, job in zip(accepted_items, images, deferred):
+                card = store_ai_card(it, mt, normalized_img, difficulty)
+                if card is None:
+                    continue
+                if job:
+                    defer_ai_image(card, job)
+                accepted.append(card)
+
+            # ensure images are usable paths/URLs for frontend
+            for c in accepted:
                 try:
-                    text = resp.choices[0].message.content
+                    img = c.get('image') or ''
+                    # If we already have a good path or URL, keep it
+                    if img and (img.startswith('/') or img.lower().startswith('http')):
+                        continue
+                    # Otherwise use fallback
+                    c['image'] = '/static/images/quinoa_salad.jpg'
                 except Exception:
-                    try:
-                        text = resp.choices[0].message[0].content
-                    except Exception:
-                        text = str(resp)
-                print('[DEBUG] OpenAI assistant text snippet:', (text or '')[:300])
-                # Also persist the full assistant text to a debug log for inspection
-                try:
-                    os.makedirs(os.path.join(app.root_path, 'data'), exist_ok=True)
-                    with open(os.path.join(app.root_path, 'data', 'openai_responses.log'), 'a', encoding='utf-8') as _of:
-                        _of.write(datetime.utcnow().isoformat() + 'Z -- ' + (text or '').replace('\n', ' ') + '\n---\n')
-                except Exception as _e:
-                    print('[DEBUG] Failed to write OpenAI assistant text to log:', str(_e))
-            except Exception as e_v1:
-                print('[DEBUG] OpenAI v1 client call failed or skipped:', str(e_v1))
-                # Strict OpenAI-only: return empty on failure
-                return jsonify({'cards': []})
-
-            # extract the first JSON array found in the assistant response using regex
-            import re as _re
-            m = _re.search(r"(\[\s*\{.*?\}\s*\])", text, _re.S)
-            if m:
-                raw = m.group(1)
-                try:
-                    items = json.loads(raw)
-                    if isinstance(items, list) and items:
-                        # validate returned items against filters - more lenient approach
-                        def item_matches_filters(it):
-                            try:
-                                # More lenient filtering: prefer exact matches but don't reject everything
-                                score = 0  # scoring system for better matching
-                                reasons = []
-                                
-                                if not bool(broaden):
-                                    # cuisine: prefer exact match but don't reject if no match
-                                    if cuisine and it.get('cuisine'):
-                                        if it.get('cuisine', '').strip().lower() == cuisine:
-                                            score += 2  # exact cuisine match bonus
-                                        else:
-                                            score -= 1  # slight penalty for cuisine mismatch
-                                            reasons.append(f"cuisine mismatch ({it.get('cuisine')!r} != {cuisine!r})")
-                                    
-                                    # difficulty: prefer matching but allow near matches
-                                    if difficulty:
-                                        # First check if difficulty field matches exactly
-                                        if it.get('difficulty') and it.get('difficulty', '').strip().lower() == difficulty:
-                                            score += 2  # exact difficulty match bonus
-                                        else:
-                                            # Check complexity requirements more leniently
-                                            if validate_recipe_difficulty(it, difficulty):
-                                                score += 1  # complexity requirements met
-                                            else:
-                                                score -= 1  # slight penalty for complexity mismatch
-                                                reasons.append(f"doesn't meet {difficulty} complexity requirements")
-                                    
-                                    # diet: only enforce when both sides specify diet
-                                    if diet and diet != 'none' and it.get('diet'):
-                                        if diet in (it.get('diet','') or '').lower():
-                                            score += 1  # diet match bonus
-                                        else:
-                                            score -= 1  # diet mismatch penalty
-                                            reasons.append(f"diet mismatch ({it.get('diet')!r} does not include {diet!r})")
-                                    
-                                    # meal: check meal_types array if present
-                                    if data.get('meal') and it.get('meal_types'):
-                                        sel = data.get('meal').lower()
-                                        mts = [m.lower() for m in (it.get('meal_types') or [])]
-                                        if mts and sel in mts:
-                                            score += 1  # meal type match bonus
-                                        else:
-                                            score -= 1  # meal type mismatch penalty
-                                            reasons.append(f"meal_types do not include {sel}")
-                                
-                                # Accept items with score >= -2 (allow some mismatches but not total mismatches)
-                                if score >= -2:
-                                    if reasons:
-                                        print(f"[DEBUG] OpenAI item '{it.get('name')}' accepted with score {score}: {', '.join(reasons)}")
-                                    else:
-                                        print(f"[DEBUG] OpenAI item '{it.get('name')}' accepted with score {score}: perfect match")
-                                    return True
-                                else:
-                                    print(f"[DEBUG] OpenAI item '{it.get('name')}' rejected with score {score}: {', '.join(reasons)}")
-                                    return False
-                                    
-                            except Exception as e:
-                                print(f"[DEBUG] Error in item_matches_filters: {e}")
-                                return True  # If error, accept the item rather than reject it
-
-                        accepted = []
-                        scored_items = []  # for sorting by score if needed
-                        for it in items[:6]:
-                            if item_matches_filters(it):
-                                # compute matched tokens for the item
-                                mt = []
-                                if tokens:
-                                    txt_fields = ' '.join([it.get('name',''), it.get('short','')] + (it.get('ingredients') or [])).lower()
-                                    print(f"[DEBUG] OpenAI item '{it.get('name')}' txt_fields: {txt_fields}")
-                                    # also append debug to log file
-                                    try:
-                                        with open(os.path.join(app.root_path, 'data', 'openai_responses.log'), 'a', encoding='utf-8') as _of2:
-                                            _of2.write(datetime.utcnow().isoformat() + 'Z -- ITEM_DEBUG -- ' + it.get('name','') + ' -- ' + txt_fields + '\n')
-                                    except Exception:
-                                        pass
-                                    for tok in tokens:
-                                        res = token_in_text(tok, txt_fields)
-                                        if not res:
-                                            # fallback to a normalized check (remove punctuation/newlines)
-                                            res = normalized_contains(tok, txt_fields)
-                                        print(f"[DEBUG] checking token '{tok}' in item '{it.get('name')}': {res}")
-                                        if res:
-                                            mt.append(tok)
-                                
-                                # More lenient ingredient matching: require at least one token match OR accept if no ingredient tokens provided
-                                if tokens and not mt and not broaden:
-                                    print(f"[DEBUG] OpenAI item '{it.get('name')}' has no matched ingredient tokens but accepting due to lenient filtering")
-                                    # Continue processing instead of rejecting - maybe it's a related recipe
-                                
-                                # Always try to get a good image, use Pexels API first
-                                raw_img = it.get('image') or ''
-                                # If AI provided an absolute URL, keep it as-is
-                                if isinstance(raw_img, str) and (raw_img.lower().startswith('http://') or raw_img.lower().startswith('https://')):
-                                    normalized_img = raw_img
-                                else:
-                                    # Use Pexels API to get a high-quality food image
-                                    normalized_img = fetch_pexels_image(it.get('name', ''), fallback_query=ingredients)
-                                
-                                # Final safety check - ensure we always have a valid image path
-                                if not normalized_img or not (normalized_img.startswith('/') or normalized_img.lower().startswith('http')):
-                                    normalized_img = '/static/images/quinoa_salad.jpg'
-                                
-                                # Clean up instructions to remove unnecessary "Step" text
-                                if 'instructions' in it and isinstance(it['instructions'], str):
-                                    cleaned_instructions = it['instructions']
-                                    # Remove trailing "Step." or "Step" from each line
-                                    import re
-                                    cleaned_instructions = re.sub(r'\s*step\.?\s*$', '', cleaned_instructions, flags=re.IGNORECASE)
-                                    cleaned_instructions = re.sub(r'\.\s*step\.?\s*', '. ', cleaned_instructions, flags=re.IGNORECASE)
-                                    it['instructions'] = cleaned_instructions
-                                
-                                # Update the AI item with the normalized image before storing
-                                it['image'] = normalized_img
-                                it['image_url'] = normalized_img
-                                
-                                # Save the full AI item so we can return detail later when card is clicked
-                                ai_id = it.get('id') or random.randint(1000, 9999)
-                                AI_RECIPES[ai_id] = it
-                                card = {
-                                    'id': ai_id,
-                                    'name': it.get('name', 'Recipe'),
-                                    'image': normalized_img,
-                                    'image_url': normalized_img,  # Provide both fields for frontend compatibility
-                                    'short': (it.get('short') or '')[:140],
-                                    'difficulty': it.get('difficulty', difficulty or 'easy'),
-                                    'matched_tokens': mt
-                                }
-                                print(f"[DEBUG] OpenAI item accepted: name={it.get('name')}, cuisine={it.get('cuisine')}, matched_tokens={mt}")
-                                accepted.append(card)
-
-                        if accepted:
-                            # ensure images are usable paths/URLs for frontend
-                            for c in accepted:
-                                try:
-                                    img = c.get('image') or ''
-                                    # If we already have a good path or URL, keep it
-                                    if img and (img.startswith('/') or img.lower().startswith('http')):
-                                        continue
-                                    # Otherwise use fallback
-                                    c['image'] = '/static/images/quinoa_salad.jpg'
-                                except Exception:
-                                    c['image'] = '/static/images/quinoa_salad.jpg'
-                            print('[DEBUG] OpenAI returned items and passed filter validation; using them')
-                            return jsonify({'cards': accepted[:3]})
-                        else:
-                            print('[DEBUG] OpenAI returned items but none passed validation; trying fallback generation')
-                            # FALLBACK: Try a simpler prompt focused just on ingredients
-                            return try_fallback_recipe_generation(ingredients, cuisine, difficulty, tokens)
-                except Exception as e:
-                    print('[DEBUG] Failed to parse JSON from OpenAI response:', str(e))
-                    # Try fallback generation instead of returning empty
-                    return try_fallback_recipe_generation(ingredients, cuisine, difficulty, tokens)
-            else:
-                print('[DEBUG] No JSON array found in OpenAI response; trying fallback generation')
-                return try_fallback_recipe_generation(ingredients, cuisine, difficulty, tokens)
+                    c['image'] = '/static/images/quinoa_salad.jpg'
+            openai_log.debug('OpenAI returned items and passed filter validation; using them')
+            return jsonify({'cards': accepted[:3]})
         except Exception as e:
-            print('[DEBUG] OpenAI call failed or skipped:', str(e))
+            openai_log.warning('OpenAI call failed or skipped: %s', e)
+            if outbound.circuit_open(outbound.OPENAI_BREAKER):
+                return compute_recipe_suggestions(local_only=True)
             # Try fallback generation instead of returning empty
             return try_fallback_recipe_generation(ingredients, cuisine, difficulty, tokens)
 
-    # Local matching is only run when there is no OpenAI API key present.
+    # Local matching is only run when there is no OpenAI API key present (or OpenAI is down).
     if not OPENAI_KEY:
-        candidates = []
-        for r in RECIPES:
-            print('  [DEBUG] evaluating recipe', r['name'])
-            # strict cuisine filter unless user explicitly asked to broaden
-            if cuisine and not broaden and cuisine not in ('', 'something else', 'other') and r['cuisine'].lower() != cuisine:
-                print('    [DEBUG] cuisine mismatch -> skip')
-                continue
-            # diet filter (ignore if user said 'none' or left blank)
-            if diet and not broaden and diet != 'none' and diet not in r['diet'].lower():
-                print('    [DEBUG] diet mismatch -> skip')
-                continue
-            # difficulty filter (validate complexity requirements)
-            if difficulty and not broaden:
-                if not validate_recipe_difficulty(r, difficulty):
-                    print(f'    [DEBUG] difficulty complexity mismatch -> skip (requested: {difficulty})')
-                    continue
-            if taste and not broaden and r['taste'].lower() != taste:
-                print('    [DEBUG] taste mismatch -> skip')
-                continue
-            # meal type filter
-            if data.get('meal') and not broaden:
-                sel_meal = data.get('meal').lower()
-                if 'meal_types' in r and sel_meal not in [m.lower() for m in r.get('meal_types', [])]:
-                    print(f"    [DEBUG] meal type {sel_meal} not in recipe meal_types -> skip")
-                    continue
-            # compute ingredient match score (only check recipe ingredients for strictness)
-            if tokens:
-                match_count = 0
-                matched_tokens = []
-                for tok in tokens:
-                    found = False
-                    for ing in r.get('ingredients', []):
-                        if token_in_text(tok, ing.lower()):
-                            found = True
-                            break
-                    if found:
-                        match_count += 1
-                        matched_tokens.append(tok)
-                        print(f"    [DEBUG] token '{tok}' matched in ingredient for {r['name']}")
-                    else:
-                        print(f"    [DEBUG] token '{tok}' NOT matched in ingredients for {r['name']}")
-                candidates.append((r, match_count, matched_tokens))
+        match_started = time.perf_counter()
+        # the built-in recipes (RECIPE_INDEX) or the SQLite catalog, both indexed by ingredient
+        source = recipe_source()
+        filters = local_recipe_filters(cuisine, diet, difficulty, taste, data.get('meal'), broaden)
+
+        # most matched ingredient tokens first: recipes matching every token come
+        # first (exact matches), then partial matches ordered by coverage
+        ranked = source.search(tokens, filters, limit=3) if tokens else []
+        if ranked:
+            exact = len(ranked[0][1]) == len(tokens)
+            if exact:
+                # prefer exact matches only; partial matches are not mixed in
+                ranked = [item for item in ranked if len(item[1]) == len(tokens)]
+            selected = [item[0] for item in ranked]
+            selected_mtokens = {item[0]['id']: item[1] for item in ranked}
+            if exact:
+                match_log.debug('exact ingredient matches found: %s', [r['name'] for r in selected])
             else:
-                # no ingredient constraints -> candidate with score 0 and no matched tokens
-                candidates.append((r, 0, []))
-
-        # prefer exact matches where all tokens are found in recipe ingredients
-        # build helpers mapping from recipe -> matched_tokens
-        exact_matches = [item[0] for item in candidates if tokens and (len(item) > 1 and item[1] == len(tokens))]
-        if exact_matches:
-            selected = exact_matches[:3]
-            # collect matched tokens for exact matches from candidates
-            selected_mtokens = {}
-            for item in candidates:
-                r = item[0]
-                mt = item[2] if len(item) > 2 else []
-                if r in selected:
-                    selected_mtokens[r['id']] = mt
-            print('[DEBUG] exact ingredient matches found:', [r['name'] for r in selected])
+                match_log.debug('returning partial matches ordered by coverage: %s', [r['name'] for r in selected])
         else:
-            # if no exact matches, return best partial matches (score>0) ordered by coverage
-            partials = [item for item in candidates if (len(item) > 1 and item[1] > 0)]
-            partials.sort(key=lambda x: x[1], reverse=True)
-            selected = [item[0] for item in partials[:3]]
-            selected_mtokens = {item[0]['id']: (item[2] if len(item) > 2 else []) for item in partials[:3]}
-            if selected:
-                print('[DEBUG] returning partial matches ordered by coverage:', [r['name'] for r in selected])
+            selected = []
+            # If no partials found under the strict filters, optionally try a relaxed ingredient-only search
+            # Only run the relaxed search when the user requested broaden=True; otherwise avoid returning
+            # unrelated recipes that match ingredients but not other filters.
+            if broaden:
+                relaxed = source.search(tokens, None, limit=3) if tokens else []
+                if relaxed:
+                    selected = [item[0] for item in relaxed]
+                    selected_mtokens = {item[0]['id']: item[1] for item in relaxed}
+                    match_log.debug('relaxed ingredient-only matches (broaden): %s', [r['name'] for r in selected])
             else:
-                # If no partials found under the strict filters, optionally try a relaxed ingredient-only search
-                # Only run the relaxed search when the user requested broaden=True; otherwise avoid returning
-                # unrelated recipes that match ingredients but not other filters.
-                relaxed = []
-                if broaden:
-                    for r in RECIPES:
-                        match_count = 0
-                        matched_tokens = []
-                        for tok in tokens:
-                            for ing in r.get('ingredients', []):
-                                if token_in_text(tok, ing.lower()):
-                                    match_count += 1
-                                    matched_tokens.append(tok)
-                                    break
-                        if match_count > 0:
-                            relaxed.append((r, match_count, matched_tokens))
-                    relaxed.sort(key=lambda x: x[1], reverse=True)
-                    if relaxed:
-                        selected = [item[0] for item in relaxed[:3]]
-                        selected_mtokens = {item[0]['id']: (item[2] if len(item) > 2 else []) for item in relaxed[:3]}
-                        print('[DEBUG] relaxed ingredient-only matches (broaden):', [r['name'] for r in selected])
+                # no partial matches by ingredient tokens
+                # Fallback 1: match tokens in recipe name/short (helpful when user typed dish names)
+                name_matches = source.text_search(tokens, filters, limit=3) if tokens else []
+                if name_matches:
+                    selected = [item[0] for item in name_matches]
+                    # for name matches, matched tokens are whichever tokens matched name/short
+                    selected_mtokens = {item[0]['id']: item[1] for item in name_matches}
+                    match_log.debug('fallback matched by name/short: %s', [r['name'] for r in selected])
                 else:
-                    # no partial matches by ingredient tokens
-                    # Fallback 1: match tokens in recipe name/short (helpful when user typed dish names)
-                    name_matches = []
-                    if tokens:
-                        for item in candidates:
-                            r = item[0]
-                            name_short = ' '.join([r.get('name', ''), r.get('short', '')]).lower()
-                            for tok in tokens:
-                                if re.search(r"\b" + re.escape(tok) + r"\b", name_short):
-                                    name_matches.append(r)
-                                    break
-                    if name_matches:
-                        selected = name_matches[:3]
-                        # for name matches, matched tokens are whichever tokens matched name/short
-                        selected_mtokens = {}
-                        for r in selected:
-                            matched = []
-                            name_short = ' '.join([r.get('name', ''), r.get('short', '')]).lower()
-                            for tok in tokens:
-                                if re.search(r"\b" + re.escape(tok) + r"\b", name_short):
-                                    matched.append(tok)
-                            selected_mtokens[r['id']] = matched
-                        print('[DEBUG] fallback matched by name/short:', [r['name'] for r in selected])
+                    # Fallback 2: return top recipes in the chosen cuisine if any, otherwise top recipes overall
+                    cuisine_candidates = source.first_matching(filters, cuisine, limit=3)
+                    if cuisine_candidates:
+                        selected = cuisine_candidates
+                        selected_mtokens = {r['id']: [] for r in selected}
+                        match_log.debug('fallback top cuisine recipes: %s', [r['name'] for r in selected])
                     else:
-                        # Fallback 2: return top recipes in the chosen cuisine if any, otherwise top recipes overall
-                        cuisine_candidates = [item[0] for item in candidates if (not cuisine) or item[0]['cuisine'].lower() == cuisine]
-                        if cuisine_candidates:
-                            selected = cuisine_candidates[:3]
-                            selected_mtokens = {r['id']: [] for r in selected}
-                            print('[DEBUG] fallback top cuisine recipes:', [r['name'] for r in selected])
-                        else:
-                            # final fallback: return top recipes from RECIPES
-                            selected = RECIPES[:3]
-                            selected_mtokens = {r['id']: [] for r in selected}
-                            print('[DEBUG] final fallback to top recipes:', [r['name'] for r in selected])
+                        # final fallback: return top recipes from the catalog
+                        selected = source.first_matching(None, '', limit=3)
+                        selected_mtokens = {r['id']: [] for r in selected}
+                        match_log.debug('final fallback to top recipes: %s', [r['name'] for r in selected])
+        metrics.record('match', time.perf_counter() - match_started, LOCAL_MATCH_SECONDS)
     # If the user provided ingredient tokens but we still have no selected recipes,
     # return an empty result set rather than falling back to top recipes. This
     # avoids showing unrelated default cards which confuse users.
     if tokens and (not selected):
-        print('[DEBUG] no matches for provided ingredients; returning empty cards')
+        match_log.debug('no matches for provided ingredients; returning empty cards')
         return jsonify({'cards': []})
 
-    # build cards with matched tokens info (recompute per-card to be deterministic)
+    # build cards with matched tokens info: ingredient matches first, then name/short
+    # matches for the remaining tokens, both read from the recipe index
+    card_tokens = source.matched_tokens([r['id'] for r in selected], tokens) if tokens else {}
     cards = []
     for r in selected:
-        card = {k: r[k] for k in ('id', 'name', 'image', 'short')}
+        card = {k: r.get(k) for k in ('id', 'name', 'image', 'short')}
         card['difficulty'] = r.get('difficulty', 'easy')  # Add difficulty to card
-        matched = []
-        if tokens:
-            # check ingredients first
-            for tok in tokens:
-                found = False
-                for ing in r.get('ingredients', []):
-                    if token_in_text(tok, ing.lower()):
-                        matched.append(tok)
-                        found = True
-                        break
-                if not found:
-                    # also check name/short as fallback
-                    name_short = ' '.join([r.get('name', ''), r.get('short', '')]).lower()
-                    if re.search(r"\b" + re.escape(tok) + r"\b", name_short):
-                        matched.append(tok)
-        card['matched_tokens'] = matched
-        # Prefer existing local image for this recipe; only fetch a fallback if none exists
-        try:
-            img = r.get('image') or ''
-            # Keep absolute URLs, but reject placeholders
-            if isinstance(img, str) and (img.lower().startswith('http://') or img.lower().startswith('https://')):
-                # Use helper function to replace placeholder URLs
-                card['image'] = replace_placeholder_image(img, r.get('name', ''), r.get('cuisine', ''))
-            elif isinstance(img, str) and img.startswith('/'):
-                candidate = os.path.join(app.root_path, img.lstrip('/'))
-                if os.path.exists(candidate) and os.path.getsize(candidate) > 100:
-                    card['image'] = img
-                else:
-                    card['image'] = fetch_ingredient_image(r, r.get('cuisine'))
-            else:
-                # No valid provided image; fetch based on main ingredient
-                card['image'] = fetch_ingredient_image(r, r.get('cuisine'))
-        except Exception:
-            card['image'] = '/static/images/quinoa_salad.jpg'
+        card['matched_tokens'] = card_tokens.get(r['id'], [])
         cards.append(card)
-    print('[DEBUG] returning cards:', cards)
+
+    # Prefer existing local image for each recipe; only fetch a fallback if none exists.
+    # Any remote lookups for the response run in parallel.
+    def card_image(r):
+        img = r.get('image') or ''
+        # Keep absolute URLs, but reject placeholders
+        if isinstance(img, str) and (img.lower().startswith('http://') or img.lower().startswith('https://')):
+            # Use helper function to replace placeholder URLs
+            return replace_placeholder_image(img, r.get('name', ''), r.get('cuisine', ''))
+        if isinstance(img, str) and img.startswith('/'):
+            if (IMAGE_CATALOG.static_size(img) or 0) > 100:
+                return img
+        # No valid provided image; fetch based on main ingredient
+        return fetch_ingredient_image(r, r.get('cuisine'))
+
+    def local_image(r):
+        img = r.get('image') or ''
+        if isinstance(img, str) and img.startswith('/') and (IMAGE_CATALOG.static_size(img) or 0) > 100:
+            return img
+        return None
+
+    # With DEFER_CARD_IMAGES only recipes lacking a usable local image wait for a lookup
+    slow = [r for r in selected if not (DEFER_CARD_IMAGES and local_image(r))]
+    resolved, deferred = resolve_or_defer_images(
+        [(lambda r=r: card_image(r)) for r in slow], [r.get('name', '') for r in slow])
+    resolved = {r['id']: (img, job) for r, img, job in zip(slow, resolved, deferred)}
+    for r, card in zip(selected, cards):
+        img, job = resolved.get(r['id'], (local_image(r), None))
+        card['image'] = STATIC_FINGERPRINTS.url(img or '/static/images/quinoa_salad.jpg')
+        if job:
+            DEFERRED_IMAGES.defer(card, job)
+    match_log.debug('returning cards: %s', cards)
     return jsonify({'cards': cards})
 
 
-@app.route('/suggest', methods=['POST'])
-def suggest_route():
-    """
-    Frontend-friendly endpoint for recipe suggestions.
-    Takes: ingredients, cuisine, difficulty  
-    Returns: 1-3 recipe cards with title, description, image, and view button data
-    """
-    data = request.json or {}
-    print(f'[DEBUG] /suggest called with: {data}')
-    
+# Helper: the /api/recipes request that /suggest and /suggest/stream make from frontend input
+def suggest_request_data(data):
     # Extract and clean parameters
     ingredients = data.get('ingredients', '')
     cuisine = data.get('cuisine', '')
@@ -1493,16 +3836,48 @@ def suggest_route():
         ingredients = ', '.join(ingredients)
     ingredients = str(ingredients).strip()
     
-    if not ingredients:
-        return jsonify({'cards': [], 'error': 'No ingredients provided'})
-    
-    # Create a new request context with the cleaned data
-    recipe_request_data = {
+    return {
         'ingredients': ingredients,
         'cuisine': cuisine.lower().strip() if cuisine else '',
         'difficulty': difficulty.lower().strip() if difficulty else '',
         'broaden': False
     }
+
+
+# Helper: shape an /api/recipes card the way the frontend expects it
+def format_suggest_card(card, i=0, cuisine=''):
+    # Ensure both image fields use real URLs, not placeholders
+    image_value = card.get('image', '/static/images/quinoa_salad.jpg')
+    final_image = replace_placeholder_image(image_value, card.get('name', ''), cuisine)
+    
+    return {
+        'id': card.get('id', i + 1),
+        'name': card.get('name', 'Delicious Recipe'),
+        'title': card.get('name', 'Delicious Recipe'),  # Frontend expects 'title'
+        'short': card.get('short', 'A wonderful recipe to try!'),
+        'description': card.get('short', 'A wonderful recipe to try!'),  # Frontend expects 'description'
+        'image': final_image,
+        'image_url': final_image,  # Provide both fields with consistent real URLs
+        **({'image_pending': True} if card.get('image_pending') else {})
+    }
+
+
+@app.route('/suggest', methods=['POST'])
+def suggest_route():
+    """
+    Frontend-friendly endpoint for recipe suggestions.
+    Takes: ingredients, cuisine, difficulty  
+    Returns: 1-3 recipe cards with title, description, image, and view button data
+    """
+    data = request.json or {}
+    suggest_log.debug('/suggest called with: %s', data)
+    
+    recipe_request_data = suggest_request_data(data)
+    ingredients = recipe_request_data['ingredients']
+    cuisine = data.get('cuisine', '')
+    
+    if not ingredients:
+        return jsonify({'cards': [], 'error': 'No ingredients provided'})
     
     # Use the existing suggest_recipes logic directly
     with app.test_request_context('/api/recipes', method='POST', json=recipe_request_data):
@@ -1527,28 +3902,13 @@ def suggest_route():
             limited_cards = cards[:3] if len(cards) > 3 else cards
             
             # Ensure each card has required fields for frontend
-            formatted_cards = []
-            for i, card in enumerate(limited_cards):
-                # Ensure both image fields use real URLs, not placeholders
-                image_value = card.get('image', '/static/images/quinoa_salad.jpg')
-                final_image = replace_placeholder_image(image_value, card.get('name', ''), cuisine)
-                
-                formatted_card = {
-                    'id': card.get('id', i + 1),
-                    'name': card.get('name', 'Delicious Recipe'),
-                    'title': card.get('name', 'Delicious Recipe'),  # Frontend expects 'title'
-                    'short': card.get('short', 'A wonderful recipe to try!'),
-                    'description': card.get('short', 'A wonderful recipe to try!'),  # Frontend expects 'description'
-                    'image': final_image,
-                    'image_url': final_image  # Provide both fields with consistent real URLs
-                }
-                formatted_cards.append(formatted_card)
+            formatted_cards = [format_suggest_card(card, i, cuisine) for i, card in enumerate(limited_cards)]
             
-            print(f'[DEBUG] /suggest returning {len(formatted_cards)} formatted cards')
+            suggest_log.debug('/suggest returning %s formatted cards', len(formatted_cards))
             return jsonify({'cards': formatted_cards})
             
         except Exception as e:
-            print(f'[ERROR] Error in suggest_recipes call: {str(e)}')
+            suggest_log.error('Error in suggest_recipes call: %s', e)
             # Return fallback cards
             fallback_cards = [{
                 'id': 1,
@@ -1562,40 +3922,236 @@ def suggest_route():
             return jsonify({'cards': fallback_cards})
 
 
+# Helper: one Server-Sent Events message
+def sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+# Helper: /api/recipes cards for ``data`` as a list (local matching has nothing to stream)
+def buffered_suggestion_cards(data):
+    # collect first: a generator must not yield while a nested request context is pushed
+    with app.test_request_context('/api/recipes', method='POST', json=data):
+        return (suggest_recipes().get_json() or {}).get('cards') or []
+
+
+def stream_suggestion_cards(data):
+    """
+    Yield /api/recipes-style cards for ``data`` one at a time, as soon as each is ready.
+
+    With an OpenAI key the chat completion is streamed and parsed with
+    JSONArrayStream: every recipe object is validated with
+    item_matches_filters, given an image and yielded before the model has
+    finished the next one. Cached results, local matching (no key, or the
+    OpenAI circuit is open) and the fallback prompt have nothing to stream,
+    so their cards are yielded in one go. Whatever was sent is stored in
+    SUGGESTION_CACHE, shared with /api/recipes.
+    """
+    key = suggestion_cache_key(data)
+    body = SUGGESTION_CACHE.get(key)
+    if body is not None:
+        cached = cached_cards_for_request(json.loads(body).get('cards') or [], data)
+        if cached is not None:
+            suggest_log.debug('suggestion cache hit (stream): %s', key)
+            CACHE_REQUESTS.inc(cache='suggestions', result='hit')
+            yield from DEFERRED_IMAGES.fill_ready(cached)
+            return
+        SUGGESTION_CACHE.invalidate(key)
+
+    OPENAI_KEY = load_openai_key()
+    if not OPENAI_KEY or outbound.circuit_open(outbound.OPENAI_BREAKER):
+        yield from buffered_suggestion_cards(data)
+        return
+
+    ingredients = data.get('ingredients', '')
+    cuisine = (data.get('cuisine') or '').strip().lower()
+    diet = (data.get('diet') or '').strip().lower()
+    difficulty = (data.get('difficulty') or '').strip().lower()
+    broaden = data.get('broaden', False)
+    tokens = [t.strip() for t in re.split(r"\W+", ingredients.lower()) if t.strip()]
+
+    cards = []
+    parser = JSONArrayStream()
+    model = config.settings().openai_model
+    try:
+        # timed until the stream opens; the completion itself arrives while cards are sent
+        with metrics.timed('openai', OPENAI_SECONDS, model=model, kind='stream'):
+            stream = outbound.openai_chat(
+                OPENAI_KEY,
+                model=model,
+                messages=build_suggestion_messages(data, ingredients, cuisine, diet, difficulty, broaden),
+                max_tokens=800,
+                temperature=0.6,
+                stream=True,
+            )
+        seen = 0
+        try:
+            for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                for it in parser.feed(delta or ''):
+                    seen += 1
+                    if seen > 6:
+                        break
+                    classify_recipes([it])
+                    if not item_matches_filters(it, cuisine, diet, difficulty, data.get('meal'), broaden):
+                        continue
+                    mt = prepare_ai_item(it, tokens, broaden)
+                    images, deferred = resolve_or_defer_images(
+                        [lambda it=dict(it): ai_item_image(it, ingredients)], [it.get('name', '')])
+                    card = store_ai_card(it, mt, images[0], difficulty)
+                    if card is None:
+                        continue
+                    if deferred[0]:
+                        defer_ai_image(card, deferred[0])
+                    cards.append(card)
+                    yield card
+                    if len(cards) == 3:
+                        break
+                # same limits as the buffered path: three cards out of at most six items
+                if len(cards) == 3 or seen >= 6 or parser.done:
+                    break
+        finally:
+            close = getattr(stream, 'close', None)
+            if close:
+                close()
+    except Exception as e:
+        openai_log.warning('OpenAI streaming call failed: %s', e)
+        if not parser.text:
+            if outbound.circuit_open(outbound.OPENAI_BREAKER):
+                yield from buffered_suggestion_cards(data)  # local matching, like /api/recipes
+            return  # Strict OpenAI-only: nothing on failure, like /api/recipes
+
+    openai_log.debug('OpenAI streamed text snippet: %s', parser.text[:300])
+    response_log.info('%s\n---', parser.text.replace('\n', ' '))
+
+    if not cards:
+        openai_log.info('OpenAI stream produced no accepted items; trying fallback generation')
+        cards = (try_fallback_recipe_generation(ingredients, cuisine, difficulty, tokens).get_json() or {}).get('cards') or []
+        yield from cards
+    if cards:
+        SUGGESTION_CACHE.set(key, json.dumps({'cards': cards}))
+
+
+@app.route('/suggest/stream', methods=['GET', 'POST'])
+def suggest_stream_route():
+    """
+    Streaming variant of /suggest using Server-Sent Events.
+    Takes: the /suggest fields as JSON (POST) or query parameters (GET, for EventSource)
+    Sends: a ``card`` event per recipe card (same fields as /suggest) as soon as it
+    is ready, then a ``done`` event with the card count (and, with SERVER_TIMING,
+    the request's Server-Timing breakdown as ``server_timing``)
+    """
+    data = (request.get_json(silent=True) or {}) if request.method == 'POST' else request.args.to_dict()
+    suggest_log.debug('/suggest/stream called with: %s', data)
+    recipe_request_data = suggest_request_data(data)
+    cuisine = data.get('cuisine', '')
+    timing = metrics.current_timing()
+
+    def events():
+        sent = 0
+        if recipe_request_data['ingredients']:
+            try:
+                for card in stream_suggestion_cards(recipe_request_data):
+                    yield sse_event('card', format_suggest_card(card, sent, cuisine))
+                    sent += 1
+            except Exception as e:
+                suggest_log.error('Error while streaming suggestions: %s', e)
+                yield sse_event('error', {'error': 'suggestions_failed'})
+        CARDS_PER_RESPONSE.observe(sent, route='/suggest/stream')
+        done = {'count': sent}
+        if SERVER_TIMING and timing is not None:
+            done['server_timing'] = timing.header()
+        yield sse_event('done', done)
+
+    response = Response(stream_with_context(events()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # let nginx-style proxies pass events through
+    return response
+
+
+# Helper: an AI recipe in the shape of a local one for the detail view (None when missing)
+def shape_ai_recipe(recipe_id, it):
+    if it is None:
+        return None
+    # return the AI-provided item (ensure minimal shaping matches local format)
+
+    # Process image to ensure proper URL/path, replacing any placeholder URLs
+    raw_img = it.get('image') or ''
+    processed_image = replace_placeholder_image(raw_img, it.get('name', ''), it.get('cuisine', ''))
+    
+    # Final safety check - ensure we always have a valid image path
+    if not processed_image or not (processed_image.startswith('/') or processed_image.lower().startswith('http')):
+        processed_image = STATIC_FINGERPRINTS.url('/static/images/quinoa_salad.jpg')
+    
+    shaped = {
+        'id': recipe_id,
+        'name': it.get('name'),
+        'cuisine': it.get('cuisine'),
+        'diet': it.get('diet'),
+        'difficulty': it.get('difficulty'),
+        'image': processed_image,
+        'image_url': processed_image,  # Provide both fields for frontend compatibility
+        'short': it.get('short'),
+        'ingredients': it.get('ingredients') or [],
+        'instructions': it.get('instructions') or '',
+        'nutrition': it.get('nutrition') or {},
+        'meal_types': it.get('meal_types') or []
+    }
+    return shaped
+
+
 @app.route('/api/recipe/<int:recipe_id>')
 def recipe_detail(recipe_id):
+    """
+    Full recipe for a card, with an ETag (If-None-Match answers 304).
+    An AI recipe is shaped and serialized once per stored version: shaping
+    may look up a replacement image on Pexels. A local recipe is serialized
+    once per recipe source generation.
+    """
     # First check AI-generated recipes cache
-    if recipe_id in AI_RECIPES:
-        # return the AI-provided item (ensure minimal shaping matches local format)
-        it = AI_RECIPES[recipe_id]
-        
-        # Process image to ensure proper URL/path, replacing any placeholder URLs
-        raw_img = it.get('image') or ''
-        processed_image = replace_placeholder_image(raw_img, it.get('name', ''), it.get('cuisine', ''))
-        
-        # Final safety check - ensure we always have a valid image path
-        if not processed_image or not (processed_image.startswith('/') or processed_image.lower().startswith('http')):
-            processed_image = '/static/images/quinoa_salad.jpg'
-        
-        shaped = {
-            'id': recipe_id,
-            'name': it.get('name'),
-            'cuisine': it.get('cuisine'),
-            'diet': it.get('diet'),
-            'difficulty': it.get('difficulty'),
-            'image': processed_image,
-            'image_url': processed_image,  # Provide both fields for frontend compatibility
-            'short': it.get('short'),
-            'ingredients': it.get('ingredients') or [],
-            'instructions': it.get('instructions') or '',
-            'nutrition': it.get('nutrition') or {},
-            'meal_types': it.get('meal_types') or []
-        }
-        return jsonify(shaped)
-    r = next((x for x in RECIPES if x['id'] == recipe_id), None)
-    if not r:
-        return jsonify({'error': 'Not found'}), 404
-    return jsonify(r)
+    version = AI_RECIPES.version(recipe_id)
+    if version is not None:
+        cached = JSON_RESPONSE_CACHE.get(('recipe', recipe_id), version)
+        if cached is None:
+            shaped = shape_ai_recipe(recipe_id, AI_RECIPES.get(recipe_id))
+            if shaped is not None:
+                cached = JSON_RESPONSE_CACHE.set(('recipe', recipe_id), version, json.dumps(shaped))
+        if cached is not None:
+            return etag_json_response(*cached)
+    # Local recipes: serialized once per catalog generation (the body also
+    # holds the image's fingerprinted URL)
+    version = (recipe_source().generation(), STATIC_FINGERPRINTS.generation())
+    cached = JSON_RESPONSE_CACHE.get(('recipe', recipe_id), version)
+    if cached is None:
+        r = get_local_recipe(recipe_id)
+        if not r:
+            return jsonify({'error': 'Not found'}), 404
+        body = json.dumps(dict(public_recipe(r), image=STATIC_FINGERPRINTS.url(r.get('image'))))
+        # the fingerprint generation read after url(), so a digest computed for
+        # this body does not invalidate it straight away
+        version = (version[0], STATIC_FINGERPRINTS.generation())
+        cached = JSON_RESPONSE_CACHE.set(('recipe', recipe_id), version, body)
+    return etag_json_response(*cached)
+
+
+@app.route('/api/recipe/<int:recipe_id>/image')
+def recipe_image(recipe_id):
+    """
+    Image of a card that was sent with a placeholder (DEFER_CARD_IMAGES).
+    Takes: ?wait=N to long-poll up to N seconds (capped at DEFERRED_IMAGE_MAX_WAIT)
+    Returns: {'id', 'status': 'ready'|'pending'|'unknown', 'image', 'image_url'}
+    """
+    try:
+        wait = min(max(float(request.args.get('wait') or 0), 0), DEFERRED_IMAGE_MAX_WAIT)
+    except ValueError:
+        wait = 0
+    entry = DEFERRED_IMAGES.get(recipe_id, wait=wait)
+    if entry is None:
+        # not deferred in this worker (or forgotten): report what the recipe currently has
+        recipe = AI_RECIPES.get(recipe_id) or get_local_recipe(recipe_id) or {}
+        image = STATIC_FINGERPRINTS.url(recipe.get('image'))
+        status = 'pending' if recipe.get('image_pending') else 'ready' if image else 'unknown'
+        entry = {'status': status, 'image': image}
+    return jsonify({'id': recipe_id, 'status': entry['status'], 'image': entry['image'], 'image_url': entry['image']})
 
 
 @app.route('/api/expand-recipe', methods=['POST'])
@@ -1604,40 +4160,32 @@ def expand_recipe():
     rid = data.get('id')
     if not rid:
         return jsonify({'error': 'missing_id'}), 400
+    # an AI recipe's cached expansion is answered (or 304'd) without loading the recipe
+    version = AI_RECIPES.version(rid)
+    if version is not None:
+        cached = JSON_RESPONSE_CACHE.get(('expanded', rid), version)
+        if cached is not None:
+            return etag_json_response(*cached)
     # find base recipe (AI or local)
     base = AI_RECIPES.get(rid)
+    is_ai = base is not None
     if not base:
-        base = next((x for x in RECIPES if x.get('id') == rid), None)
+        base = get_local_recipe(rid)
     if not base:
         return jsonify({'error': 'not_found'}), 404
 
     # If we've already expanded this recipe, return cached expansion
     try:
         if isinstance(base, dict) and base.get('expanded'):
-            return jsonify({'expanded': base.get('expanded')}), 200
+            body = json.dumps({'expanded': base.get('expanded')})
+            if is_ai and version is not None:
+                return etag_json_response(*JSON_RESPONSE_CACHE.set(('expanded', rid), version, body))
+            return etag_json_response(body, json_etag(body))
     except Exception:
         pass
 
     # Ensure OpenAI key is available
-    OPENAI_KEY = _os.environ.get('OPENAI_API_KEY')
-    if not OPENAI_KEY:
-        # try reading .env
-        try:
-            possible = [os.path.join(app.root_path, '.env'), os.path.join(app.root_path, 'data', '.env')]
-            for p in possible:
-                if os.path.exists(p):
-                    with open(p, 'r', encoding='utf-8') as fh:
-                        for line in fh:
-                            if line.strip().startswith('OPENAI_API_KEY'):
-                                parts = line.split('=', 1)
-                                if len(parts) > 1:
-                                    OPENAI_KEY = parts[1].strip().strip('"').strip("'")
-                                    _os.environ['OPENAI_API_KEY'] = OPENAI_KEY
-                                    break
-                if OPENAI_KEY:
-                    break
-        except Exception:
-            pass
+    OPENAI_KEY = load_openai_key()
     if not OPENAI_KEY:
         return jsonify({'error': 'openai_key_missing'}), 400
 
@@ -1660,36 +4208,40 @@ def expand_recipe():
     user = f"Expand this recipe into detailed ingredients with quantities and step-by-step instructions: {json.dumps(user_payload)}"
 
     try:
-        from openai import OpenAI
-        client = OpenAI(api_key=OPENAI_KEY)
-        resp = client.chat.completions.create(
-            model=os.environ.get('OPENAI_MODEL') or 'gpt-3.5-turbo',
-            messages=[{'role': 'system', 'content': system}, {'role': 'user', 'content': user}],
-            max_tokens=500,
-            temperature=0.2,
-        )
+        model = config.settings().openai_model
+        with metrics.timed('openai', OPENAI_SECONDS, model=model, kind='expand'):
+            resp = outbound.openai_chat(
+                OPENAI_KEY,
+                model=model,
+                messages=[{'role': 'system', 'content': system}, {'role': 'user', 'content': user}],
+                max_tokens=500,
+                temperature=0.2,
+            )
         try:
             text = resp.choices[0].message.content
         except Exception:
             text = str(resp)
         # extract first JSON object
-        import re as _re
-        m = _re.search(r"(\{[\s\S]*\})", text)
+        m = re.search(r"(\{[\s\S]*\})", text)
         if not m:
             return jsonify({'error': 'no_json_returned', 'raw': text}), 502
         raw = m.group(1)
         expanded = json.loads(raw)
         # cache in AI_RECIPES (if base is AI item) or attach to local mapping
         try:
-            if rid in AI_RECIPES:
-                AI_RECIPES[rid]['expanded'] = expanded
+            if is_ai:
+                AI_RECIPES.update(rid, expanded=expanded)
             else:
                 # attach expanded to base recipe object for later retrieval
                 if isinstance(base, dict):
                     base['expanded'] = expanded
+                    recipe_source().update(base)
         except Exception:
             pass
-        return jsonify({'expanded': expanded}), 200
+        body = json.dumps({'expanded': expanded})
+        return etag_json_response(body, json_etag(body))
+    except outbound.CircuitOpenError:
+        return jsonify({'error': 'openai_unavailable'}), 503
     except Exception as e:
         return jsonify({'error': 'openai_failed', 'detail': str(e)}), 502
 
@@ -1752,23 +4304,26 @@ def recipe_feedback():
         return jsonify({'status': 'success', 'message': 'Feedback received'})
         
     except Exception as e:
-        print(f'Error saving recipe feedback: {e}')
+        log.error('Error saving recipe feedback: %s', e)
         return jsonify({'status': 'error', 'message': 'Failed to save feedback'}), 500
 
 
 @app.route('/api/list-images')
 def list_images():
-    """List all available images in the static/images directory"""
+    """List all available images in the static/images directory (from IMAGE_CATALOG, cached per catalog generation, with an ETag)"""
     try:
-        images_dir = os.path.join('static', 'images')
-        if os.path.exists(images_dir):
-            images = [f for f in os.listdir(images_dir) if f.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.webp'))]
-            images.sort()  # Sort alphabetically for consistent ordering
-            return jsonify({
-                'status': 'success',
-                'images': images,
-                'count': len(images)
-            })
+        if os.path.isdir(IMAGE_CATALOG.images_dir):
+            generation = IMAGE_CATALOG.generation()
+            cached = JSON_RESPONSE_CACHE.get(('images',), generation)
+            if cached is None:
+                images = [f for f in IMAGE_CATALOG.names() if f.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.webp'))]
+                images.sort()  # Sort alphabetically for consistent ordering
+                cached = JSON_RESPONSE_CACHE.set(('images',), generation, json.dumps({
+                    'status': 'success',
+                    'images': images,
+                    'count': len(images)
+                }))
+            return etag_json_response(*cached)
         else:
             return jsonify({
                 'status': 'error',
@@ -1777,7 +4332,7 @@ def list_images():
                 'count': 0
             })
     except Exception as e:
-        print(f'Error listing images: {e}')
+        log.error('Error listing images: %s', e)
         return jsonify({
             'status': 'error',
             'message': f'Failed to list images: {str(e)}',
@@ -1786,11 +4341,60 @@ def list_images():
         }), 500
 
 
+def load_recipe_dump(path):
+    """
+    Read recipes from a JSON (list or {"recipes": [...]}), JSON Lines or CSV file.
+
+    CSV columns match the recipe fields; ``ingredients`` and ``meal_types`` are
+    '|' separated and ``calories``/``protein``/``fat``/``carbs`` become ``nutrition``.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, 'r', encoding='utf-8') as fh:
+        if ext == '.csv':
+            import csv
+            recipes = []
+            for row in csv.DictReader(fh):
+                recipe = {k: v for k, v in row.items() if k and v not in (None, '')}
+                for field in ('ingredients', 'meal_types'):
+                    if field in recipe:
+                        recipe[field] = [part.strip() for part in recipe[field].split('|') if part.strip()]
+                nutrition = {k: float(recipe.pop(k)) for k in ('calories', 'protein', 'fat', 'carbs') if k in recipe}
+                if nutrition:
+                    recipe['nutrition'] = nutrition
+                for field in ('id', 'time'):
+                    if field in recipe:
+                        recipe[field] = int(recipe[field])
+                recipes.append(recipe)
+            return recipes
+        if ext in ('.jsonl', '.ndjson'):
+            return [json.loads(line) for line in fh if line.strip()]
+        loaded = json.load(fh)
+        return loaded.get('recipes', []) if isinstance(loaded, dict) else loaded
+
+
+@app.cli.command('import-recipes')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--catalog', default=None, help='SQLite catalog file (defaults to RECIPE_CATALOG_PATH or data/recipes.sqlite3).')
+@click.option('--replace', is_flag=True, help='Delete the existing catalog contents first.')
+def import_recipes_command(path, catalog, replace):
+    """Bulk-load a JSON/JSONL/CSV recipe dump into the SQLite recipe catalog."""
+    catalog_path = catalog or RECIPE_CATALOG_PATH or os.path.join(app.root_path, 'data', 'recipes.sqlite3')
+    recipes = load_recipe_dump(path)
+    target = RecipeCatalog(catalog_path)
+    if len(target) == 0 and not replace:
+        # a new catalog starts with the built-in recipes
+        target.import_recipes(RECIPES)
+    count = target.import_recipes(recipes, replace=replace)
+    click.echo(f"Imported {count} recipes into {catalog_path} ({len(target)} total)")
+    if not RECIPE_CATALOG_PATH:
+        click.echo(f"Set RECIPE_CATALOG_PATH={catalog_path} to serve suggestions from it")
+
+
 if __name__ == '__main__':
     # Get port from environment variable (Cloud Run uses PORT)
     port = int(os.environ.get('PORT', 8000))
     host = os.environ.get('HOST', '127.0.0.1')
-    debug = os.environ.get('FLASK_ENV', 'development') == 'development'
+    debug = config.settings().profile == 'development'
     
     if debug:
         print("*** Starting Grace's Cooking Chatbot...")
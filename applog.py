@@ -0,0 +1,153 @@
+"""
+Queue-backed logging for the app.
+
+Request threads only put records on an in-memory queue; a QueueListener
+thread does all the writing: the console, and the OpenAI response log
+(``app.openai_responses``) through a size-rotated file. A full queue drops
+the record instead of blocking the request.
+
+Loggers are named by category (``app.images``, ``app.openai``, ``app.match``,
+``app.suggest``, ``app.http``, ...). Below WARNING, each category can be
+sampled so chatty per-item debug lines keep a representative share under
+load; warnings and errors are never sampled out. Level and sampling follow
+config reloads.
+
+Settings (environment):
+    LOG_LEVEL             minimum level (default DEBUG in development, INFO in production)
+    LOG_SAMPLING          per-category keep rates, e.g. "app.openai=0.1,app.match=0.5"
+                          (the longest matching category prefix wins; default 1)
+    LOG_QUEUE_SIZE        records buffered for the writer thread (default 10000)
+    OPENAI_LOG_PATH       response log file (default data/openai_responses.log)
+    OPENAI_LOG_MAX_BYTES  size at which the response log rotates (default 5 MiB)
+    OPENAI_LOG_BACKUPS    rotated response logs kept (default 3)
+"""
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+
+import config
+
+RESPONSES_LOGGER = 'app.openai_responses'
+
+_listener = None
+_queue_handler = None
+_lock = threading.Lock()
+
+
+def parse_sampling(spec):
+    """Parse "category=rate,..." into a dict, skipping malformed entries."""
+    rates = {}
+    for part in (spec or '').split(','):
+        name, _, rate = part.partition('=')
+        try:
+            rates[name.strip()] = min(1.0, max(0.0, float(rate)))
+        except ValueError:
+            continue
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a random share of sub-WARNING records per logger category."""
+
+    def __init__(self, rates=None):
+        super().__init__()
+        self.rates = dict(rates or {})
+
+    def rate_for(self, name):
+        best, rate = -1, 1.0
+        for category, value in self.rates.items():
+            if (name == category or name.startswith(category + '.')) and len(category) > best:
+                best, rate = len(category), value
+        return rate
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate_for(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records when the queue is full rather than blocking or raising."""
+
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _ResponsesOnly(logging.Filter):
+    def filter(self, record):
+        return record.name == RESPONSES_LOGGER
+
+
+class _NotResponses(logging.Filter):
+    def filter(self, record):
+        return record.name != RESPONSES_LOGGER
+
+
+def _level(settings):
+    default = 'DEBUG' if settings.profile == 'development' else 'INFO'
+    return getattr(logging, (settings.get('LOG_LEVEL') or default).upper(), logging.INFO)
+
+
+def configure(settings):
+    """Apply LOG_LEVEL and LOG_SAMPLING from ``settings`` (called again on config reload)."""
+    logging.getLogger('app').setLevel(_level(settings))
+    if _queue_handler is not None:
+        for f in _queue_handler.filters:
+            if isinstance(f, SamplingFilter):
+                f.rates = parse_sampling(settings.get('LOG_SAMPLING'))
+
+
+def setup():
+    """Install the queue handler on the ``app`` logger and start the writer thread (once)."""
+    global _listener, _queue_handler
+    with _lock:
+        if _listener is not None:
+            return
+        settings = config.settings()
+        records = queue.Queue(int(settings.get('LOG_QUEUE_SIZE') or 10000))
+
+        console = logging.StreamHandler(sys.stdout)
+        console.setFormatter(logging.Formatter('[%(levelname)s] %(name)s: %(message)s'))
+        console.addFilter(_NotResponses())
+
+        path = settings.get('OPENAI_LOG_PATH') or os.path.join(config.ROOT, 'data', 'openai_responses.log')
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        responses = logging.handlers.RotatingFileHandler(
+            path,
+            maxBytes=int(settings.get('OPENAI_LOG_MAX_BYTES') or 5 * 1024 * 1024),
+            backupCount=int(settings.get('OPENAI_LOG_BACKUPS') or 3),
+            encoding='utf-8',
+            delay=True,
+        )
+        file_format = logging.Formatter('%(asctime)s.%(msecs)03dZ -- %(message)s', '%Y-%m-%dT%H:%M:%S')
+        file_format.converter = time.gmtime
+        responses.setFormatter(file_format)
+        responses.addFilter(_ResponsesOnly())
+
+        _queue_handler = DroppingQueueHandler(records)
+        _queue_handler.addFilter(SamplingFilter())
+        root = logging.getLogger('app')
+        root.addHandler(_queue_handler)
+        root.propagate = False
+
+        _listener = logging.handlers.QueueListener(records, console, responses)
+        _listener.start()
+        atexit.register(_listener.stop)
+    config.on_reload(configure)
+
+
+def dropped():
+    """Records dropped because the queue was full (this process)."""
+    return _queue_handler.dropped if _queue_handler is not None else 0
@@ -0,0 +1,120 @@
+"""
+Benchmark: trigram index vs. the old difflib scan for fuzzy image name matching.
+
+Builds synthetic catalogs of image base names shaped like static/images
+(``<ingredient>_<dish>_pexels`` and ``cached_<hex>``), then times the lookup
+used by normalize_image_value both ways for a set of misspelled queries.
+
+Run from the project root:
+    python bench/bench_image_fuzzy_match.py
+    python bench/bench_image_fuzzy_match.py --sizes 1000 10000 --queries 100
+"""
+import argparse
+import difflib
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app import TrigramIndex  # noqa: E402
+
+INGREDIENTS = ['chicken', 'paneer', 'egg', 'rice', 'potato', 'tomato', 'broccoli', 'spinach', 'tofu',
+               'beef', 'pork', 'shrimp', 'lentil', 'chickpea', 'mushroom', 'cauliflower', 'carrot', 'okra']
+STYLES = ['indian', 'italian', 'chinese', 'mexican', 'thai', 'spicy', 'creamy', 'garlic', 'lemon', 'easy']
+DISHES = ['curry', 'masala', 'stir_fry', 'biryani', 'pulao', 'salad', 'soup', 'pasta', 'tacos', 'bowl',
+          'fried_rice', 'korma', 'tikka', 'omelette', 'bhurji', 'casserole', 'skewers', 'wrap']
+
+
+def synthetic_names(n, rng):
+    names = set()
+    while len(names) < n:
+        if rng.random() < 0.25:
+            names.add('cached_%016x' % rng.getrandbits(64))
+        else:
+            parts = [rng.choice(INGREDIENTS)]
+            for _ in range(rng.randint(0, 2)):
+                parts.append(rng.choice(STYLES))
+            parts.append(rng.choice(DISHES))
+            if rng.random() < 0.5:
+                parts.append(rng.choice(INGREDIENTS))
+            name = '_'.join(parts) + ('_pexels' if rng.random() < 0.8 else '')
+            if name in names:
+                name += '_%d' % rng.randint(2, 999)
+            names.add(name)
+    return sorted(names)
+
+
+def misspell(name, rng):
+    """Simulate an AI-provided image name: typos, dropped suffix, dropped word."""
+    words = name.split('_')
+    if words[-1] == 'pexels' and rng.random() < 0.5:
+        words = words[:-1]
+    if len(words) > 2 and rng.random() < 0.3:
+        del words[rng.randrange(len(words))]
+    text = list('_'.join(words))
+    for _ in range(rng.randint(0, 2)):
+        i = rng.randrange(len(text))
+        text[i] = rng.choice('abcdefghijklmnopqrstuvwxyz')
+    return ''.join(text)
+
+
+def difflib_best(query, names, threshold=0.5):
+    """The lookup as normalize_image_value used to do it: score every file."""
+    scores = [(difflib.SequenceMatcher(None, query, name).ratio(), name) for name in names]
+    best = max(scores)
+    return best if best[0] > threshold else None
+
+
+def run(size, n_queries, seed):
+    rng = random.Random(seed)
+    names = synthetic_names(size, rng)
+    named = [n for n in names if not n.startswith('cached_')]
+    queries = [misspell(rng.choice(named), rng) for _ in range(n_queries)]
+
+    t0 = time.perf_counter()
+    index = TrigramIndex(names)
+    build_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    indexed = [index.best_match(q) for q in queries]
+    index_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    scanned = [difflib_best(q, names) for q in queries]
+    scan_s = time.perf_counter() - t0
+
+    # agreement: same accept/reject decision and a match as similar as the
+    # full scan's best ("exact") or within 0.05 of it ("near")
+    def agreement(tolerance):
+        return sum(
+            1 for a, b in zip(indexed, scanned)
+            if (a is None) == (b is None) and (a is None or a[0] >= b[0] - tolerance)
+        ) / n_queries
+    return {
+        'size': size,
+        'build_ms': build_s * 1000,
+        'index_us': index_s / n_queries * 1e6,
+        'difflib_us': scan_s / n_queries * 1e6,
+        'exact': agreement(1e-9),
+        'near': agreement(0.05),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--queries', type=int, default=50, help='queries per catalog size')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{'files':>8} {'build ms':>10} {'trigram us/q':>13} {'difflib us/q':>13} {'speedup':>8} {'exact':>6} {'near':>6}")
+    for size in args.sizes:
+        r = run(size, args.queries, args.seed)
+        print(f"{r['size']:>8} {r['build_ms']:>10.1f} {r['index_us']:>13.1f} {r['difflib_us']:>13.1f} "
+              f"{r['difflib_us'] / r['index_us']:>7.0f}x {r['exact']:>6.0%} {r['near']:>6.0%}")
+
+
+if __name__ == '__main__':
+    main()
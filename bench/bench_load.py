@@ -0,0 +1,338 @@
+"""
+Benchmark: end-to-end load on the app with local OpenAI and Pexels stand-ins.
+
+Starts the stubs from bench/stubs.py, starts the app against them (gunicorn
+with the worker/thread settings from the Dockerfile's CMD, or the Flask
+development server), then drives a closed-loop load of concurrent clients
+over /suggest, /api/recipe/<id>, /api/expand-recipe and /api/cache-image.
+Reports requests per second and p50/p95/p99 latency per endpoint.
+
+Suggestion queries are random ingredient combinations; ``--repeat`` is the
+share that reuses an earlier query (and so may hit the suggestion cache).
+Recipe and expand requests use ids from earlier suggestion answers; each id
+is expanded once, so expand requests measure uncached expansions. Images
+written to static/images during the run are removed afterwards.
+
+Run from the project root:
+    python bench/bench_load.py
+    python bench/bench_load.py --workers 4 --threads 4 --concurrency 32 --duration 60
+    python bench/bench_load.py --mix suggest=1 --openai-latency 3 --openai-error-rate 0.05
+    python bench/bench_load.py --server flask
+Against a running container (stubs started with bench/stubs.py --host 0.0.0.0 and
+the container's OPENAI_BASE_URL / PEXELS_API_URL pointing at them):
+    python bench/bench_load.py --url http://localhost:8080 --pexels-base http://localhost:9102
+"""
+import argparse
+import json
+import os
+import random
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict, deque
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import stubs  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+IMAGES_DIR = os.path.join(ROOT, 'static', 'images')
+
+INGREDIENTS = ['chickpeas', 'onion', 'tomato', 'garlic', 'paneer', 'spinach', 'rice', 'chicken', 'tofu',
+               'potato', 'lentils', 'mushroom', 'pasta', 'egg', 'broccoli', 'beef', 'shrimp', 'quinoa',
+               'bell pepper', 'cauliflower', 'carrot', 'zucchini', 'coconut milk', 'feta', 'beans']
+CUISINES = ['', 'indian', 'italian', 'mexican', 'chinese', 'mediterranean']
+DIFFICULTIES = ['easy', 'moderate', 'complex']
+# ids of the built-in recipes (RECIPES in app.py), opened until /suggest has returned cards
+LOCAL_RECIPE_IDS = list(range(1, 7))
+DEFAULT_MIX = 'suggest=6,recipe=3,expand=1,cache-image=2'
+
+
+def dockerfile_gunicorn_args(path):
+    """The gunicorn options from the Dockerfile's CMD, without --bind."""
+    with open(path, 'r', encoding='utf-8') as fh:
+        cmd = next((line for line in fh if line.strip().startswith('CMD') and 'gunicorn' in line), '')
+    words = shlex.split(cmd.split('gunicorn', 1)[1]) if cmd else ['--workers', '1', '--threads', '8', 'app:app']
+    args, skip = [], False
+    for word in words:
+        if skip:
+            skip = False
+        elif word in ('--bind', '-b'):
+            skip = True
+        elif not word.startswith('--bind='):
+            args.append(word)
+    return args
+
+
+def override_option(args, name, value):
+    """Replace (or add) ``name value`` in a gunicorn argument list."""
+    if value is None:
+        return args
+    args = list(args)
+    if name in args:
+        args[args.index(name) + 1] = str(value)
+    else:
+        args[:0] = [name, str(value)]
+    return args
+
+
+def start_app(server, port, env, gunicorn_args):
+    if server == 'gunicorn':
+        cmd = [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}'] + gunicorn_args
+    else:
+        cmd = [sys.executable, '-m', 'flask', '--app', 'app', 'run', '--port', str(port), '--with-threads']
+    return subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+
+
+def wait_ready(url, process=None, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process is not None and process.poll() is not None:
+            raise SystemExit('app exited during startup:\n' + (process.stderr.read() or '')[-2000:])
+        try:
+            if requests.get(url + '/', timeout=2).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    raise SystemExit(f'app did not answer at {url} within {timeout}s')
+
+
+def parse_mix(spec):
+    mix = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in SCENARIOS:
+            raise SystemExit(f'unknown scenario {name!r}; choose from {", ".join(SCENARIOS)}')
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+class Load:
+    """Shared state of one run: ids seen in answers, earlier queries and the recorded results."""
+
+    def __init__(self, base_url, pexels_base, repeat, image_urls):
+        self.base_url = base_url
+        self.pexels_base = pexels_base
+        self.repeat = repeat
+        self.image_urls = image_urls
+        self.queries = deque(maxlen=200)
+        self.recipe_ids = deque(maxlen=500)
+        self.unexpanded = deque(maxlen=500)
+        self.results = defaultdict(list)  # scenario -> [(seconds, status)]
+        self.lock = threading.Lock()
+
+    def remember_cards(self, response):
+        try:
+            ids = [card['id'] for card in response.json().get('cards') or [] if card.get('id') is not None]
+        except (ValueError, AttributeError):
+            return
+        with self.lock:
+            self.recipe_ids.extend(ids)
+            self.unexpanded.extend(ids)
+
+    def some_recipe_id(self):
+        with self.lock:
+            return random.choice(self.recipe_ids) if self.recipe_ids else random.choice(LOCAL_RECIPE_IDS)
+
+    def fresh_recipe_id(self):
+        with self.lock:
+            return self.unexpanded.popleft() if self.unexpanded else None
+
+
+def suggest(session, load):
+    with load.lock:
+        query = random.choice(load.queries) if load.queries and random.random() < load.repeat else None
+    if query is None:
+        query = {
+            'ingredients': ', '.join(random.sample(INGREDIENTS, random.randint(1, 3))),
+            'cuisine': random.choice(CUISINES),
+            'difficulty': random.choice(DIFFICULTIES),
+        }
+        with load.lock:
+            load.queries.append(query)
+    response = session.post(load.base_url + '/suggest', json=query, timeout=120)
+    load.remember_cards(response)
+    return response
+
+
+def recipe(session, load):
+    return session.get(f'{load.base_url}/api/recipe/{load.some_recipe_id()}', timeout=60)
+
+
+def expand(session, load):
+    rid = load.fresh_recipe_id() or load.some_recipe_id()
+    return session.post(load.base_url + '/api/expand-recipe', json={'id': rid}, timeout=120)
+
+
+def cache_image(session, load):
+    url = f'{load.pexels_base}/photos/{random.randrange(load.image_urls)}.jpg'
+    return session.post(load.base_url + '/api/cache-image', json={'url': url, 'name': 'bench'}, timeout=60)
+
+
+SCENARIOS = {'suggest': suggest, 'recipe': recipe, 'expand': expand, 'cache-image': cache_image}
+
+
+def client(load, mix, warmup_until, stop_at):
+    session = requests.Session()
+    names, weights = list(mix), list(mix.values())
+    while time.time() < stop_at:
+        name = random.choices(names, weights)[0]
+        measured = time.time() >= warmup_until
+        started = time.perf_counter()
+        try:
+            status = SCENARIOS[name](session, load).status_code
+        except requests.RequestException as e:
+            status = type(e).__name__
+        elapsed = time.perf_counter() - started
+        if measured:
+            with load.lock:
+                load.results[name].append((elapsed, status))
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return float('nan')
+    rank = max(1, int(round(pct / 100 * len(sorted_values) + 0.4999)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(results, seconds):
+    rows = []
+    everything = []
+    for name in list(SCENARIOS) + ['all']:
+        samples = everything if name == 'all' else results.get(name, [])
+        if name != 'all':
+            everything.extend(samples)
+        if not samples:
+            continue
+        latencies = sorted(s for s, _ in samples)
+        errors = defaultdict(int)
+        for _, status in samples:
+            if not (isinstance(status, int) and status < 400):
+                errors[str(status)] += 1
+        rows.append({
+            'endpoint': name,
+            'requests': len(samples),
+            'rps': len(samples) / seconds,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'max_ms': latencies[-1] * 1000,
+            'errors': dict(errors),
+        })
+    return rows
+
+
+def print_rows(rows):
+    print(f"{'endpoint':<12} {'requests':>8} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}  errors")
+    for r in rows:
+        errors = ', '.join(f'{k}: {v}' for k, v in sorted(r['errors'].items())) or '-'
+        print(f"{r['endpoint']:<12} {r['requests']:>8} {r['rps']:>8.1f} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} "
+              f"{r['p99_ms']:>9.1f} {r['max_ms']:>9.1f}  {errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--server', choices=['gunicorn', 'flask'], default='gunicorn')
+    parser.add_argument('--dockerfile', default=os.path.join(ROOT, 'Dockerfile'),
+                        help='gunicorn options are taken from its CMD')
+    parser.add_argument('--workers', type=int, help='override the Dockerfile --workers')
+    parser.add_argument('--threads', type=int, help='override the Dockerfile --threads')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--url', help='benchmark an app that is already running (stubs are not started)')
+    parser.add_argument('--pexels-base', default='http://127.0.0.1:9102',
+                        help='with --url: where the Pexels stub serves images')
+    parser.add_argument('--concurrency', type=int, default=16, help='concurrent clients')
+    parser.add_argument('--duration', type=float, default=30, help='seconds of measured load')
+    parser.add_argument('--warmup', type=float, default=5, help='seconds of load before measuring')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'scenario weights (default {DEFAULT_MIX})')
+    parser.add_argument('--repeat', type=float, default=0.2, help='share of suggestion queries that repeat')
+    parser.add_argument('--image-urls', type=int, default=200, help='distinct image URLs for cache-image')
+    parser.add_argument('--json', dest='json_path', help='also write the results to this file')
+    parser.add_argument('--keep-images', action='store_true', help='keep images the run cached in static/images')
+    stubs.add_arguments(parser)
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    process = None
+    workdir = None
+    images_before = set(os.listdir(IMAGES_DIR)) if os.path.isdir(IMAGES_DIR) else set()
+    gunicorn_args = override_option(override_option(dockerfile_gunicorn_args(args.dockerfile),
+                                                    '--workers', args.workers), '--threads', args.threads)
+    try:
+        if args.url:
+            base_url, pexels_base = args.url.rstrip('/'), args.pexels_base.rstrip('/')
+            wait_ready(base_url)
+        else:
+            openai_config, pexels_config = stubs.configs(args)
+            openai_stub = stubs.start_openai(openai_config)
+            pexels_stub = stubs.start_pexels(pexels_config)
+            pexels_base = 'http://127.0.0.1:%d' % pexels_stub.server_address[1]
+            workdir = tempfile.mkdtemp(prefix='bench-load-')
+            env = dict(os.environ)
+            env.update({
+                'OPENAI_API_KEY': 'sk-bench',
+                'OPENAI_BASE_URL': 'http://127.0.0.1:%d/v1' % openai_stub.server_address[1],
+                'PEXELS_API_KEY': 'bench',
+                'PEXELS_API_URL': pexels_base + '/v1/search',
+                # the stub's quota never runs out; keep the app's own budget out of the way too
+                'PEXELS_QUOTA_PER_HOUR': '100000000',
+                'PEXELS_QUOTA_BURST': '1000000',
+                'IMAGE_CACHE_PATH': os.path.join(workdir, 'image_cache.sqlite3'),
+                'RECIPE_STORE_PATH': os.path.join(workdir, 'recipes.sqlite3'),
+                'OPENAI_LOG_PATH': os.path.join(workdir, 'openai_responses.log'),
+                'FLASK_ENV': 'production',
+                'LOG_LEVEL': env.get('LOG_LEVEL') or 'WARNING',
+            })
+            base_url = f'http://127.0.0.1:{args.port}'
+            process = start_app(args.server, args.port, env, gunicorn_args)
+            wait_ready(base_url, process)
+
+        load = Load(base_url, pexels_base, args.repeat, args.image_urls)
+        setup = 'running app at ' + base_url if args.url else (
+            'gunicorn ' + ' '.join(gunicorn_args) if args.server == 'gunicorn' else 'flask development server')
+        print(f'{setup}; {args.concurrency} clients, {args.warmup:g}s warm-up, {args.duration:g}s measured; '
+              f'mix {args.mix}')
+        warmup_until = time.time() + args.warmup
+        stop_at = warmup_until + args.duration
+        clients = [threading.Thread(target=client, args=(load, mix, warmup_until, stop_at), daemon=True)
+                   for _ in range(args.concurrency)]
+        for t in clients:
+            t.start()
+        for t in clients:
+            t.join()
+        # requests still in flight at the deadline finish late; measure over the real span
+        measured = max(args.duration, time.time() - warmup_until)
+        rows = summarize(load.results, measured)
+        print_rows(rows)
+        if args.json_path:
+            with open(args.json_path, 'w', encoding='utf-8') as fh:
+                json.dump({'setup': setup, 'concurrency': args.concurrency, 'duration': measured,
+                           'mix': mix, 'results': rows}, fh, indent=2)
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+        if not args.keep_images and not args.url and os.path.isdir(IMAGES_DIR):
+            for name in set(os.listdir(IMAGES_DIR)) - images_before:
+                try:
+                    os.remove(os.path.join(IMAGES_DIR, name))
+                except OSError:
+                    pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,314 @@
+"""
+Local stand-ins for the OpenAI chat completions API and the Pexels API.
+
+Two small threaded HTTP servers that answer like the real services, with
+configurable latency, error rate and payload size, so the app can be load
+tested without paying for API calls:
+
+* OpenAI: ``POST /v1/chat/completions``, plain and ``stream=True`` (SSE).
+  Suggestion prompts get a JSON array of recipes built from the requested
+  ingredients, cuisine and difficulty (so they pass the app's filters);
+  expansion prompts get an ``ingredients_detailed``/``instructions_detailed``
+  object.
+* Pexels: ``GET /v1/search`` returning photos whose ``src`` URLs point back
+  at the stub, and ``GET /photos/<id>.jpg`` serving JPEG-typed bytes. The
+  rate limit headers report a quota that never runs out.
+
+Point the app at them with OPENAI_BASE_URL=http://<host>:<port>/v1 and
+PEXELS_API_URL=http://<host>:<port>/v1/search. bench/bench_load.py starts
+them itself; to benchmark a container, run them on their own:
+    python bench/stubs.py --openai-port 9101 --pexels-port 9102 --openai-latency 1.5
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+PANTRY = ['olive oil', 'salt', 'black pepper', 'garlic', 'onion', 'cumin', 'paprika', 'lemon juice',
+          'ginger', 'chili flakes', 'fresh herbs', 'butter', 'stock', 'tomato paste', 'soy sauce']
+DISHES = ['Skillet', 'Curry', 'Stir Fry', 'Bowl', 'Salad', 'Stew', 'Bake', 'Tacos', 'Pasta', 'Soup']
+# steps per recipe by difficulty, in line with the app's difficulty checks
+STEPS = {'easy': 5, 'moderate': 8, 'complex': 11}
+PANTRY_ITEMS = {'easy': 2, 'moderate': 5, 'complex': 9}
+
+
+@dataclass
+class StubConfig:
+    """Behaviour of one stub server."""
+    latency: float = 0.0      # seconds before answering (spread over the chunks of a stream)
+    jitter: float = 0.0       # up to this many extra seconds, uniformly random
+    error_rate: float = 0.0   # share of requests answered with error_status
+    error_status: int = 500
+    recipes: int = 3          # OpenAI: recipes per suggestion answer
+    stream_chunk: int = 40    # OpenAI: characters per streamed delta
+    photos: int = 15          # Pexels: photos per search page (capped by per_page)
+    image_bytes: int = 50_000  # Pexels: size of each served image
+    image_latency: float = 0.0  # Pexels: seconds before serving an image
+
+    def delay(self, base=None):
+        base = self.latency if base is None else base
+        return base + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real APIs
+    config = StubConfig()
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        try:
+            return json.loads(body or b'{}')
+        except ValueError:
+            return {}
+
+    def send_body(self, status, body, content_type='application/json', headers=None):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def maybe_fail(self):
+        """Answer with the configured error instead, for a share of requests."""
+        cfg = self.config
+        if cfg.error_rate and random.random() < cfg.error_rate:
+            time.sleep(cfg.delay())
+            headers = {'Retry-After': '1'} if cfg.error_status == 429 else None
+            self.send_body(cfg.error_status, {'error': {'message': 'stub error', 'type': 'server_error'}},
+                           headers=headers)
+            return True
+        return False
+
+
+def _criteria(messages):
+    """Ingredients, cuisine and difficulty asked for in the app's suggestion prompts."""
+    text = ' '.join(str(m.get('content') or '') for m in messages)
+    m = re.search(r'criteria: (\{.*?\})\. ', text)
+    if m:
+        try:
+            prompt = json.loads(m.group(1))
+            return prompt.get('ingredients') or '', prompt.get('cuisine') or '', prompt.get('difficulty') or ''
+        except ValueError:
+            pass
+    # the fallback prompt: "... using these ingredients: <list> in <cuisine> style."
+    m = re.search(r'using these ingredients: (.*?)(?: in (\w+) style)?\.', text)
+    difficulty = next((d for d in STEPS if f'{d.upper()} DIFFICULTY' in text), '')
+    if m:
+        return m.group(1), m.group(2) or '', difficulty
+    return '', '', difficulty
+
+
+def recipe_items(messages, count):
+    """Recipes for a suggestion prompt, using the requested ingredients."""
+    ingredients, cuisine, difficulty = _criteria(messages)
+    words = [w.strip() for w in re.split(r'[,;]', ingredients) if w.strip()] or ['chickpeas']
+    difficulty = difficulty if difficulty in STEPS else 'easy'
+    items = []
+    for _ in range(count):
+        main = random.choice(words)
+        extra = random.sample(PANTRY, PANTRY_ITEMS[difficulty])
+        items.append({
+            'id': random.randint(10_000, 2_000_000_000),
+            'name': f'{main.title()} {random.choice(DISHES)}',
+            'cuisine': (cuisine or 'International').title(),
+            'short': f'A {difficulty} dish built around {main}.',
+            'ingredients': [f'1 cup {w}' for w in words] + [f'1 tsp {p}' for p in extra],
+            'instructions': ' '.join(
+                f'{n}. Cook the {main} with {random.choice(PANTRY)} for {random.randint(2, 15)} minutes.'
+                for n in range(1, STEPS[difficulty] + 1)),
+            'nutrition': {'calories': random.randint(250, 700), 'protein': '20g', 'fat': '12g', 'carbs': '40g'},
+            'difficulty': difficulty,
+        })
+    return items
+
+
+def expanded_recipe(messages):
+    """An expansion answer for the app's expand-recipe prompt."""
+    text = ' '.join(str(m.get('content') or '') for m in messages)
+    m = re.search(r'instructions: (\{.*\})', text)
+    base = {}
+    if m:
+        try:
+            base = json.loads(m.group(1))
+        except ValueError:
+            pass
+    ingredients = base.get('ingredients') or ['1 cup chickpeas']
+    return {
+        'ingredients_detailed': [f'{i} (about 100 g)' for i in ingredients] + ['1 tbsp olive oil', '1/2 tsp salt'],
+        'instructions_detailed': [f'Step {n}: cook for {n + 2} minutes, stirring.' for n in range(1, 9)],
+    }
+
+
+class OpenAIStubHandler(_StubHandler):
+    def do_POST(self):
+        if urlsplit(self.path).path.rstrip('/') != '/v1/chat/completions':
+            self.send_body(404, {'error': {'message': 'not found'}})
+            return
+        request = self.read_json()
+        if self.maybe_fail():
+            return
+        messages = request.get('messages') or []
+        if any('Expand this recipe' in str(m.get('content')) for m in messages):
+            text = json.dumps(expanded_recipe(messages))
+        else:
+            text = '```json\n' + json.dumps(recipe_items(messages, self.config.recipes)) + '\n```'
+        model = request.get('model') or 'stub'
+        if request.get('stream'):
+            self.stream(text, model)
+            return
+        time.sleep(self.config.delay())
+        self.send_body(200, {
+            'id': 'chatcmpl-stub',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text}, 'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': 400, 'completion_tokens': len(text) // 4, 'total_tokens': 400 + len(text) // 4},
+        })
+
+    def stream(self, text, model):
+        size = max(1, self.config.stream_chunk)
+        pieces = [text[i:i + size] for i in range(0, len(text), size)]
+        pause = self.config.delay() / (len(pieces) + 1)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        def event(delta, finish=None):
+            chunk = {'id': 'chatcmpl-stub', 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                     'model': model, 'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish}]}
+            return f'data: {json.dumps(chunk)}\n\n'
+
+        def write(data):
+            data = data.encode('utf-8')
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+            self.wfile.flush()
+
+        time.sleep(pause)
+        write(event({'role': 'assistant', 'content': ''}))
+        for piece in pieces:
+            time.sleep(pause)
+            write(event({'content': piece}))
+        write(event({}, 'stop'))
+        write('data: [DONE]\n\n')
+        self.wfile.write(b'0\r\n\r\n')
+
+
+class PexelsStubHandler(_StubHandler):
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        if parts.path.startswith('/photos/'):
+            time.sleep(self.config.delay(self.config.image_latency))
+            body = b'\xff\xd8\xff\xe0' + b'\0' * max(0, self.config.image_bytes - 6) + b'\xff\xd9'
+            self.send_body(200, body, 'image/jpeg')
+            return
+        if parts.path.rstrip('/') != '/v1/search':
+            self.send_body(404, {'error': 'not found'})
+            return
+        if not self.headers.get('Authorization'):
+            self.send_body(401, {'error': 'missing api key'})
+            return
+        if self.maybe_fail():
+            return
+        params = parse_qs(parts.query)
+        query = (params.get('query') or ['food'])[0]
+        per_page = min(80, int((params.get('per_page') or [15])[0]), self.config.photos)
+        host = self.headers.get('Host') or '%s:%s' % self.server.server_address[:2]
+        slug = re.sub(r'[^a-z0-9]+', '-', query.lower()).strip('-')
+        photos = []
+        for _ in range(per_page):
+            photo_id = random.randint(1_000_000, 9_999_999)
+            src = f'http://{host}/photos/{photo_id}.jpg'
+            photos.append({
+                'id': photo_id,
+                'url': f'https://www.pexels.com/photo/{slug}-{photo_id}/',
+                'alt': query,
+                'src': {'original': src, 'large': src, 'medium': src, 'small': src, 'tiny': src},
+            })
+        time.sleep(self.config.delay())
+        self.send_body(200, {'page': 1, 'per_page': per_page, 'photos': photos, 'total_results': per_page},
+                       headers={'X-Ratelimit-Limit': '1000000', 'X-Ratelimit-Remaining': '1000000',
+                                'X-Ratelimit-Reset': str(int(time.time()) + 3600)})
+
+
+def start(handler, config, port=0, host='127.0.0.1'):
+    """Serve ``handler`` with ``config`` on a daemon thread; returns the server (port 0 = any free port)."""
+    handler = type(handler.__name__, (handler,), {'config': config})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name=handler.__name__, daemon=True).start()
+    return server
+
+
+def start_openai(config=None, port=0, host='127.0.0.1'):
+    """Start the OpenAI stand-in; point OPENAI_BASE_URL at ``http://host:port/v1``."""
+    return start(OpenAIStubHandler, config or StubConfig(), port, host)
+
+
+def start_pexels(config=None, port=0, host='127.0.0.1'):
+    """Start the Pexels stand-in; point PEXELS_API_URL at ``http://host:port/v1/search``."""
+    return start(PexelsStubHandler, config or StubConfig(), port, host)
+
+
+def add_arguments(parser):
+    """The stub behaviour options, shared with bench_load.py."""
+    group = parser.add_argument_group('stubs')
+    group.add_argument('--openai-latency', type=float, default=1.0, help='seconds per chat completion')
+    group.add_argument('--openai-jitter', type=float, default=0.5)
+    group.add_argument('--openai-error-rate', type=float, default=0.0)
+    group.add_argument('--openai-error-status', type=int, default=500)
+    group.add_argument('--recipes', type=int, default=3, help='recipes per suggestion answer')
+    group.add_argument('--pexels-latency', type=float, default=0.15, help='seconds per search')
+    group.add_argument('--pexels-jitter', type=float, default=0.1)
+    group.add_argument('--pexels-error-rate', type=float, default=0.0)
+    group.add_argument('--pexels-error-status', type=int, default=500)
+    group.add_argument('--image-latency', type=float, default=0.05, help='seconds per image download')
+    group.add_argument('--image-bytes', type=int, default=50_000)
+
+
+def configs(args):
+    """(openai, pexels) StubConfig from parsed add_arguments() options."""
+    openai = StubConfig(latency=args.openai_latency, jitter=args.openai_jitter,
+                        error_rate=args.openai_error_rate, error_status=args.openai_error_status,
+                        recipes=args.recipes)
+    pexels = StubConfig(latency=args.pexels_latency, jitter=args.pexels_jitter,
+                        error_rate=args.pexels_error_rate, error_status=args.pexels_error_status,
+                        image_latency=args.image_latency, image_bytes=args.image_bytes)
+    return openai, pexels
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--host', default='127.0.0.1', help='0.0.0.0 to reach the stubs from a container')
+    parser.add_argument('--openai-port', type=int, default=9101)
+    parser.add_argument('--pexels-port', type=int, default=9102)
+    add_arguments(parser)
+    args = parser.parse_args()
+    openai_config, pexels_config = configs(args)
+    start_openai(openai_config, args.openai_port, args.host)
+    start_pexels(pexels_config, args.pexels_port, args.host)
+    print(f'OPENAI_BASE_URL=http://{args.host}:{args.openai_port}/v1')
+    print(f'PEXELS_API_URL=http://{args.host}:{args.pexels_port}/v1/search')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
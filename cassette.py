@@ -0,0 +1,213 @@
+"""
+Record upstream traffic once and replay it offline.
+
+With CASSETTE_MODE=record every OpenAI chat completion (suggestions, the
+fallback prompt, streaming suggestions and recipe expansion) and every
+outbound HTTP GET (Pexels searches, image downloads) is passed through to the
+real service and appended to a cassette file together with how long it took.
+With CASSETTE_MODE=replay the same calls are answered from the cassette
+without touching the network, either with their recorded latency or with
+none, so the full request path (JSON extraction, filtering, image
+normalization) can be profiled deterministically.
+
+The hooks sit in outbound.py below the circuit breakers and retries, so
+those behave as they would against the real services. Calls are matched on
+their request: the URL with its query for HTTP, the model, messages and
+sampling options for OpenAI (never the API key). A call recorded several
+times is replayed in recorded order, then wraps around. A call missing from
+the cassette raises CassetteMiss. Record and replay with the same settings;
+with SUGGESTION_CACHE_VARIETY above 1 the prompts carry random seeds and will
+not match.
+
+The cassette is gzip-compressed JSON lines, one gzip member per call, so
+several workers can append to it at once. Only responses are recorded;
+calls that raise (timeouts, connection errors, OpenAI API errors) are not.
+
+Settings (environment, read at startup):
+    CASSETTE_MODE     record, replay or off (default off)
+    CASSETTE_PATH     cassette file (default data/cassette.jsonl.gz)
+    CASSETTE_LATENCY  recorded or none: replay with the recorded latencies (default recorded)
+"""
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+import requests
+
+import config
+
+log = logging.getLogger('app.cassette')
+
+CASSETTE_MODE = (os.environ.get('CASSETTE_MODE') or 'off').strip().lower()
+CASSETTE_PATH = os.environ.get('CASSETTE_PATH') or os.path.join(config.ROOT, 'data', 'cassette.jsonl.gz')
+CASSETTE_LATENCY = (os.environ.get('CASSETTE_LATENCY') or 'recorded').strip().lower()
+
+# Response headers worth keeping: content type for image checks, Pexels quota, backoff hints
+RECORDED_HEADERS = ('Content-Type', 'Retry-After', 'X-Ratelimit-Limit', 'X-Ratelimit-Remaining', 'X-Ratelimit-Reset')
+
+
+class CassetteMiss(RuntimeError):
+    """Raised in replay mode for a call the cassette has no recording of."""
+
+
+def http_key(url, params=None):
+    """The match key of a GET: its full URL with the encoded query."""
+    return 'GET ' + requests.Request('GET', url, params=params).prepare().url
+
+
+def openai_key(kwargs):
+    """The match key of a chat completion: a digest of its arguments."""
+    return 'openai ' + hashlib.sha1(json.dumps(kwargs, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def _dump(model):
+    return model.to_dict() if hasattr(model, 'to_dict') else model.model_dump()
+
+
+class Cassette:
+    """The recordings in one cassette file, appended to while recording and replayed from memory."""
+
+    def __init__(self, path, latency=True):
+        self.path = path
+        self.latency = latency
+        self._entries = None  # key -> [entry, ...], loaded on first replay
+        self._next = {}
+        self._lock = threading.Lock()
+
+    # -- recording --
+
+    def append(self, entry):
+        data = gzip.compress((json.dumps(entry, separators=(',', ':')) + '\n').encode('utf-8'))
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            # one write per member in append mode, so concurrent writers do not interleave
+            with open(self.path, 'ab') as fh:
+                fh.write(data)
+
+    def record_http(self, key, call):
+        started = time.perf_counter()
+        response = call()
+        body = response.content  # read now so it is recorded; callers then read it from memory
+        entry = {
+            'key': key,
+            'elapsed': round(time.perf_counter() - started, 4),
+            'status': response.status_code,
+            'headers': {h: response.headers[h] for h in RECORDED_HEADERS if h in response.headers},
+        }
+        try:
+            entry['text'] = body.decode('utf-8')
+        except UnicodeDecodeError:
+            entry['base64'] = base64.b64encode(body).decode('ascii')
+        self.append(entry)
+        return response
+
+    def record_openai(self, key, call, stream):
+        started = time.perf_counter()
+        response = call()
+        elapsed = round(time.perf_counter() - started, 4)
+        if not stream:
+            self.append({'key': key, 'elapsed': elapsed, 'completion': _dump(response)})
+            return response
+        return self._record_stream(key, elapsed, response)
+
+    def _record_stream(self, key, elapsed, stream):
+        chunks = []
+        last = time.perf_counter()
+        try:
+            for chunk in stream:
+                now = time.perf_counter()
+                chunks.append([round(now - last, 4), _dump(chunk)])
+                last = now
+                yield chunk
+        finally:
+            # also keep streams the caller stopped reading early, as far as they got
+            self.append({'key': key, 'elapsed': elapsed, 'chunks': chunks})
+
+    # -- replay --
+
+    def _load(self):
+        entries = {}
+        try:
+            with gzip.open(self.path, 'rt', encoding='utf-8') as fh:
+                for line in fh:
+                    if line.strip():
+                        entry = json.loads(line)
+                        entries.setdefault(entry['key'], []).append(entry)
+        except FileNotFoundError:
+            log.warning('Cassette %s not found; every call will miss', self.path)
+        log.info('Replaying %d recorded calls from %s', sum(len(v) for v in entries.values()), self.path)
+        return entries
+
+    def lookup(self, key):
+        """The next recording for ``key`` (cycling through repeats)."""
+        with self._lock:
+            if self._entries is None:
+                self._entries = self._load()
+            recorded = self._entries.get(key)
+            if not recorded:
+                raise CassetteMiss(f'not in cassette: {key}')
+            index = self._next.get(key, 0)
+            self._next[key] = index + 1
+            return recorded[index % len(recorded)]
+
+    def _wait(self, seconds):
+        if self.latency and seconds > 0:
+            time.sleep(seconds)
+
+    def replay_http(self, key, url):
+        entry = self.lookup(key)
+        self._wait(entry['elapsed'])
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.headers.update(entry['headers'])
+        response.url = url
+        response._content = base64.b64decode(entry['base64']) if 'base64' in entry else entry['text'].encode('utf-8')
+        response._content_consumed = True
+        return response
+
+    def replay_openai(self, key):
+        from openai.types.chat import ChatCompletion, ChatCompletionChunk
+        entry = self.lookup(key)
+        self._wait(entry['elapsed'])
+        if 'completion' in entry:
+            return ChatCompletion.construct(**entry['completion'])
+        return self._replay_stream(entry['chunks'], ChatCompletionChunk)
+
+    def _replay_stream(self, chunks, chunk_type):
+        for delay, chunk in chunks:
+            self._wait(delay)
+            yield chunk_type.construct(**chunk)
+
+
+_cassette = Cassette(CASSETTE_PATH, latency=CASSETTE_LATENCY != 'none') \
+    if CASSETTE_MODE in ('record', 'replay') else None
+if _cassette is not None:
+    log.info('Cassette %s mode: %s', CASSETTE_MODE, CASSETTE_PATH)
+
+
+def http_call(url, kwargs, call):
+    """
+    ``call`` (a GET of ``url`` with ``kwargs``) wrapped for the cassette mode:
+    unchanged when off, recorded, or answered from the cassette.
+    """
+    if _cassette is None:
+        return call
+    key = http_key(url, kwargs.get('params'))
+    if CASSETTE_MODE == 'replay':
+        return lambda: _cassette.replay_http(key, url)
+    return lambda: _cassette.record_http(key, call)
+
+
+def openai_call(kwargs, call):
+    """``call`` (a chat completion with ``kwargs``) wrapped for the cassette mode, like http_call()."""
+    if _cassette is None:
+        return call
+    key = openai_key(kwargs)
+    if CASSETTE_MODE == 'replay':
+        return lambda: _cassette.replay_openai(key)
+    return lambda: _cassette.record_openai(key, call, bool(kwargs.get('stream')))
@@ -0,0 +1,199 @@
+"""
+Application settings, loaded once and swapped atomically on reload.
+
+Values come from the process environment, then ``.env`` in the project root,
+then ``data/.env`` (earlier sources win). They are read at import time into
+an immutable Settings object; request code calls ``settings()`` instead of
+opening and parsing the .env files itself. Import this module before any
+other app module so settings read from ``os.environ`` at import time see the
+.env values too.
+
+A reload re-reads the files and replaces the Settings object as a whole, so a
+request sees either the old or the new settings, never a mix. It happens on
+SIGHUP, or when the watcher thread notices a changed .env file. Only values
+read through ``settings()`` change on reload; tuning knobs that size caches
+and pools at import time need a restart.
+
+Settings (environment):
+    APP_PROFILE                'production' or 'development' (default: production
+                               when FLASK_ENV=production, otherwise development)
+    SEND_FILE_MAX_AGE_DEFAULT  static file max-age in seconds (default 0 in
+                               development, 300 in production)
+    TEMPLATES_AUTO_RELOAD      re-read changed templates (default on in development only)
+    CONFIG_CHECK_INTERVAL      seconds between .env mtime checks (default 5; 0 disables)
+"""
+import logging
+import os
+import signal
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+
+log = logging.getLogger('app.config')
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+ENV_FILES = (os.path.join(ROOT, '.env'), os.path.join(ROOT, 'data', '.env'))
+
+# Static file max-age and template auto-reload for each profile
+PROFILE_DEFAULTS = {
+    'development': {'send_file_max_age': 0, 'templates_auto_reload': True},
+    'production': {'send_file_max_age': 300, 'templates_auto_reload': False},
+}
+
+# The environment the process started with, before any .env file was applied
+_PROCESS_ENV = dict(os.environ)
+
+
+@dataclass(frozen=True)
+class Settings:
+    """One consistent snapshot of the app's configuration."""
+    profile: str
+    send_file_max_age: int
+    templates_auto_reload: bool
+    openai_api_key: str
+    openai_model: str
+    pexels_api_key: str
+    values: MappingProxyType
+
+    def get(self, name, default=None):
+        """A raw setting by name (environment first, then .env, then data/.env)."""
+        return self.values.get(name) or default
+
+
+def _read_env_file(path):
+    try:
+        from dotenv import dotenv_values
+        return {k: v for k, v in dotenv_values(path).items() if v is not None}
+    except ImportError:
+        pass
+    values = {}
+    with open(path, 'r', encoding='utf-8') as fh:
+        for line in fh:
+            line = line.strip()
+            if not line or line.startswith('#') or '=' not in line:
+                continue
+            key, value = line.split('=', 1)
+            values[key.strip()] = value.strip().strip('"').strip("'")
+    return values
+
+
+def _file_signature():
+    signature = []
+    for path in ENV_FILES:
+        try:
+            st = os.stat(path)
+            signature.append((path, st.st_mtime_ns, st.st_size))
+        except OSError:
+            signature.append((path, None, None))
+    return tuple(signature)
+
+
+def _flag(value, default):
+    if value is None or value == '':
+        return default
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def load():
+    """Read the environment and .env files into a new Settings object."""
+    values = {}
+    for path in reversed(ENV_FILES):
+        if os.path.exists(path):
+            try:
+                values.update(_read_env_file(path))
+            except Exception as e:
+                log.error("Could not read %s: %s", path, e)
+    values.update(_PROCESS_ENV)
+
+    profile = (values.get('APP_PROFILE') or '').strip().lower()
+    if profile not in PROFILE_DEFAULTS:
+        profile = 'production' if values.get('FLASK_ENV') == 'production' else 'development'
+    defaults = PROFILE_DEFAULTS[profile]
+    max_age = values.get('SEND_FILE_MAX_AGE_DEFAULT')
+    return Settings(
+        profile=profile,
+        send_file_max_age=int(max_age) if max_age else defaults['send_file_max_age'],
+        templates_auto_reload=_flag(values.get('TEMPLATES_AUTO_RELOAD'), defaults['templates_auto_reload']),
+        openai_api_key=values.get('OPENAI_API_KEY') or None,
+        openai_model=values.get('OPENAI_MODEL') or 'gpt-3.5-turbo',
+        pexels_api_key=values.get('PEXELS_API_KEY') or None,
+        values=MappingProxyType(values),
+    )
+
+
+_settings = load()
+_signature = _file_signature()
+_callbacks = []
+_lock = threading.Lock()
+_reload_requested = threading.Event()
+_watcher = None
+
+# Settings read from os.environ at import time (cache sizes, timeouts, ...) see
+# the .env values as well; the process environment still wins
+for _name, _value in _settings.values.items():
+    os.environ.setdefault(_name, _value)
+
+
+def settings():
+    """The current Settings."""
+    return _settings
+
+
+def on_reload(callback):
+    """Call ``callback(settings)`` now and after every reload (e.g. to update Flask config)."""
+    with _lock:
+        _callbacks.append(callback)
+    callback(_settings)
+    return callback
+
+
+def reload():
+    """Re-read the configuration and swap it in; returns the new Settings."""
+    global _settings, _signature
+    with _lock:
+        _signature = _file_signature()
+        new = load()
+        for name in set(_settings.values) - set(new.values) - set(_PROCESS_ENV):
+            os.environ.pop(name, None)
+        for name, value in new.values.items():
+            if name not in _PROCESS_ENV:
+                os.environ[name] = value
+        _settings = new
+        callbacks = list(_callbacks)
+    log.info("Configuration reloaded (profile %s)", new.profile)
+    for callback in callbacks:
+        try:
+            callback(new)
+        except Exception as e:
+            log.error("Configuration reload callback failed: %s", e)
+    return new
+
+
+def _watch(interval):
+    while True:
+        requested = _reload_requested.wait(interval or None)
+        _reload_requested.clear()
+        if requested or _file_signature() != _signature:
+            reload()
+
+
+def start_watcher(interval=None):
+    """
+    Reload on SIGHUP and, every ``interval`` seconds, when a .env file changed.
+
+    The signal handler only wakes the watcher thread; the reload itself runs
+    there. SIGHUP is only hooked when called from the main thread.
+    """
+    global _watcher
+    if interval is None:
+        interval = float(_settings.get('CONFIG_CHECK_INTERVAL') or 5)
+    with _lock:
+        if _watcher is not None:
+            return
+        _watcher = threading.Thread(target=_watch, args=(interval,), name='config-watcher', daemon=True)
+        _watcher.start()
+    if hasattr(signal, 'SIGHUP'):
+        try:
+            signal.signal(signal.SIGHUP, lambda signum, frame: _reload_requested.set())
+        except ValueError:
+            pass  # not the main thread; mtime checks still apply
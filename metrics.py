@@ -0,0 +1,216 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+Counters, gauges and histograms with labels, kept per process behind a lock
+per metric: an update is a dict lookup and a few additions, cheap enough to
+leave on in production. ``render()`` produces the text served at /metrics.
+With several gunicorn workers each worker reports its own numbers; scrape
+them per worker or sum them in the query.
+
+``timed()`` measures a block once and records it twice: into a histogram and
+into the current request's Server-Timing breakdown (see ``start_timing``).
+The breakdown lives in a context variable; work handed to thread pools keeps
+reporting into it when the callable is wrapped with ``propagate()``.
+"""
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Latency buckets in seconds, from a local lookup to a slow OpenAI answer
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+REGISTRY = []
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.append(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _samples(self):
+        with self._lock:
+            return [(self.name, key, (), value) for key, value in sorted(self._values.items())]
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for name, key, extra, value in self._samples():
+            lines.append(f'{name}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}')
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    """A value that only goes up."""
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """A value that is set, or read from a function when rendered."""
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        super().__init__(name, documentation, labelnames, registry)
+        self._function = None
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, function):
+        """Report ``function()`` at render time (unlabelled gauges only)."""
+        self._function = function
+
+    def _samples(self):
+        if self._function is not None:
+            try:
+                return [(self.name, (), (), self._function())]
+            except Exception:
+                return []
+        return super()._samples()
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, with their sum and count."""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time of the ``with`` block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self):
+        samples = []
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets, counts):
+                    cumulative += n
+                    samples.append((self.name + '_bucket', key, (('le', _format_value(bound)),), cumulative))
+                samples.append((self.name + '_sum', key, (), total))
+                samples.append((self.name + '_count', key, (), count))
+        return samples
+
+
+def render(registry=REGISTRY):
+    """Every metric in ``registry`` in the Prometheus text format."""
+    return '\n'.join(metric.render() for metric in registry) + '\n'
+
+
+class ServerTiming:
+    """Per-request totals of named durations, for the Server-Timing header."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds):
+        with self._lock:
+            self._totals[name] = self._totals.get(name, 0.0) + seconds
+
+    def header(self):
+        """The header value in milliseconds, ending with the request's total so far."""
+        with self._lock:
+            parts = [f'{name};dur={seconds * 1000:.1f}' for name, seconds in self._totals.items()]
+        parts.append(f'total;dur={(time.perf_counter() - self.started) * 1000:.1f}')
+        return ', '.join(parts)
+
+
+_timing = contextvars.ContextVar('server_timing', default=None)
+
+
+def start_timing():
+    """Begin a new Server-Timing breakdown for the current request and return it."""
+    timing = ServerTiming()
+    _timing.set(timing)
+    return timing
+
+
+def current_timing():
+    """The current request's ServerTiming, or None outside a request."""
+    return _timing.get()
+
+
+def record(timing_name, seconds, histogram=None, **labels):
+    """Add ``seconds`` to ``histogram`` (with ``labels``) and to the request's Server-Timing entry ``timing_name``."""
+    if histogram is not None:
+        histogram.observe(seconds, **labels)
+    timing = _timing.get()
+    if timing is not None:
+        timing.add(timing_name, seconds)
+
+
+@contextmanager
+def timed(timing_name, histogram=None, **labels):
+    """
+    Time the ``with`` block with record(). Parallel blocks with the same
+    ``timing_name`` add up in the Server-Timing breakdown.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(timing_name, time.perf_counter() - started, histogram, **labels)
+
+
+def propagate(function):
+    """Wrap ``function`` to run in a copy of the caller's context (e.g. before submitting it to a pool)."""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(function, *args, **kwargs)
@@ -0,0 +1,388 @@
+"""
+Shared outbound HTTP clients for the app.
+
+Every call to Pexels, Unsplash, image CDNs and OpenAI goes through here so
+connections are reused: one long-lived ``requests.Session`` per upstream host
+(keep-alive, a bounded connection pool, default timeouts) and a single
+OpenAI client per API key. The TCP/TLS handshake is then paid once per
+worker and host instead of once per call.
+
+Each upstream also gets a circuit breaker. Calls that fail with a retryable
+error (connection errors, timeouts, 429 and 5xx) are retried with
+exponential backoff and full jitter; once too many recent calls failed or
+were slow, the circuit opens and further calls raise CircuitOpenError
+straight away instead of waiting on a service that is down. After
+CIRCUIT_OPEN_SECONDS a single probe call is let through (half-open): success
+closes the circuit, failure opens it again.
+
+With CASSETTE_MODE set (see cassette.py) the calls are recorded to, or
+answered from, a cassette file underneath the breakers and retries.
+
+Settings (environment):
+    HTTP_CONNECT_TIMEOUT   seconds to establish a connection (default 3.05)
+    HTTP_READ_TIMEOUT      seconds to wait for response data (default 8)
+    HTTP_POOL_MAXSIZE      connections kept open per host (default 10)
+    HTTP_MAX_HOSTS         hosts with their own session and breaker; the least
+                           recently used beyond this are dropped (default 64)
+    OPENAI_TIMEOUT         seconds for an OpenAI request (default 60)
+    OPENAI_MAX_CONNECTIONS pooled connections to the OpenAI API (default 20)
+    OPENAI_BASE_URL        OpenAI-compatible API root (default the SDK's, e.g. a local
+                           stand-in from bench/stubs.py)
+    CIRCUIT_FAILURE_RATE   share of failed or slow calls that opens a circuit (default 0.5)
+    CIRCUIT_MIN_CALLS      calls in the window before the rate is judged (default 5)
+    CIRCUIT_WINDOW         seconds of call history considered (default 60)
+    CIRCUIT_OPEN_SECONDS   seconds an open circuit waits before a probe (default 30)
+    CIRCUIT_SLOW_CALL_SECONDS  an HTTP call this slow counts as failed (default 5)
+    OPENAI_SLOW_CALL_SECONDS   an OpenAI call this slow counts as failed (default 30)
+    RETRY_ATTEMPTS         retries after the first attempt (default 2)
+    RETRY_BASE_DELAY       backoff before the first retry, doubling after (default 0.25)
+    RETRY_MAX_DELAY        cap on a single backoff sleep (default 2)
+    RETRY_BUDGET           no retry starts after this many seconds (default 10)
+"""
+import logging
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import cassette
+import config  # noqa: F401 -- applies .env files before the settings below are read
+
+log = logging.getLogger('app.http')
+
+HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT') or 3.05)
+HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT') or 8)
+HTTP_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE') or 10)
+HTTP_MAX_HOSTS = int(os.environ.get('HTTP_MAX_HOSTS') or 64)
+OPENAI_TIMEOUT = float(os.environ.get('OPENAI_TIMEOUT') or 60)
+OPENAI_MAX_CONNECTIONS = int(os.environ.get('OPENAI_MAX_CONNECTIONS') or 20)
+OPENAI_BASE_URL = os.environ.get('OPENAI_BASE_URL') or None
+
+CIRCUIT_FAILURE_RATE = float(os.environ.get('CIRCUIT_FAILURE_RATE') or 0.5)
+CIRCUIT_MIN_CALLS = int(os.environ.get('CIRCUIT_MIN_CALLS') or 5)
+CIRCUIT_WINDOW = float(os.environ.get('CIRCUIT_WINDOW') or 60)
+CIRCUIT_OPEN_SECONDS = float(os.environ.get('CIRCUIT_OPEN_SECONDS') or 30)
+CIRCUIT_SLOW_CALL_SECONDS = float(os.environ.get('CIRCUIT_SLOW_CALL_SECONDS') or 5)
+OPENAI_SLOW_CALL_SECONDS = float(os.environ.get('OPENAI_SLOW_CALL_SECONDS') or 30)
+RETRY_ATTEMPTS = int(os.environ.get('RETRY_ATTEMPTS') or 2)
+RETRY_BASE_DELAY = float(os.environ.get('RETRY_BASE_DELAY') or 0.25)
+RETRY_MAX_DELAY = float(os.environ.get('RETRY_MAX_DELAY') or 2)
+RETRY_BUDGET = float(os.environ.get('RETRY_BUDGET') or 10)
+
+DEFAULT_TIMEOUT = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+
+# Name of the breaker guarding OpenAI calls; HTTP breakers are named by host_key()
+OPENAI_BREAKER = 'openai'
+
+# Response statuses worth retrying: rate limited or a server-side failure
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Per-host sessions and breakers, least recently used first. Hosts come from
+# callers (e.g. any URL sent to /api/cache-image), so both are capped at HTTP_MAX_HOSTS.
+_sessions = OrderedDict()
+_openai_clients = {}
+_breakers = OrderedDict()
+_lock = threading.Lock()
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an upstream whose circuit is open."""
+
+    def __init__(self, name):
+        super().__init__(f"circuit '{name}' is open")
+        self.name = name
+
+
+class CircuitBreaker:
+    """
+    Failure-rate and latency circuit breaker for one upstream service.
+
+    Outcomes of the calls made in the last ``window`` seconds are kept; a call
+    counts as bad when it failed or took ``slow_call_seconds`` or longer.
+    Once at least ``min_calls`` are recorded and the bad share reaches
+    ``failure_rate`` the circuit opens: allow() refuses every call for
+    ``open_seconds``, then lets exactly one probe through. The probe's outcome
+    closes the circuit or opens it for another ``open_seconds``.
+    """
+
+    def __init__(self, name, failure_rate=CIRCUIT_FAILURE_RATE, min_calls=CIRCUIT_MIN_CALLS,
+                 window=CIRCUIT_WINDOW, open_seconds=CIRCUIT_OPEN_SECONDS,
+                 slow_call_seconds=CIRCUIT_SLOW_CALL_SECONDS):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = max(1, min_calls)
+        self.window = window
+        self.open_seconds = open_seconds
+        self.slow_call_seconds = slow_call_seconds
+        self._calls = deque()  # (monotonic time, bad)
+        self._state = 'closed'
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _current_state(self):
+        if self._state == 'open' and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = 'half_open'
+            self._probing = False
+        return self._state
+
+    @property
+    def state(self):
+        """'closed', 'open' or 'half_open'."""
+        with self._lock:
+            return self._current_state()
+
+    def is_open(self):
+        """True when a call made now would be refused (does not use up the half-open probe)."""
+        with self._lock:
+            state = self._current_state()
+            return state == 'open' or (state == 'half_open' and self._probing)
+
+    def allow(self):
+        """Whether a call may go ahead; in half-open state only the first caller gets through."""
+        with self._lock:
+            state = self._current_state()
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record(self, ok, duration):
+        """Record the outcome of an allowed call that took ``duration`` seconds."""
+        bad = not ok or duration >= self.slow_call_seconds
+        with self._lock:
+            now = time.monotonic()
+            if self._state == 'half_open':
+                if bad:
+                    self._trip(now)
+                else:
+                    log.info("Circuit '%s' closed after a successful probe", self.name)
+                    self._state = 'closed'
+                    self._calls.clear()
+                self._probing = False
+                return
+            if self._state == 'open':
+                return  # a call that started before the circuit opened
+            self._calls.append((now, bad))
+            while self._calls and now - self._calls[0][0] > self.window:
+                self._calls.popleft()
+            if len(self._calls) >= self.min_calls:
+                failures = sum(1 for _, b in self._calls if b)
+                if failures / len(self._calls) >= self.failure_rate:
+                    self._trip(now)
+
+    def _trip(self, now):
+        log.error("Circuit '%s' opened for %gs", self.name, self.open_seconds)
+        self._state = 'open'
+        self._opened_at = now
+        self._calls.clear()
+
+
+def breaker(name):
+    """
+    The shared CircuitBreaker called ``name`` (a host_key() or OPENAI_BREAKER).
+
+    Host breakers beyond HTTP_MAX_HOSTS are dropped least recently used first
+    (the OpenAI breaker is kept).
+    """
+    with _lock:
+        found = _breakers.get(name)
+        if found is None:
+            slow = OPENAI_SLOW_CALL_SECONDS if name == OPENAI_BREAKER else CIRCUIT_SLOW_CALL_SECONDS
+            found = _breakers[name] = CircuitBreaker(name, slow_call_seconds=slow)
+            hosts = [key for key in _breakers if key != OPENAI_BREAKER]
+            for key in hosts[:max(0, len(hosts) - HTTP_MAX_HOSTS)]:
+                del _breakers[key]
+        else:
+            _breakers.move_to_end(name)
+    return found
+
+
+def circuit_open(target):
+    """Whether calls to ``target`` (a URL, or a breaker name such as OPENAI_BREAKER) are refused right now."""
+    return breaker(host_key(target) if '://' in target else target).is_open()
+
+
+def _retry_after(outcome):
+    """Seconds from a Retry-After header on a response or API error, if it has one."""
+    headers = getattr(outcome, 'headers', None)
+    if headers is None:
+        headers = getattr(getattr(outcome, 'response', None), 'headers', None)
+    try:
+        return float(headers.get('Retry-After'))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def call_with_breaker(guard, call, is_failure):
+    """
+    Run ``call()`` under the CircuitBreaker ``guard``, retrying retryable failures.
+
+    ``is_failure(outcome)`` gets the result or the raised exception and says
+    whether it is a retryable upstream failure. Those are recorded against the
+    breaker and retried after an exponential backoff with full jitter (or the
+    upstream's Retry-After, when that fits under RETRY_MAX_DELAY), up to
+    RETRY_ATTEMPTS times and only while RETRY_BUDGET allows. The last failing
+    result is returned, or its exception re-raised.
+
+    Raises:
+        CircuitOpenError: when the breaker refuses the call
+    """
+    started = time.monotonic()
+    attempt = 0
+    while True:
+        if not guard.allow():
+            raise CircuitOpenError(guard.name)
+        call_started = time.monotonic()
+        try:
+            outcome = call()
+            raised = False
+        except Exception as e:
+            outcome = e
+            raised = True
+        failed = is_failure(outcome)
+        guard.record(not failed, time.monotonic() - call_started)
+
+        delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+        retry_after = _retry_after(outcome) if failed else None
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        if (not failed or attempt >= RETRY_ATTEMPTS or delay > RETRY_MAX_DELAY
+                or time.monotonic() - started + delay > RETRY_BUDGET):
+            if raised:
+                raise outcome
+            return outcome
+
+        log.debug("Retrying '%s' in %.2fs after: %s", guard.name, delay, outcome)
+        if not raised:
+            outcome.close()
+        time.sleep(delay)
+        attempt += 1
+
+
+def host_key(url):
+    """The pool key for a URL: scheme and host (with port)."""
+    parts = urlsplit(url)
+    return f"{parts.scheme.lower()}://{parts.netloc.lower()}"
+
+
+def session_for(url):
+    """
+    The shared session for the host of ``url``, created on first use.
+
+    Each session mounts an HTTPAdapter whose pool keeps up to
+    HTTP_POOL_MAXSIZE connections to that host alive. A burst beyond that
+    opens extra connections, which are closed after use rather than waited
+    for: requests has no pool timeout, so a blocking pool would hang callers
+    for good once its connections leak. Sessions beyond HTTP_MAX_HOSTS are
+    closed least recently used first.
+    """
+    key = host_key(url)
+    with _lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_MAXSIZE)
+            session.mount(key + '/', adapter)
+            _sessions[key] = session
+            while len(_sessions) > HTTP_MAX_HOSTS:
+                _, oldest = _sessions.popitem(last=False)
+                oldest.close()
+        else:
+            _sessions.move_to_end(key)
+    return session
+
+
+def _http_failure(outcome):
+    if isinstance(outcome, Exception):
+        return isinstance(outcome, (requests.ConnectionError, requests.Timeout))
+    return outcome.status_code in RETRY_STATUSES
+
+
+def get(url, **kwargs):
+    """
+    ``requests.get`` over the pooled session for the URL's host, with default timeouts.
+
+    Guarded by the host's circuit breaker and retried on connection errors,
+    timeouts, 429 and 5xx (see call_with_breaker).
+
+    Raises:
+        CircuitOpenError: when the host's circuit is open
+    """
+    kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+    session = session_for(url)
+    call = cassette.http_call(url, kwargs, lambda: session.get(url, **kwargs))
+    return call_with_breaker(breaker(host_key(url)), call, _http_failure)
+
+
+def openai_client(api_key):
+    """
+    The shared OpenAI client for ``api_key`` (rebuilt only if the key changes).
+
+    The client keeps its own pooled HTTP connections; creating one per
+    request would throw them away after every call.
+    """
+    client = _openai_clients.get(api_key)
+    if client is None:
+        with _lock:
+            client = _openai_clients.get(api_key)
+            if client is None:
+                from openai import OpenAI
+                # retries are left to openai_chat, which also feeds the circuit breaker
+                options = {'api_key': api_key, 'timeout': OPENAI_TIMEOUT, 'max_retries': 0}
+                if OPENAI_BASE_URL:
+                    options['base_url'] = OPENAI_BASE_URL
+                try:
+                    import httpx
+                    options['http_client'] = httpx.Client(
+                        limits=httpx.Limits(max_connections=OPENAI_MAX_CONNECTIONS,
+                                            max_keepalive_connections=OPENAI_MAX_CONNECTIONS),
+                        timeout=OPENAI_TIMEOUT,
+                    )
+                except ImportError:
+                    pass  # the SDK's own pooled client is used
+                client = OpenAI(**options)
+                _openai_clients.clear()  # a rotated key replaces the old client
+                _openai_clients[api_key] = client
+    return client
+
+
+def _openai_failure(outcome):
+    if not isinstance(outcome, Exception):
+        return False
+    status = getattr(outcome, 'status_code', None)
+    if status is not None:
+        return status in RETRY_STATUSES
+    import openai
+    return isinstance(outcome, openai.APIConnectionError)  # includes timeouts
+
+
+def openai_chat(api_key, **kwargs):
+    """
+    ``chat.completions.create(**kwargs)`` on the shared client, under the OpenAI breaker.
+
+    Rate limits, 5xx, connection errors and timeouts are retried (see
+    call_with_breaker). For ``stream=True`` only opening the stream is guarded.
+
+    Raises:
+        CircuitOpenError: when the OpenAI circuit is open
+    """
+    client = openai_client(api_key)
+    call = cassette.openai_call(kwargs, lambda: client.chat.completions.create(**kwargs))
+    return call_with_breaker(breaker(OPENAI_BREAKER), call, _openai_failure)
+
+
+def close_all():
+    """Close every pooled connection (e.g. after forking a worker)."""
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+        _openai_clients.clear()